@@ -0,0 +1,230 @@
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from characters.enemies import astar_pathfind
+from core.pathfinding import HEURISTIC_MANHATTAN, HEURISTIC_OCTILE, ALGORITHM_ASTAR, ALGORITHM_JPS, ALGORITHM_HPA, STRAIGHT_COST, DIAGONAL_COST, search_stats, reset_search_stats
+from core.hpa import get_hierarchical_pathfinder
+
+# Micro-benchmark for astar_pathfind and the engines behind it, on generated maps:
+#   python benchmarks/pathfinding.py --sizes 64 128 --queries 200 --json
+# Every engine answers the same queries. Reference (octile A*) path costs are compared
+# against the other engines: exact engines must match them, and the run exits 1 if not.
+# Queries/sec and expanded nodes go through astar_pathfind, the way enemies call it.
+# Memory is the tracemalloc peak in bytes during a query (not a count of allocations),
+# from a separate pass over MEMORY_QUERIES.
+
+TILE_SIZE = 32
+DEFAULT_SIZES = (32, 64, 128)
+DEFAULT_QUERIES = 200
+MEMORY_QUERIES = 20 # tracemalloc slows everything down, so only this many are measured for memory
+
+class Engine:
+    def __init__(self, name, algorithm, heuristic=HEURISTIC_MANHATTAN, exact=True):
+        self.name = name
+        self.algorithm = algorithm
+        self.heuristic = heuristic
+        self.exact = exact # Must return shortest paths, same cost as the reference
+
+    def query(self, tiles, start, goal):
+        return astar_pathfind(tiles, TILE_SIZE, tile_center(start), tile_center(goal),
+                              heuristic=self.heuristic, algorithm=self.algorithm)
+
+    def full_path(self, tiles, start, goal):
+        # Whole path for the cost check, astar_pathfind only refines HPA's first stretch
+        if self.algorithm == ALGORITHM_HPA:
+            return get_hierarchical_pathfinder(tiles).find_path(start, goal, refine_all=True)
+        return self.query(tiles, start, goal)
+
+REFERENCE = Engine("astar_octile", ALGORITHM_ASTAR, HEURISTIC_OCTILE)
+ENGINES = [
+    Engine("astar", ALGORITHM_ASTAR, HEURISTIC_MANHATTAN, exact=False), # The legacy heuristic, overestimates diagonal moves so paths can come out longer
+    REFERENCE,
+    Engine("jps", ALGORITHM_JPS),
+    Engine("hpa", ALGORITHM_HPA, exact=False), # Near-shortest by design
+]
+
+def tile_center(tile):
+    return (tile[0] * TILE_SIZE + TILE_SIZE // 2, tile[1] * TILE_SIZE + TILE_SIZE // 2)
+
+def path_cost(path):
+    # In the engines' own move costs, which is what "shortest" means to them
+    if not path:
+        return None
+    cost = 0
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        cost += DIAGONAL_COST if x0 != x1 and y0 != y1 else STRAIGHT_COST
+    return cost
+
+# Map generators: size x size grids of 1 (floor) and 0 (wall), like Dungeon.tiles
+
+def walled(size):
+    return [[0] * size for _ in range(size)]
+
+def open_rooms(size, rng):
+    # Rooms 8 tiles across with a doorway in every shared wall
+    tiles = [[1] * size for _ in range(size)]
+    for y in range(size):
+        for x in range(size):
+            if x in (0, size - 1) or y in (0, size - 1) or x % 8 == 0 or y % 8 == 0:
+                tiles[y][x] = 0
+    for y in range(4, size - 1, 8):
+        for x in range(8, size - 1, 8):
+            tiles[y][x] = 1
+            tiles[x][y] = 1
+    return tiles
+
+def maze(size, rng):
+    # Recursive backtracker maze, one tile corridors
+    tiles = walled(size)
+    cells = (size - 1) // 2
+    stack = [(0, 0)]
+    tiles[1][1] = 1
+    visited = {(0, 0)}
+    while stack:
+        cell_x, cell_y = stack[-1]
+        neighbours = [(cell_x + dx, cell_y + dy) for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1))
+                      if 0 <= cell_x + dx < cells and 0 <= cell_y + dy < cells and (cell_x + dx, cell_y + dy) not in visited]
+        if not neighbours:
+            stack.pop()
+            continue
+        next_x, next_y = rng.choice(neighbours)
+        tiles[2 * next_y + 1][2 * next_x + 1] = 1
+        tiles[cell_y + next_y + 1][cell_x + next_x + 1] = 1
+        visited.add((next_x, next_y))
+        stack.append((next_x, next_y))
+    return tiles
+
+def corridors(size, rng):
+    # Long horizontal corridors joined at alternating ends, a worst case for straight-line heuristics
+    tiles = walled(size)
+    for y in range(1, size - 1, 2):
+        for x in range(1, size - 1):
+            tiles[y][x] = 1
+    for index, y in enumerate(range(2, size - 2, 2)):
+        tiles[y][size - 2 if index % 2 == 0 else 1] = 1
+    return tiles
+
+def scattered(density):
+    def generate(size, rng):
+        tiles = [[0 if rng.random() < density else 1 for _ in range(size)] for _ in range(size)]
+        return tiles
+    return generate
+
+def split(size, rng):
+    # Two halves with a solid wall between, for unreachable goals
+    tiles = scattered(0.1)(size, rng)
+    for y in range(size):
+        tiles[y][size // 2] = 0
+    return tiles
+
+MAPS = {
+    "open_rooms": open_rooms,
+    "maze": maze,
+    "corridors": corridors,
+    "scattered_10": scattered(0.1),
+    "scattered_30": scattered(0.3),
+    "unreachable": split,
+}
+
+def make_queries(tiles, count, rng, crossing=False):
+    floor = [(x, y) for y, row in enumerate(tiles) for x, tile in enumerate(row) if tile == 1]
+    if crossing:
+        # Always from the left half to the right one
+        middle = len(tiles[0]) // 2
+        left = [tile for tile in floor if tile[0] < middle]
+        right = [tile for tile in floor if tile[0] > middle]
+        return [(rng.choice(left), rng.choice(right)) for _ in range(count)]
+    return [(rng.choice(floor), rng.choice(floor)) for _ in range(count)]
+
+def bench_engine(engine, tiles, queries, reference_costs):
+    # Warm the engine caches (grid arrays, HPA hierarchy) outside the timing
+    engine.query(tiles, *queries[0])
+    reset_search_stats()
+    start = time.perf_counter()
+    for query_start, query_goal in queries:
+        engine.query(tiles, query_start, query_goal)
+    elapsed = time.perf_counter() - start
+    stats = search_stats[engine.algorithm]
+
+    tracemalloc.start()
+    peaks = []
+    for query_start, query_goal in queries[:MEMORY_QUERIES]:
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        engine.query(tiles, query_start, query_goal)
+        peaks.append(tracemalloc.get_traced_memory()[1] - before)
+    tracemalloc.stop()
+
+    mismatches = 0
+    worst_ratio = 1.0
+    for (query_start, query_goal), reference_cost in zip(queries, reference_costs):
+        cost = path_cost(engine.full_path(tiles, query_start, query_goal))
+        if (cost is None) != (reference_cost is None):
+            mismatches += 1
+        elif cost is not None and reference_cost:
+            if cost != reference_cost:
+                mismatches += 1
+            worst_ratio = max(worst_ratio, cost / reference_cost)
+
+    return {
+        "engine": engine.name,
+        "queries_per_second": round(len(queries) / elapsed, 1) if elapsed > 0 else None,
+        "nodes_expanded_per_query": round(stats["nodes_expanded"] / max(stats["queries"], 1), 1),
+        "peak_bytes_per_query": round(sum(peaks) / len(peaks)) if peaks else None,
+        "cost_mismatches": mismatches,
+        "worst_cost_ratio": round(worst_ratio, 4),
+        "exact": engine.exact,
+    }
+
+def run(sizes=DEFAULT_SIZES, map_names=None, query_count=DEFAULT_QUERIES, seed=1, engines=ENGINES):
+    results = []
+    for size in sizes:
+        for map_name in map_names or MAPS:
+            rng = random.Random(f"{seed}-{map_name}-{size}")
+            tiles = MAPS[map_name](size, rng)
+            queries = make_queries(tiles, query_count, rng, crossing=map_name == "unreachable")
+            reference_costs = [path_cost(REFERENCE.full_path(tiles, start, goal)) for start, goal in queries]
+            for engine in engines:
+                result = bench_engine(engine, tiles, queries, reference_costs)
+                result["map"] = map_name
+                result["size"] = size
+                result["reachable_queries"] = sum(cost is not None for cost in reference_costs)
+                results.append(result)
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the pathfinding engines on generated maps.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="map sizes in tiles")
+    parser.add_argument("--maps", nargs="+", choices=list(MAPS), help="map kinds, all of them when left out")
+    parser.add_argument("--engines", nargs="+", choices=[engine.name for engine in ENGINES], help="engines, all of them when left out")
+    parser.add_argument("--queries", type=int, default=DEFAULT_QUERIES, help="queries per map")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args(argv)
+
+    engines = [engine for engine in ENGINES if not args.engines or engine.name in args.engines]
+    results = run(args.sizes, args.maps, args.queries, args.seed, engines)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{'map':<14}{'size':>5} {'engine':<14}{'q/s':>10}{'nodes/q':>10}{'peak B/q':>10}{'mismatch':>9}{'worst':>8}")
+        for result in results:
+            print(f"{result['map']:<14}{result['size']:>5} {result['engine']:<14}{result['queries_per_second']:>10}"
+                  f"{result['nodes_expanded_per_query']:>10}{result['peak_bytes_per_query']:>10}"
+                  f"{result['cost_mismatches']:>9}{result['worst_cost_ratio']:>8}")
+
+    failures = [result for result in results if result["exact"] and result["cost_mismatches"]]
+    for result in failures:
+        print(f"MISMATCH {result['engine']} on {result['map']} {result['size']}: "
+              f"{result['cost_mismatches']} paths differ from {REFERENCE.name}", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,164 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import config
+from core.pathfinding import search_stats, reset_search_stats
+from benchmarks.scenarios import SCENARIOS, get_scenario
+
+# Runs the scenarios in benchmarks/scenarios.py and reports per-tick timings as JSON, e.g.
+#   python benchmarks/run.py --ticks 600 --out results.json
+#   python benchmarks/run.py --baseline results.json   (exit code 1 on a regression)
+# Rendering goes to SDL's dummy video driver, so no window or real display is needed.
+
+DEFAULT_TICKS = 300
+WARMUP_TICKS = 30 # Not measured: first flow field builds, chunk caches, surface caches
+DEFAULT_TOLERANCE = 0.15 # A metric this much worse than the baseline counts as a regression
+COMPARED_METRICS = ("update_ms_p50", "update_ms_p95", "render_ms_p50", "render_ms_p95")
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    index = max(0, math.ceil(fraction * len(sorted_values)) - 1)
+    return sorted_values[index]
+
+def summarize(name, values):
+    values = sorted(values)
+    return {f"{name}_p50": round(percentile(values, 0.50), 3),
+            f"{name}_p95": round(percentile(values, 0.95), 3),
+            f"{name}_p99": round(percentile(values, 0.99), 3)} if values else {}
+
+def astar_queries():
+    return sum(stats["queries"] for stats in search_stats.values())
+
+def open_display():
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    import pygame
+    pygame.display.init()
+    return pygame.display.set_mode(config.RENDER_RESOLUTION or (1920, 1080))
+
+def run_scenario(scenario, ticks=DEFAULT_TICKS, render=True, seed=1, use_pool=False):
+    from core.game import Game
+    overrides = dict(scenario.config_overrides)
+    overrides["ENEMY_SPAWN_COUNT"] = scenario.enemies
+    overrides["USE_ENEMY_POOL"] = use_pool
+    if scenario.world is not None:
+        overrides["WORLD_WIDTH"], overrides["WORLD_HEIGHT"] = scenario.world
+    saved = {key: getattr(config, key) for key in overrides}
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    try:
+        random.seed(seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            game = Game(open_display() if render else None)
+            if scenario.setup is not None:
+                scenario.setup(game)
+            update_times = []
+            render_times = []
+            enemies_per_ms = []
+            flow_rebuilds_at_start = 0
+            for tick in range(WARMUP_TICKS + ticks):
+                if tick == WARMUP_TICKS:
+                    reset_search_stats()
+                    flow_rebuilds_at_start = getattr(game.flow_field, "rebuild_count", 0)
+                if scenario.script is not None:
+                    scenario.script(game, tick)
+                alive = sum(1 for enemy in game.enemies if enemy.alive)
+                start = time.perf_counter()
+                game.update()
+                update_ms = (time.perf_counter() - start) * 1000
+                if render:
+                    start = time.perf_counter()
+                    game.render()
+                    render_ms = (time.perf_counter() - start) * 1000
+                if tick < WARMUP_TICKS:
+                    continue
+                update_times.append(update_ms)
+                if update_ms > 0:
+                    enemies_per_ms.append(alive / update_ms)
+                if render:
+                    render_times.append(render_ms)
+            game.shutdown()
+    finally:
+        for key, value in saved.items():
+            setattr(config, key, value)
+
+    result = {"scenario": scenario.name, "ticks": ticks, "enemies": scenario.enemies,
+              "enemies_alive_at_end": sum(1 for enemy in game.enemies if enemy.alive)}
+    result.update(summarize("update_ms", update_times))
+    result.update(summarize("render_ms", render_times))
+    enemies_per_ms.sort()
+    result["enemies_per_ms_p50"] = round(percentile(enemies_per_ms, 0.50), 2) if enemies_per_ms else None
+    result["astar_calls_per_tick"] = round(astar_queries() / ticks, 3)
+    result["flow_field_rebuilds_per_tick"] = round((getattr(game.flow_field, "rebuild_count", 0) - flow_rebuilds_at_start) / ticks, 3)
+    return result
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    # Lines describing every metric that got more than tolerance slower than the baseline
+    baseline_by_name = {entry["scenario"]: entry for entry in baseline.get("scenarios", [])}
+    regressions = []
+    for result in results:
+        old = baseline_by_name.get(result["scenario"])
+        if old is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if result.get(metric) is None or not old.get(metric):
+                continue
+            change = result[metric] / old[metric] - 1
+            if change > tolerance:
+                regressions.append(f"{result['scenario']} {metric}: {old[metric]} -> {result[metric]} ms (+{change:.0%})")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the scenario benchmarks.")
+    parser.add_argument("scenarios", nargs="*", help="scenario names, all of them when left out")
+    parser.add_argument("--ticks", type=int, default=DEFAULT_TICKS, help="measured ticks per scenario")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--pool", action="store_true", help="run with the NumPy enemy pool")
+    parser.add_argument("--no-render", action="store_true", help="only time updates, fully headless")
+    parser.add_argument("--out", help="write the JSON report here as well")
+    parser.add_argument("--baseline", help="earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="allowed slowdown vs baseline, 0.15 = 15%%")
+    parser.add_argument("--list", action="store_true", help="list the scenarios and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for scenario in SCENARIOS:
+            print(f"{scenario.name}: {scenario.enemies} enemies")
+        return 0
+
+    scenarios = [get_scenario(name) for name in args.scenarios] if args.scenarios else SCENARIOS
+    results = []
+    for scenario in scenarios:
+        print(f"running {scenario.name}...", file=sys.stderr)
+        results.append(run_scenario(scenario, args.ticks, not args.no_render, args.seed, args.pool))
+
+    report = {"ticks": args.ticks, "seed": args.seed, "pool": args.pool, "render": not args.no_render,
+              "scenarios": results}
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        with open(args.out, "w") as file:
+            file.write(text + "\n")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if regressions:
+            return 1
+        print("no regressions against baseline", file=sys.stderr)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import math
+
+# Scripted situations for benchmarks/run.py. Each one says how big the game is and what
+# the player does every tick, the runner does the timing. Scripts get the game and the
+# tick number and may poke at it however they like, cooldowns included.
+
+PLAYER_PATH_TICKS = 240 # Ticks per lap of the circle the player walks around in
+
+class Scenario:
+    def __init__(self, name, enemies, world=None, setup=None, script=None, config_overrides=None):
+        self.name = name
+        self.enemies = enemies
+        self.world = world # (width, height) in pixels, None for the default
+        self.setup = setup # setup(game) once after the game is built
+        self.script = script # script(game, tick) before every update
+        self.config_overrides = config_overrides or {}
+
+def make_player_unkillable(game):
+    # Otherwise the big hordes end the run after a few seconds
+    game.player.max_health = game.player.health = 10 ** 9
+
+def walk_in_circles(game, tick):
+    angle = tick * 2 * math.pi / PLAYER_PATH_TICKS
+    game.movement_input = (math.cos(angle), math.sin(angle))
+
+def cast_at_nearest(game, ability_name, every_ticks, tick):
+    if tick % every_ticks:
+        return
+    target = game.area_effects.nearest(game.player.rect.center, 10 ** 6)
+    if target is None:
+        return
+    game.player.cooldowns.pop(ability_name, None)
+    game.player.use_ability(ability_name, target=target.rect.center, game_context=game)
+
+def fireball_spam(game, tick):
+    walk_in_circles(game, tick)
+    cast_at_nearest(game, "fireball", 5, tick)
+
+def setup_long_lightning_chains(game):
+    make_player_unkillable(game)
+    game.player.abilities["lightning_storm"].max_arcs = 25
+
+def lightning_chains(game, tick):
+    cast_at_nearest(game, "lightning_storm", 20, tick)
+
+def setup_void_holes(game):
+    # A few holes on top of each other around the player, long lived so they last the run
+    make_player_unkillable(game)
+    ability = game.player.abilities["void_hole"]
+    ability.projectile_lifetime_seconds = 10 ** 6
+    center_x, center_y = game.player.rect.center
+    for offset_x, offset_y in ((40, 0), (120, 0), (0, 120), (-120, -60)):
+        game.player.cooldowns.pop("void_hole", None)
+        game.player.use_ability("void_hole", target=(center_x + offset_x, center_y + offset_y), game_context=game)
+
+SCENARIOS = [
+    Scenario("chase_100", 100, setup=make_player_unkillable, script=walk_in_circles),
+    Scenario("chase_1000", 1000, world=(3840, 2160), setup=make_player_unkillable, script=walk_in_circles),
+    Scenario("chase_5000", 5000, world=(3840, 2160), setup=make_player_unkillable, script=walk_in_circles),
+    Scenario("fireball_spam", 1000, world=(3840, 2160), setup=make_player_unkillable, script=fireball_spam),
+    Scenario("lightning_chains", 1000, world=(3840, 2160), setup=setup_long_lightning_chains, script=lightning_chains),
+    Scenario("void_holes", 1000, world=(3840, 2160), setup=setup_void_holes),
+]
+
+def get_scenario(name):
+    for scenario in SCENARIOS:
+        if scenario.name == name:
+            return scenario
+    raise KeyError(f"Unknown scenario '{name}', known: {', '.join(scenario.name for scenario in SCENARIOS)}")
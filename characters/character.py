@@ -42,6 +42,6 @@ class Character(pygame.sprite.Sprite):
             if self.cooldowns[ability] <= 0:
                 del self.cooldowns[ability]
     
-    def draw(self, surface):
-        pygame.draw.rect(surface, self.color, self.rect)
+    def draw(self, surface, camera=None):
+        pygame.draw.rect(surface, self.color, camera.apply(self.rect) if camera is not None else self.rect)
             
\ No newline at end of file
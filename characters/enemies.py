@@ -1,5 +1,8 @@
 import pygame
-import heapq
+from core.pathfinding import get_grid_engine, record_search, HEURISTIC_MANHATTAN, ALGORITHM_JPS, ALGORITHM_HPA
+from core.hpa import get_hierarchical_pathfinder
+import config
+from utils.sprites import get_sprite_table
 
 ENEMY_DEFAULT_COLOR = (255, 0, 0)
 STUN_OUTLINE_COLOR = (0, 0, 255)
@@ -7,115 +10,40 @@ OUTLINE_THICKNESS = 2
 HEALTH_BAR_HEIGHT = 5
 HEALTH_BAR_Y_OFFSET = 8
 
-class Node:
-    def __init__(self, parent=None, position=None):
-        self.parent = parent
-        self.position = position
-
-        self.g = 0
-        self.h = 0
-        self.f = 0
-
-    def __eq__(self, other):
-        return self.position == other.position
-
-    def __lt__(self, other):
-        if self.f == other.f:
-            return self.h < other.h
-        return self.f < other.f
-
-    def __hash__(self):
-        return hash(self.position)
-
-def astar_pathfind(dungeon_tiles, tile_size, start_pixel, end_pixel, character_width_tiles=1):
+def astar_pathfind(dungeon_tiles, tile_size, start_pixel, end_pixel, character_width_tiles=1,
+                   heuristic=HEURISTIC_MANHATTAN, algorithm=None):
     start_node_pos = (int(start_pixel[0] // tile_size), int(start_pixel[1] // tile_size))
     end_node_pos = (int(end_pixel[0] // tile_size), int(end_pixel[1] // tile_size))
 
-    start_node = Node(None, start_node_pos)
-
-    open_list_heap = []
-    node_counter = 0
-
-    open_nodes_map = {}
-
-    closed_set = set()
-
-    start_node.g = 0
-    start_node.h = abs(start_node.position[0] - end_node_pos[0]) + abs(start_node.position[1] - end_node_pos[1])
-    start_node.f = start_node.g + start_node.h
-
-    heapq.heappush(open_list_heap, (start_node.f, node_counter, start_node))
-    node_counter += 1
-    open_nodes_map[start_node.position] = start_node
-
-    map_width_tiles = len(dungeon_tiles[0])
-    map_height_tiles = len(dungeon_tiles)
-
-    neighbor_moves = [
-        (0, -1, 1), (0, 1, 1), (-1, 0, 1), (1, 0, 1),
-        (-1, -1, 1), (-1, 1, 1), (1, -1, 1), (1, 1, 1)
-    ]
-
-
-    while len(open_list_heap) > 0:
-        current_f, _, current_node = heapq.heappop(open_list_heap)
-
-        if current_node.position not in open_nodes_map or \
-           open_nodes_map[current_node.position].f < current_f:
-            continue
-
-        if current_node.position == end_node_pos:
-            path = []
-            temp_current = current_node
-            while temp_current is not None:
-                path.append(temp_current.position)
-                temp_current = temp_current.parent
-            return path[::-1]
-
-        closed_set.add(current_node.position)
-        if current_node.position in open_nodes_map:
-            del open_nodes_map[current_node.position]
-
-
-        for move_x, move_y, move_cost in neighbor_moves:
-            neighbor_pos = (current_node.position[0] + move_x, current_node.position[1] + move_y)
-
-            if not (0 <= neighbor_pos[0] < map_width_tiles and 0 <= neighbor_pos[1] < map_height_tiles):
-                continue
-
-            if dungeon_tiles[neighbor_pos[1]][neighbor_pos[0]] != 1:  # 1 is floor/walkable
-                continue
-
-            if neighbor_pos in closed_set:
-                continue
-
-            if abs(move_x) == 1 and abs(move_y) == 1:
-                wall_check_pos1_x = current_node.position[0] + move_x
-                wall_check_pos1_y = current_node.position[1]
-                wall_check_pos2_x = current_node.position[0]
-                wall_check_pos2_y = current_node.position[1] + move_y
-
-                if dungeon_tiles[wall_check_pos1_y][wall_check_pos1_x] == 0 and \
-                   dungeon_tiles[wall_check_pos2_y][wall_check_pos2_x] == 0:
-                    continue
-
-            tentative_g = current_node.g + move_cost
-
-            existing_neighbor_node_in_open = open_nodes_map.get(neighbor_pos)
-            if existing_neighbor_node_in_open is not None and tentative_g >= existing_neighbor_node_in_open.g:
-                continue
-
-            neighbor_node = existing_neighbor_node_in_open if existing_neighbor_node_in_open else Node(position=neighbor_pos)
-            neighbor_node.parent = current_node
-            neighbor_node.g = tentative_g
-            neighbor_node.h = abs(neighbor_pos[0] - end_node_pos[0]) + abs(neighbor_pos[1] - end_node_pos[1]) # Manhattan
-            neighbor_node.f = neighbor_node.g + neighbor_node.h
-
-            heapq.heappush(open_list_heap, (neighbor_node.f, node_counter, neighbor_node))
-            node_counter += 1
-            open_nodes_map[neighbor_pos] = neighbor_node
-
-    return None
+    if algorithm is None:
+        algorithm = config.PATHFINDING_ALGORITHM
+
+    if algorithm == ALGORITHM_HPA:
+        # Only the first stretch comes back refined, enemies ask again when they run out
+        hierarchy = get_hierarchical_pathfinder(dungeon_tiles)
+        path = hierarchy.find_path(start_node_pos, end_node_pos)
+        record_search(algorithm, hierarchy.nodes_expanded)
+        return path
+
+    engine = get_grid_engine(dungeon_tiles)
+    if algorithm == ALGORITHM_JPS:
+        path = engine.find_path_jps(start_node_pos, end_node_pos)
+    else:
+        path = engine.find_path(start_node_pos, end_node_pos, heuristic=heuristic)
+    record_search(algorithm, engine.nodes_expanded)
+    return path
+
+def cached_astar_pathfind(dungeon, start_pixel, end_pixel):
+    # astar_pathfind through the dungeon's path cache
+    start_tile = (int(start_pixel[0] // dungeon.tile_size), int(start_pixel[1] // dungeon.tile_size))
+    end_tile = (int(end_pixel[0] // dungeon.tile_size), int(end_pixel[1] // dungeon.tile_size))
+    found, path = dungeon.path_cache.lookup(start_tile, end_tile, dungeon.version)
+    if found:
+        return path
+
+    path = astar_pathfind(dungeon.tiles, dungeon.tile_size, start_pixel, end_pixel)
+    dungeon.path_cache.store(start_tile, end_tile, dungeon.version, path)
+    return path
 
 class Enemy(pygame.sprite.Sprite):
     def __init__(self, x, y, enemy_id, width=30, height=30, health=50, speed=1.5, damage=10):
@@ -127,10 +55,12 @@ class Enemy(pygame.sprite.Sprite):
         self.width = width
         self.height = height
 
-        self.original_image = pygame.Surface((self.width, self.height), pygame.SRCALPHA)
-        self.original_image.fill(ENEMY_DEFAULT_COLOR)
+        # Images shared by every enemy this size, see utils/sprites.py
+        self.sprites = get_sprite_table(f"enemy_{self.width}x{self.height}", (self.width, self.height),
+                                        ENEMY_DEFAULT_COLOR, STUN_OUTLINE_COLOR, OUTLINE_THICKNESS)
+        self.original_image = self.sprites.normal
 
-        self.image = self.original_image.copy()
+        self.image = self.original_image
         self.rect = self.image.get_rect(topleft=(x, y))
         self.pixel_pos = pygame.math.Vector2(self.rect.topleft)
 
@@ -153,6 +83,10 @@ class Enemy(pygame.sprite.Sprite):
         self.stuck_timer = 0
         self.max_stuck_time = 5
 
+        # Only used with the crowd solver (core/crowd.py)
+        self.velocity = (0.0, 0.0)
+        self.separation_force = (0.0, 0.0)
+
     def apply_stun(self, duration_frames, is_lightning_stun=False):
         if not self.alive:
             return
@@ -165,27 +99,22 @@ class Enemy(pygame.sprite.Sprite):
         if not self.is_stunned_by_lightning_visual:
              return
 
-        outlined_image_width = self.width + OUTLINE_THICKNESS * 2
-        outlined_image_height = self.height + OUTLINE_THICKNESS * 2
-        new_image = pygame.Surface((outlined_image_width, outlined_image_height), pygame.SRCALPHA)
-        new_image.blit(self.original_image, (OUTLINE_THICKNESS, OUTLINE_THICKNESS))
-        pygame.draw.rect(new_image, STUN_OUTLINE_COLOR, new_image.get_rect(), OUTLINE_THICKNESS)
-        self.image = new_image
+        self.image = self.sprites.stunned
         current_center = self.rect.center
         self.rect = self.image.get_rect(center=current_center)
         self.pixel_pos.update(self.rect.topleft)
 
 
     def _remove_stun_visual(self):
-        if self.image is not self.original_image:
-            self.image = self.original_image.copy()
+        if self.image is self.sprites.stunned:
+            self.image = self.sprites.normal
             current_center = self.rect.center
             self.rect = self.image.get_rect(center=current_center)
             self.pixel_pos.update(self.rect.topleft)
         self.is_stunned_by_lightning_visual = False
 
 
-    def update(self, player, dungeon, all_enemies_list):
+    def update(self, player, dungeon, all_enemies_list, game_context=None):
         if not self.alive:
             return
 
@@ -195,6 +124,11 @@ class Enemy(pygame.sprite.Sprite):
                 self._remove_stun_visual()
             return
 
+        flow_field = getattr(game_context, 'flow_field', None)
+        path_scheduler = getattr(game_context, 'path_scheduler', None)
+        enemy_grid = getattr(game_context, 'enemy_grid', None)
+        crowd = getattr(game_context, 'crowd', None)
+
         self.path_recalculation_timer -= 1
         player_current_tile = (int(player.rect.centerx // dungeon.tile_size),
                                int(player.rect.centery // dungeon.tile_size))
@@ -214,27 +148,23 @@ class Enemy(pygame.sprite.Sprite):
             self.path_recalculation_timer = self.path_recalculation_interval
             self.player_last_known_tile = player_current_tile
 
-            new_path_tiles = astar_pathfind(dungeon.tiles, dungeon.tile_size, self.rect.center, player.rect.center)
-
-            if new_path_tiles and len(new_path_tiles) > 0:
-                self.path = new_path_tiles
-                if len(self.path) > 1 and self.path[0] == (self.rect.centerx // dungeon.tile_size, self.rect.centery // dungeon.tile_size):
-                    self.path.pop(0)
-
-                if self.path:
-                    self.current_path_target_tile = self.path[0]
-                    self.current_pixel_target = pygame.math.Vector2(
-                        self.current_path_target_tile[0] * dungeon.tile_size + dungeon.tile_size // 2,
-                        self.current_path_target_tile[1] * dungeon.tile_size + dungeon.tile_size // 2
-                    )
-                    self.stuck_timer = 0
-                else:
-                    self.current_path_target_tile = None
-                    self.current_pixel_target = None
+            enemy_current_tile = (int(self.rect.centerx // dungeon.tile_size),
+                                  int(self.rect.centery // dungeon.tile_size))
+
+            if flow_field is not None:
+                # Shared field already points every tile toward the player, just read our next step
+                next_tile = flow_field.next_tile(enemy_current_tile)
+                self.set_path([next_tile] if next_tile else None, dungeon)
+            elif path_scheduler is not None:
+                # Keep following the old path until the scheduler gets round to us. It turns
+                # away unreachable goals itself
+                path_scheduler.request_path(self, player.rect.center)
+            elif not dungeon.is_reachable(enemy_current_tile, player_current_tile):
+                # Player is in a region we can't get to, a search would only flood our whole area
+                self.set_path(None, dungeon)
             else:
-                self.path = []
-                self.current_path_target_tile = None
-                self.current_pixel_target = None
+                new_path_tiles = cached_astar_pathfind(dungeon, self.rect.center, player.rect.center)
+                self.set_path(new_path_tiles, dungeon)
 
         move_vector = pygame.math.Vector2(0, 0)
         original_pixel_pos = self.pixel_pos.copy()
@@ -252,29 +182,9 @@ class Enemy(pygame.sprite.Sprite):
                     self.rect.center = (round(self.pixel_pos.x), round(self.pixel_pos.y))
                     move_vector.update(0,0)
 
-                    self.path.pop(0)
-                    if self.path:
-                        self.current_path_target_tile = self.path[0]
-                        self.current_pixel_target = pygame.math.Vector2(
-                            self.current_path_target_tile[0] * dungeon.tile_size + dungeon.tile_size // 2,
-                            self.current_path_target_tile[1] * dungeon.tile_size + dungeon.tile_size // 2
-                        )
-                        self.stuck_timer = 0
-                    else:
-                        self.current_path_target_tile = None
-                        self.current_pixel_target = None
+                    self._advance_waypoint(dungeon, flow_field)
             else: 
-                self.path.pop(0)
-                if self.path:
-                    self.current_path_target_tile = self.path[0]
-                    self.current_pixel_target = pygame.math.Vector2(
-                        self.current_path_target_tile[0] * dungeon.tile_size + dungeon.tile_size // 2,
-                        self.current_path_target_tile[1] * dungeon.tile_size + dungeon.tile_size // 2
-                    )
-                    self.stuck_timer = 0
-                else:
-                    self.current_path_target_tile = None
-                    self.current_pixel_target = None
+                self._advance_waypoint(dungeon, flow_field)
         else:
             direction_to_player = pygame.math.Vector2(player.rect.center) - pygame.math.Vector2(self.rect.center)
             distance_to_player = direction_to_player.length()
@@ -283,6 +193,12 @@ class Enemy(pygame.sprite.Sprite):
             if distance_to_player > attack_range and distance_to_player > 0:
                 move_vector = direction_to_player.normalize() * self.speed * 0.5
 
+        if crowd is not None:
+            # Blend in this frame's push from the neighbours instead of undoing overlapping moves below
+            steered_x, steered_y = crowd.steer(self.velocity, move_vector, self.separation_force, self.speed)
+            self.separation_force = (0.0, 0.0)
+            move_vector = pygame.math.Vector2(steered_x, steered_y)
+
         if move_vector.length_squared() > 0:
             prev_rect_x = self.rect.x
             prev_rect_y = self.rect.y
@@ -290,7 +206,7 @@ class Enemy(pygame.sprite.Sprite):
             self.pixel_pos.x += move_vector.x
             self.rect.x = round(self.pixel_pos.x)
             if self.check_collision_against_walls(dungeon) or \
-               self.check_collision_against_enemies(all_enemies_list, self):
+               (crowd is None and self.check_collision_against_enemies(all_enemies_list, self, enemy_grid)):
                 self.pixel_pos.x = float(prev_rect_x)
                 self.rect.x = prev_rect_x
                 move_vector.x = 0
@@ -298,11 +214,14 @@ class Enemy(pygame.sprite.Sprite):
             self.pixel_pos.y += move_vector.y
             self.rect.y = round(self.pixel_pos.y)
             if self.check_collision_against_walls(dungeon) or \
-               self.check_collision_against_enemies(all_enemies_list, self):
+               (crowd is None and self.check_collision_against_enemies(all_enemies_list, self, enemy_grid)):
                 self.pixel_pos.y = float(prev_rect_y)
                 self.rect.y = prev_rect_y
                 move_vector.y = 0
 
+        if crowd is not None:
+            self.velocity = (move_vector.x, move_vector.y)
+
         current_center_pos = pygame.math.Vector2(self.rect.center)
         intended_movement = (original_pixel_pos != self.pixel_pos)
 
@@ -317,26 +236,43 @@ class Enemy(pygame.sprite.Sprite):
              self.stuck_timer = 0
 
 
+    def set_path(self, new_path_tiles, dungeon):
+        if new_path_tiles and len(new_path_tiles) > 0:
+            self.path = new_path_tiles
+            if len(self.path) > 1 and self.path[0] == (self.rect.centerx // dungeon.tile_size, self.rect.centery // dungeon.tile_size):
+                self.path.pop(0)
+        else:
+            self.path = []
+        self._target_first_waypoint(dungeon)
+
+    def _advance_waypoint(self, dungeon, flow_field=None):
+        reached_tile = self.path.pop(0)
+        if not self.path and flow_field is not None:
+            # Keep walking down the field without waiting a frame for a new path
+            next_tile = flow_field.next_tile(reached_tile)
+            if next_tile:
+                self.path.append(next_tile)
+        self._target_first_waypoint(dungeon)
+
+    def _target_first_waypoint(self, dungeon):
+        if self.path:
+            self.current_path_target_tile = self.path[0]
+            self.current_pixel_target = pygame.math.Vector2(
+                self.current_path_target_tile[0] * dungeon.tile_size + dungeon.tile_size // 2,
+                self.current_path_target_tile[1] * dungeon.tile_size + dungeon.tile_size // 2
+            )
+            self.stuck_timer = 0
+        else:
+            self.current_path_target_tile = None
+            self.current_pixel_target = None
+
     def check_collision_against_walls(self, dungeon):
-        collision_rect = self.rect
-
-        min_tx = int(collision_rect.left // dungeon.tile_size)
-        max_tx = int(collision_rect.right // dungeon.tile_size)
-        min_ty = int(collision_rect.top // dungeon.tile_size)
-        max_ty = int(collision_rect.bottom // dungeon.tile_size)
-
-        for ty in range(min_ty, max_ty + 1):
-            for tx in range(min_tx, max_tx + 1):
-                if 0 <= ty < dungeon.height_tiles and 0 <= tx < dungeon.width_tiles:
-                    if dungeon.tiles[ty][tx] == 0:
-                        wall_rect = pygame.Rect(tx * dungeon.tile_size, ty * dungeon.tile_size,
-                                                dungeon.tile_size, dungeon.tile_size)
-                        if collision_rect.colliderect(wall_rect):
-                            return True
-        return False
+        return dungeon.collides_with_walls(self.rect)
 
-    def check_collision_against_enemies(self, all_enemies_list, current_enemy_skip):
-        for other_enemy in all_enemies_list:
+    def check_collision_against_enemies(self, all_enemies_list, current_enemy_skip, enemy_grid=None):
+        # With the game's spatial hash only the enemies in the cells we overlap are checked
+        candidates = enemy_grid.query_rect(self.rect) if enemy_grid is not None else all_enemies_list
+        for other_enemy in candidates:
             if other_enemy is not current_enemy_skip and other_enemy.alive:
                 if self.rect.colliderect(other_enemy.rect):
                     return True
@@ -351,16 +287,18 @@ class Enemy(pygame.sprite.Sprite):
             self.alive = False
             self.kill()
 
-    def draw(self, surface):
+    def draw(self, surface, camera=None):
         if self.alive:
             self.rect.topleft = (round(self.pixel_pos.x), round(self.pixel_pos.y))
-            surface.blit(self.image, self.rect)
+            screen_rect = camera.apply(self.rect) if camera is not None else self.rect
+            self.image = self.sprites.pick(self.is_stunned_by_lightning_visual, self.health, self.max_health)
+            surface.blit(self.image, screen_rect)
 
             if self.health < self.max_health and self.health > 0:
-                bar_full_width = self.rect.width
+                bar_full_width = screen_rect.width
                 bar_current_width = int(bar_full_width * (self.health / self.max_health))
-                bar_pos_x = self.rect.left
-                bar_pos_y = self.rect.top - HEALTH_BAR_Y_OFFSET - HEALTH_BAR_HEIGHT
+                bar_pos_x = screen_rect.left
+                bar_pos_y = screen_rect.top - HEALTH_BAR_Y_OFFSET - HEALTH_BAR_HEIGHT
 
                 pygame.draw.rect(surface, (100, 0, 0),
                                  (bar_pos_x, bar_pos_y, bar_full_width, HEALTH_BAR_HEIGHT))
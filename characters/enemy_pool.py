@@ -0,0 +1,405 @@
+import pygame
+from core.pathfinding import FlowField, UNREACHABLE
+from characters.enemies import ENEMY_DEFAULT_COLOR, STUN_OUTLINE_COLOR, OUTLINE_THICKNESS, HEALTH_BAR_HEIGHT, HEALTH_BAR_Y_OFFSET
+from utils.sprites import get_sprite_table
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+INITIAL_CAPACITY = 256
+CHASE_SPEED_FACTOR = 0.5 # Same as Enemy when it has no waypoint and walks straight at the player
+ATTACK_RANGE_TILES = 0.8
+# Every per-enemy array, _grow and remove_dead keep them all the same length and order
+ARRAY_NAMES = ("pos_x", "pos_y", "width", "height", "rect_x", "rect_y", "velocity_x", "velocity_y",
+               "speed", "health", "max_health", "alive", "stun_timer", "target_index", "ids")
+
+class EnemyPool:
+    # Structure-of-arrays backend for large hordes. Positions, speeds, health, stun timers
+    # and the waypoint each enemy is walking to live in NumPy arrays and the whole pool
+    # moves in one batch per frame instead of one Enemy.update() call per enemy.
+    # Waypoints come from the shared flow field, so there are no per-enemy path lists.
+    # Enemies only keep apart through the crowd solver's separation, walls block them as usual.
+    # Every enemy also gets a PooledEnemy view so abilities, the spatial hash and drawing
+    # keep working with .rect / .alive / take_damage() like before.
+    # Dead enemies are packed out of the arrays by remove_dead(), so the batch only ever
+    # covers the living and the arrays stop growing once the spawns stop.
+    def __init__(self, dungeon, flow_field=None, crowd=None, capacity=INITIAL_CAPACITY):
+        if np is None:
+            raise RuntimeError("EnemyPool needs numpy")
+        self.dungeon = dungeon
+        self.flow_field = flow_field if flow_field is not None else FlowField(dungeon)
+        self.owns_flow_field = flow_field is None
+        self.crowd = crowd # CrowdSolver, without one enemies walk straight through each other
+        self.count = 0
+        self.views = []
+        self.changed_views = {} # Views whose rect changed since take_changed_views(), in order
+
+        self.pos_x = np.zeros(capacity) # rect top-left in pixels, like Enemy.pixel_pos
+        self.pos_y = np.zeros(capacity)
+        self.width = np.zeros(capacity, dtype=np.int32)
+        self.height = np.zeros(capacity, dtype=np.int32)
+        self.rect_x = np.zeros(capacity, dtype=np.int64) # rounded positions, what the views' rects show
+        self.rect_y = np.zeros(capacity, dtype=np.int64)
+        self.velocity_x = np.zeros(capacity) # movement applied last frame
+        self.velocity_y = np.zeros(capacity)
+        self.speed = np.zeros(capacity)
+        self.health = np.zeros(capacity, dtype=np.int32)
+        self.max_health = np.zeros(capacity, dtype=np.int32)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.stun_timer = np.zeros(capacity, dtype=np.int32)
+        self.target_index = np.full(capacity, UNREACHABLE, dtype=np.int64) # flat tile index of the current waypoint
+        self.ids = np.zeros(capacity, dtype=np.int64)
+
+        self.wall_tiles = None
+        self.dungeon_version = None
+        self.next_index = None
+        self.flow_field_build = None
+
+    def _grow(self):
+        capacity = len(self.pos_x) * 2
+        for name in ARRAY_NAMES:
+            old = getattr(self, name)
+            grown = np.zeros(capacity, dtype=old.dtype)
+            grown[:self.count] = old[:self.count]
+            setattr(self, name, grown)
+        self.target_index[self.count:] = UNREACHABLE
+
+    def remove_dead(self):
+        # Packs the living to the front of the arrays, keeping their order (spawn order,
+        # which AreaEffects.nearest relies on). Returns the views of the dead, which are
+        # detached from the pool and read as dead from now on.
+        count = self.count
+        living = np.flatnonzero(self.alive[:count])
+        if len(living) == count:
+            return []
+        dead_views = [self.views[index] for index in np.flatnonzero(~self.alive[:count])]
+        new_count = len(living)
+        for name in ARRAY_NAMES:
+            array = getattr(self, name)
+            array[:new_count] = array[living]
+        self.alive[new_count:count] = False
+        self.target_index[new_count:count] = UNREACHABLE
+
+        self.views = [self.views[index] for index in living]
+        for index, view in enumerate(self.views):
+            view.index = index
+        for view in dead_views:
+            view.index = None
+            self.changed_views.pop(view, None)
+        self.count = new_count
+        return dead_views
+
+    def take_changed_views(self):
+        # Views that moved or changed size since the last call, for the spatial hash
+        changed = list(self.changed_views)
+        self.changed_views.clear()
+        return changed
+
+    def spawn(self, x, y, enemy_id, width=30, height=30, health=50, speed=1.5, damage=10):
+        if self.count == len(self.pos_x):
+            self._grow()
+        index = self.count
+        self.count += 1
+        self.pos_x[index] = x
+        self.pos_y[index] = y
+        self.rect_x[index] = round(x)
+        self.rect_y[index] = round(y)
+        self.width[index] = width
+        self.height[index] = height
+        self.speed[index] = speed
+        self.health[index] = health
+        self.max_health[index] = health
+        self.alive[index] = True
+        self.stun_timer[index] = 0
+        self.target_index[index] = UNREACHABLE
+        self.ids[index] = enemy_id
+
+        view = PooledEnemy(self, index, enemy_id, width, height, damage)
+        self.views.append(view)
+        return view
+
+    def _sync_dungeon(self):
+        if self.dungeon_version != self.dungeon.version:
+            self.wall_tiles = np.array(self.dungeon.tiles, dtype=np.int8) == 0
+            self.dungeon_version = self.dungeon.version
+        if self.flow_field_build != self.flow_field.rebuild_count:
+            self.next_index = np.array(self.flow_field.next_index, dtype=np.int64)
+            self.flow_field_build = self.flow_field.rebuild_count
+            # Old waypoints may lead somewhere else now, pick them again from the new field
+            self.target_index[:self.count] = UNREACHABLE
+
+    def _hits_wall(self, rect_x, rect_y, width, height):
+        # Every tile each rect overlaps, like Dungeon.find_wall_collision. Rects can be
+        # bigger than a tile (the stunned outline is), so the loop runs over the widest
+        # span in tiles and narrower rects just look at their last column/row again
+        tile_size = self.dungeon.tile_size
+        max_x = self.dungeon.width_tiles - 1
+        max_y = self.dungeon.height_tiles - 1
+        left = np.clip(rect_x // tile_size, 0, max_x)
+        right = np.clip((rect_x + width - 1) // tile_size, 0, max_x)
+        top = np.clip(rect_y // tile_size, 0, max_y)
+        bottom = np.clip((rect_y + height - 1) // tile_size, 0, max_y)
+        walls = self.wall_tiles
+        hits = np.zeros(len(left), dtype=bool)
+        if len(left) == 0:
+            return hits
+        for step_y in range(int((bottom - top).max()) + 1):
+            row = np.minimum(top + step_y, bottom)
+            for step_x in range(int((right - left).max()) + 1):
+                hits |= walls[row, np.minimum(left + step_x, right)]
+        return hits
+
+    def update(self, player):
+        count = self.count
+        if count == 0:
+            return
+        dungeon = self.dungeon
+        tile_size = dungeon.tile_size
+        width_tiles = dungeon.width_tiles
+
+        if self.owns_flow_field:
+            self.flow_field.update((int(player.rect.centerx // tile_size), int(player.rect.centery // tile_size)))
+        self._sync_dungeon()
+
+        alive = self.alive[:count]
+        stun_timer = self.stun_timer[:count]
+
+        # Stun countdown, stunned enemies skip their move like Enemy.update does
+        stunned = alive & (stun_timer > 0)
+        stun_timer[stunned] -= 1
+        for index in np.flatnonzero(stunned & (stun_timer == 0)):
+            self.views[index]._remove_stun_visual()
+        moving = alive & ~stunned
+
+        pos_x = self.pos_x[:count]
+        pos_y = self.pos_y[:count]
+        width = self.width[:count]
+        height = self.height[:count]
+        speed = self.speed[:count]
+        center_x, center_y = self.centers()
+
+        # Pick a waypoint from the flow field for anyone without one
+        target_index = self.target_index[:count]
+        current_tile = np.clip(center_y // tile_size, 0, dungeon.height_tiles - 1) * width_tiles + \
+                       np.clip(center_x // tile_size, 0, width_tiles - 1)
+        needs_target = moving & (target_index == UNREACHABLE)
+        target_index[needs_target] = self.next_index[current_tile[needs_target]]
+
+        has_target = moving & (target_index != UNREACHABLE)
+        target_x = (target_index % width_tiles) * tile_size + tile_size // 2
+        target_y = (target_index // width_tiles) * tile_size + tile_size // 2
+        to_target_x = np.where(has_target, target_x - center_x, 0).astype(float)
+        to_target_y = np.where(has_target, target_y - center_y, 0).astype(float)
+        target_distance = np.hypot(to_target_x, to_target_y)
+
+        # Close enough: snap onto the waypoint centre and take the next one from the field
+        reached = has_target & (target_distance <= speed)
+        pos_x[reached] = target_x[reached] - width[reached] // 2
+        pos_y[reached] = target_y[reached] - height[reached] // 2
+        target_index[reached] = self.next_index[target_index[reached]]
+
+        step_scale = np.zeros(count)
+        walking = has_target & ~reached
+        step_scale[walking] = speed[walking] / target_distance[walking]
+        step_x = to_target_x * step_scale
+        step_y = to_target_y * step_scale
+
+        # No waypoint (standing on the player's tile or cut off): walk straight at the player
+        chasing = moving & ~has_target
+        if chasing.any():
+            to_player_x = player.rect.centerx - center_x[chasing]
+            to_player_y = player.rect.centery - center_y[chasing]
+            player_distance = np.hypot(to_player_x, to_player_y)
+            chase_scale = np.where(player_distance > tile_size * ATTACK_RANGE_TILES,
+                                   speed[chasing] * CHASE_SPEED_FACTOR / np.maximum(player_distance, 1e-9), 0)
+            step_x[chasing] = to_player_x * chase_scale
+            step_y[chasing] = to_player_y * chase_scale
+
+        if self.crowd is not None:
+            # Stunned enemies are in the separation pass so the others are pushed off them,
+            # their own push is thrown away below
+            separation_x = np.zeros(count)
+            separation_y = np.zeros(count)
+            separation_x[alive], separation_y[alive] = self.crowd.separation_forces(center_x[alive], center_y[alive])
+            step_x, step_y = self.crowd.steer_batch(self.velocity_x[:count], self.velocity_y[:count],
+                                                    step_x, step_y, separation_x, separation_y, speed)
+            step_x[~moving] = 0
+            step_y[~moving] = 0
+
+        # One axis at a time like Enemy.update, a blocked axis falls back to the old rect position
+        previous_x = self.rect_x[:count].copy()
+        previous_y = self.rect_y[:count].copy()
+        rect_x = np.rint(pos_x).astype(np.int64)
+        rect_y = np.rint(pos_y).astype(np.int64)
+
+        pos_x += step_x
+        new_rect_x = np.rint(pos_x).astype(np.int64)
+        blocked_x = moving & self._hits_wall(new_rect_x, rect_y, width, height)
+        pos_x[blocked_x] = rect_x[blocked_x]
+        new_rect_x[blocked_x] = rect_x[blocked_x]
+        step_x[blocked_x] = 0
+
+        pos_y += step_y
+        new_rect_y = np.rint(pos_y).astype(np.int64)
+        blocked_y = moving & self._hits_wall(new_rect_x, new_rect_y, width, height)
+        pos_y[blocked_y] = rect_y[blocked_y]
+        new_rect_y[blocked_y] = rect_y[blocked_y]
+        step_y[blocked_y] = 0
+
+        # Anyone stuck against a wall picks a fresh waypoint next frame
+        target_index[blocked_x & blocked_y] = UNREACHABLE
+
+        self.velocity_x[:count] = step_x
+        self.velocity_y[:count] = step_y
+        self.rect_x[:count] = np.where(moving, new_rect_x, previous_x)
+        self.rect_y[:count] = np.where(moving, new_rect_y, previous_y)
+
+        # Only the views that actually moved need their Rect touched
+        self.sync_views(np.flatnonzero((self.rect_x[:count] != previous_x) | (self.rect_y[:count] != previous_y)))
+
+    def centers(self):
+        count = self.count
+        return self.rect_x[:count] + self.width[:count] // 2, self.rect_y[:count] + self.height[:count] // 2
+
+    def sync_views(self, indices):
+        views = self.views
+        changed_views = self.changed_views
+        for index in indices:
+            view = views[index]
+            view.rect.topleft = (int(self.rect_x[index]), int(self.rect_y[index]))
+            changed_views[view] = None
+
+    def nudge(self, indices, move_x, move_y):
+        # Pushes the given enemies by (move_x, move_y) each, one axis at a time, an axis
+        # that would end up in a wall is dropped. Used by area effects like void hole pulls.
+        width = self.width[indices]
+        height = self.height[indices]
+        self._sync_dungeon()
+        rect_x = self.rect_x[indices]
+        rect_y = self.rect_y[indices]
+
+        new_x = self.pos_x[indices] + move_x
+        new_rect_x = np.rint(new_x).astype(np.int64)
+        blocked_x = self._hits_wall(new_rect_x, rect_y, width, height)
+        new_x[blocked_x] = rect_x[blocked_x]
+        new_rect_x[blocked_x] = rect_x[blocked_x]
+
+        new_y = self.pos_y[indices] + move_y
+        new_rect_y = np.rint(new_y).astype(np.int64)
+        blocked_y = self._hits_wall(new_rect_x, new_rect_y, width, height)
+        new_y[blocked_y] = rect_y[blocked_y]
+        new_rect_y[blocked_y] = rect_y[blocked_y]
+
+        self.pos_x[indices] = new_x
+        self.pos_y[indices] = new_y
+        self.rect_x[indices] = new_rect_x
+        self.rect_y[indices] = new_rect_y
+        self.sync_views(indices)
+
+    def damage(self, indices, amount):
+        health = np.maximum(self.health[indices] - amount, 0)
+        self.health[indices] = health
+        self.alive[indices[health <= 0]] = False
+
+class PooledEnemy:
+    # Per-enemy view into an EnemyPool. Looks enough like Enemy for abilities, collision
+    # and drawing; the numbers themselves live in the pool's arrays.
+    def __init__(self, pool, index, enemy_id, width, height, damage):
+        self.pool = pool
+        self.index = index
+        self.id = enemy_id
+        self.name = f"Enemy_{self.id}"
+        self.width = width
+        self.height = height
+        self.damage = damage
+
+        # Images shared by every enemy this size, see utils/sprites.py
+        self.sprites = get_sprite_table(f"enemy_{self.width}x{self.height}", (self.width, self.height),
+                                        ENEMY_DEFAULT_COLOR, STUN_OUTLINE_COLOR, OUTLINE_THICKNESS)
+        self.original_image = self.sprites.normal
+        self.image = self.original_image
+        self.rect = self.image.get_rect(topleft=(int(pool.rect_x[index]), int(pool.rect_y[index])))
+        self.is_stunned_by_lightning_visual = False
+
+    # index is None once EnemyPool.remove_dead() has packed this enemy out, it's dead for good then
+
+    @property
+    def alive(self):
+        return self.index is not None and bool(self.pool.alive[self.index])
+
+    @property
+    def health(self):
+        return int(self.pool.health[self.index]) if self.index is not None else 0
+
+    @property
+    def max_health(self):
+        return int(self.pool.max_health[self.index]) if self.index is not None else 0
+
+    @property
+    def stun_timer(self):
+        return int(self.pool.stun_timer[self.index]) if self.index is not None else 0
+
+    @property
+    def speed(self):
+        return float(self.pool.speed[self.index]) if self.index is not None else 0.0
+
+    def take_damage(self, amount):
+        if not self.alive:
+            return
+        pool = self.pool
+        pool.health[self.index] = max(pool.health[self.index] - amount, 0)
+        if pool.health[self.index] <= 0:
+            pool.alive[self.index] = False
+
+    def apply_stun(self, duration_frames, is_lightning_stun=False):
+        if not self.alive:
+            return
+        pool = self.pool
+        pool.stun_timer[self.index] = max(pool.stun_timer[self.index], duration_frames)
+        if is_lightning_stun:
+            self.is_stunned_by_lightning_visual = True
+            self._apply_stun_visual()
+
+    def _set_rect(self, new_rect):
+        pool = self.pool
+        self.rect = new_rect
+        pool.pos_x[self.index] = pool.rect_x[self.index] = new_rect.x
+        pool.pos_y[self.index] = pool.rect_y[self.index] = new_rect.y
+        pool.width[self.index] = new_rect.width
+        pool.height[self.index] = new_rect.height
+        pool.changed_views[self] = None
+
+    def _apply_stun_visual(self):
+        if not self.is_stunned_by_lightning_visual:
+             return
+        self.image = self.sprites.stunned
+        self._set_rect(self.image.get_rect(center=self.rect.center))
+
+    def _remove_stun_visual(self):
+        if self.image is self.sprites.stunned:
+            self.image = self.sprites.normal
+            self._set_rect(self.image.get_rect(center=self.rect.center))
+        self.is_stunned_by_lightning_visual = False
+
+    def draw(self, surface, camera=None):
+        if not self.alive:
+            return
+        pool = self.pool
+        self.rect.topleft = (int(pool.rect_x[self.index]), int(pool.rect_y[self.index]))
+        screen_rect = camera.apply(self.rect) if camera is not None else self.rect
+        health = self.health
+        max_health = self.max_health
+        self.image = self.sprites.pick(self.is_stunned_by_lightning_visual, health, max_health)
+        surface.blit(self.image, screen_rect)
+
+        if health < max_health and health > 0:
+            bar_full_width = screen_rect.width
+            bar_current_width = int(bar_full_width * (health / max_health))
+            bar_pos_y = screen_rect.top - HEALTH_BAR_Y_OFFSET - HEALTH_BAR_HEIGHT
+            pygame.draw.rect(surface, (100, 0, 0), (screen_rect.left, bar_pos_y, bar_full_width, HEALTH_BAR_HEIGHT))
+            if bar_current_width > 0:
+                pygame.draw.rect(surface, (0, 200, 0), (screen_rect.left, bar_pos_y, bar_current_width, HEALTH_BAR_HEIGHT))
@@ -40,8 +40,9 @@ class Mage(Character):
         else: # Known but not unlocked
             print(f"Ability '{ability_name}' is not unlocked.")
 
-    def draw(self, surface):
-        pygame.draw.rect(surface, self.color, self.rect)
+    def draw(self, surface, camera=None):
+        rect = camera.apply(self.rect) if camera is not None else self.rect
+        pygame.draw.rect(surface, self.color, rect)
 
         if self.max_health > 0:
             health_percentage = self.health / self.max_health
@@ -51,9 +52,9 @@ class Mage(Character):
         bar_height = 7
         bar_y_offset = 10
 
-        background_bar_x = self.rect.x
-        background_bar_y = self.rect.y - bar_y_offset
-        background_bar_width = self.rect.width
+        background_bar_x = rect.x
+        background_bar_y = rect.y - bar_y_offset
+        background_bar_width = rect.width
         background_bar_height = bar_height
         
         background_bar_rect = pygame.Rect(
@@ -0,0 +1,50 @@
+# Enemy pathfinding
+USE_FLOW_FIELD = True # One shared distance map toward the player instead of an A* search per enemy
+PATHFINDING_ALGORITHM = "astar" # "astar", "jps" or "hpa", astar_pathfind can also override this per call
+USE_PATH_SCHEDULER = True # A* requests are queued and solved within a per-frame budget instead of inline
+PATHFINDING_FRAME_BUDGET_MS = 2.0
+PATHFINDING_PRIORITY = "nearest" # "nearest" or "oldest"
+PATHFINDING_MAX_WAIT_FRAMES = 30 # Requests older than this are served first regardless of priority
+USE_ASYNC_PATHFINDING = False # Solve A* requests on a worker pool instead, results land at the start of the next update
+PATHFINDING_WORKERS = 2
+PATHFINDING_USE_PROCESSES = False # Threads are enough on free-threaded builds, processes sidestep the GIL elsewhere
+HPA_CLUSTER_SIZE = 16 # Tiles per cluster side for the "hpa" algorithm. Its paths are near-shortest, mostly within 1.4x, but a few tiles long ones crossing a cluster border can reach 2.5x (benchmarks/pathfinding.py)
+PATH_CACHE_SIZE = 256 # Finished paths kept per dungeon, least recently used go first
+
+# Enemy simulation
+USE_ENEMY_POOL = False # Keep enemies in NumPy arrays (characters/enemy_pool.py) and move them in one batch, needs numpy
+ENEMY_SPAWN_COUNT = 100 # Enemies placed when a game starts
+USE_CROWD_STEERING = True # Enemies push apart with one separation pass per frame instead of undoing overlapping moves
+SEPARATION_RADIUS = 32 # Centres closer than this push each other apart, enemies are 30px wide
+SEPARATION_STRENGTH = 3.0 # Push in pixels per frame at full overlap
+STEERING_VELOCITY_BLEND = 0.35 # How much of the new steering goes into the velocity each frame
+
+# Enemy spatial hash
+SPATIAL_HASH_CELL_SIZE = 64 # Pixels per cell, about two enemies wide
+
+# Rendering
+WORLD_WIDTH = None # Dungeon size in pixels, None means the screen size. Bigger maps scroll with the camera
+WORLD_HEIGHT = None
+CAMERA_CHUNK_SIZE = 512 # Pixels per side of each pre-rendered background chunk
+CAMERA_MAX_CHUNKS = 64 # Background chunks kept around, least recently visible ones are dropped first
+USE_DIRTY_RECT_RENDERING = False # Only repaint and push the screen areas that changed, for software SDL / low power machines
+SURFACE_CACHE_SIZE = 256 # Cached effect surfaces (utils/surface_cache.py), least recently used go first
+ROTATION_STEP_DEGREES = 5 # Rotated sprites snap to this many degrees so they can share cached surfaces
+ATLAS_PAGE_SIZE = 512 # Pixels per side of each texture atlas page (utils/loader.py)
+ATLAS_MAX_SPRITE_SIZE = 128 # Images bigger than this on either side get their own surface instead
+DAMAGED_SPRITE_HEALTH = 0.5 # Enemies at or under this fraction of their health switch to the darker damaged sprite
+RENDER_RESOLUTION = None # (width, height) to draw at before scaling to the display, e.g. (1920, 1080). None draws at native resolution
+RENDER_SMOOTH_SCALE = False # smoothscale instead of scale when presenting a RENDER_RESOLUTION frame, softer but slower
+RENDER_HARDWARE_SCALE = False # Let SDL scale a RENDER_RESOLUTION display instead (pygame.SCALED in main.py), far cheaper than scaling in software
+
+# Game loop
+TICK_RATE = 60 # Simulation updates per second, every frame-counted timer in the game is in these ticks
+MAX_FPS = 120 # Render at most this many frames per second, 0 for no cap. Can be lower than TICK_RATE
+VSYNC = False # Ask the display for vsync, falls back to MAX_FPS when the renderer can't
+MAX_TICKS_PER_FRAME = 5 # Ticks run for one frame at most, past that the game slows down instead of stalling
+INTERPOLATE_RENDERING = True # Draw moving things between their last two tick positions
+
+# Profiling
+PROFILER_ENABLED = False # Time every update/render phase from the start, F3 toggles it and the overlay in game
+PROFILER_HISTORY_FRAMES = 240 # Frames kept for the overlay graphs
+PROFILER_CSV_PATH = "profile.csv" # Where F4 records one row per frame, F4 again stops
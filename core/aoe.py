@@ -0,0 +1,165 @@
+import math
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class AreaEffects:
+    # Batched area-of-effect queries for abilities (fireball, void hole, lightning arcs).
+    # With an EnemyPool the distances for the whole horde come out of its arrays in one
+    # NumPy call. Otherwise the spatial hash narrows things down to the enemies in the
+    # nearby cells and their distances are worked out together. Without numpy it is a
+    # plain loop like the abilities used to have.
+    # Distances are always between rect centres, and only living enemies count.
+    def __init__(self, enemies, enemy_grid=None, enemy_pool=None):
+        self.enemies = enemies
+        self.enemy_grid = enemy_grid
+        self.enemy_pool = enemy_pool if np is not None else None
+
+    def _candidates(self, center, radius):
+        if self.enemy_grid is not None:
+            candidates = self.enemy_grid.candidates_near(center, radius)
+            candidates.sort(key=lambda enemy: enemy.id) # Same order as the enemy list
+        else:
+            candidates = self.enemies
+        return [enemy for enemy in candidates if enemy.alive]
+
+    def _pool_distances_sq(self, center):
+        center_x, center_y = self.enemy_pool.centers()
+        dx = center_x - center[0]
+        dy = center_y - center[1]
+        return dx, dy, dx * dx + dy * dy
+
+    def _offsets(self, candidates, center):
+        # Enemy centre minus center for every candidate, as arrays when numpy is around
+        if np is not None:
+            centers = np.array([enemy.rect.center for enemy in candidates], dtype=float).reshape(-1, 2)
+            return centers[:, 0] - center[0], centers[:, 1] - center[1]
+        return ([enemy.rect.centerx - center[0] for enemy in candidates],
+                [enemy.rect.centery - center[1] for enemy in candidates])
+
+    def query_circle_indices(self, center, radius):
+        # Pool indices of living pooled enemies strictly within radius, plus their distances
+        pool = self.enemy_pool
+        _, _, distances_sq = self._pool_distances_sq(center)
+        indices = np.flatnonzero(pool.alive[:pool.count] & (distances_sq < radius * radius))
+        return indices, np.sqrt(distances_sq[indices])
+
+    def query_circle(self, center, radius, with_distances=False):
+        # Living enemies whose centre is strictly within radius of center, in enemy list order
+        if self.enemy_pool is not None:
+            indices, distances = self.query_circle_indices(center, radius)
+            hits = [self.enemy_pool.views[index] for index in indices]
+            return (hits, distances.tolist()) if with_distances else hits
+
+        candidates = self._candidates(center, radius)
+        if not candidates:
+            return ([], []) if with_distances else []
+        offset_x, offset_y = self._offsets(candidates, center)
+        if np is not None:
+            distances = np.sqrt(offset_x * offset_x + offset_y * offset_y)
+            indices = np.flatnonzero(distances < radius)
+            hits = [candidates[index] for index in indices]
+            distances = distances[indices].tolist()
+        else:
+            hits = []
+            distances = []
+            for enemy, dx, dy in zip(candidates, offset_x, offset_y):
+                distance = math.sqrt(dx * dx + dy * dy)
+                if distance < radius:
+                    hits.append(enemy)
+                    distances.append(distance)
+        return (hits, distances) if with_distances else hits
+
+    def damage_circle(self, center, radius, amount):
+        # Deals amount to everyone in the circle, returns how many were hit
+        if self.enemy_pool is not None:
+            indices, _ = self.query_circle_indices(center, radius)
+            self.enemy_pool.damage(indices, amount)
+            return len(indices)
+        hits = self.query_circle(center, radius)
+        for enemy in hits:
+            enemy.take_damage(amount)
+        return len(hits)
+
+    def apply_radial_impulse(self, center, radius, strength, dungeon):
+        # Moves every enemy inside the circle by strength pixels along the line to center.
+        # Positive pushes outward, negative pulls in (void holes). Enemies exactly on the
+        # centre have no direction and stay put. One axis at a time, an axis that would
+        # put the enemy in a wall is undone (the pool checks its own walls in nudge()).
+        if self.enemy_pool is not None:
+            pool = self.enemy_pool
+            dx, dy, distances_sq = self._pool_distances_sq(center)
+            indices = np.flatnonzero(pool.alive[:pool.count] & (distances_sq > 0) & (distances_sq < radius * radius))
+            if len(indices) == 0:
+                return 0
+            distances = np.sqrt(distances_sq[indices])
+            pool.nudge(indices, dx[indices] / distances * strength, dy[indices] / distances * strength)
+            if self.enemy_grid is not None:
+                for index in indices:
+                    self.enemy_grid.update(pool.views[index])
+            return len(indices)
+
+        candidates = self._candidates(center, radius)
+        if not candidates:
+            return 0
+        offset_x, offset_y = self._offsets(candidates, center)
+        if np is not None:
+            distances = np.sqrt(offset_x * offset_x + offset_y * offset_y)
+            indices = np.flatnonzero((distances > 0) & (distances < radius))
+            moves = [(candidates[index], (offset_x[index] / distances[index] * strength).item(),
+                      (offset_y[index] / distances[index] * strength).item()) for index in indices]
+        else:
+            moves = []
+            for enemy, dx, dy in zip(candidates, offset_x, offset_y):
+                distance = math.sqrt(dx * dx + dy * dy)
+                if 0 < distance < radius:
+                    moves.append((enemy, dx / distance * strength, dy / distance * strength))
+
+        for enemy, move_x, move_y in moves:
+            # Move pixel_pos too, Enemy.update and draw put the rect back onto it
+            pixel_pos = enemy.pixel_pos
+            original_x, original_y = enemy.rect.x, enemy.rect.y
+            pixel_pos.x += move_x
+            enemy.rect.x = round(pixel_pos.x)
+            if dungeon.collides_with_walls(enemy.rect):
+                pixel_pos.x = float(original_x)
+                enemy.rect.x = original_x
+            pixel_pos.y += move_y
+            enemy.rect.y = round(pixel_pos.y)
+            if dungeon.collides_with_walls(enemy.rect):
+                pixel_pos.y = float(original_y)
+                enemy.rect.y = original_y
+            if self.enemy_grid is not None:
+                self.enemy_grid.update(enemy)
+        return len(moves)
+
+    def nearest(self, center, radius, exclude_ids=()):
+        # Closest living enemy strictly within radius whose id isn't excluded, lowest id on ties
+        if self.enemy_pool is not None:
+            pool = self.enemy_pool
+            _, _, distances_sq = self._pool_distances_sq(center)
+            usable = pool.alive[:pool.count] & (distances_sq < radius * radius)
+            if exclude_ids:
+                usable &= ~np.isin(pool.ids[:pool.count], list(exclude_ids))
+            if not usable.any():
+                return None
+            # argmin takes the first of equal distances, pool order is spawn (id) order
+            return pool.views[int(np.argmin(np.where(usable, distances_sq, np.inf)))]
+
+        if self.enemy_grid is not None:
+            return self.enemy_grid.nearest(center, radius,
+                                           predicate=lambda enemy: enemy.alive and enemy.id not in exclude_ids,
+                                           sort_key=lambda enemy: enemy.id)
+        closest_enemy = None
+        min_distance_sq = radius * radius
+        for enemy in self.enemies:
+            if not enemy.alive or enemy.id in exclude_ids:
+                continue
+            dx = enemy.rect.centerx - center[0]
+            dy = enemy.rect.centery - center[1]
+            if dx * dx + dy * dy < min_distance_sq:
+                min_distance_sq = dx * dx + dy * dy
+                closest_enemy = enemy
+        return closest_enemy
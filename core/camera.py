@@ -0,0 +1,118 @@
+import pygame
+from collections import OrderedDict
+import config
+
+class Camera:
+    # Window onto the world. Everything in the game lives in world pixels, the camera
+    # only moves that window around (following the player) and converts between world
+    # and screen coordinates for drawing and mouse input.
+    def __init__(self, viewport_width, viewport_height, world_width, world_height):
+        self.width = viewport_width
+        self.height = viewport_height
+        self.world_width = world_width
+        self.world_height = world_height
+        self.x = 0
+        self.y = 0
+
+    @property
+    def viewport(self):
+        # The visible part of the world, in world coordinates
+        return pygame.Rect(self.x, self.y, self.width, self.height)
+
+    def follow(self, target_rect):
+        # Centre on the target but never show past the world edges. A world smaller
+        # than the screen stays pinned to the top-left like it always was.
+        self.x = max(0, min(target_rect.centerx - self.width // 2, self.world_width - self.width))
+        self.y = max(0, min(target_rect.centery - self.height // 2, self.world_height - self.height))
+
+    def world_to_screen(self, pos):
+        return (pos[0] - self.x, pos[1] - self.y)
+
+    def screen_to_world(self, pos):
+        return (pos[0] + self.x, pos[1] + self.y)
+
+    def apply(self, rect):
+        return rect.move(-self.x, -self.y)
+
+    def is_visible(self, rect):
+        return self.viewport.colliderect(rect)
+
+class ChunkedBackground:
+    # The dungeon tiles pre-rendered in square chunks, so only the chunks under the
+    # viewport are ever built or blitted and a big map costs the same to draw as a
+    # small one. Chunks are made on first sight and the least recently seen ones are
+    # dropped past max_chunks. A tile change repaints just that tile in its chunk.
+    def __init__(self, dungeon, chunk_size=None, max_chunks=None):
+        self.dungeon = dungeon
+        self.chunk_size = config.CAMERA_CHUNK_SIZE if chunk_size is None else chunk_size
+        self.max_chunks = config.CAMERA_MAX_CHUNKS if max_chunks is None else max_chunks
+        self.world_width = dungeon.width_tiles * dungeon.tile_size
+        self.world_height = dungeon.height_tiles * dungeon.tile_size
+        self.chunks = OrderedDict() # (chunk_x, chunk_y) -> Surface
+        self.dirty_tiles = {} # chunk -> set of tiles to repaint before the next blit
+        self.chunks_built = 0
+        self.chunks_drawn = 0
+        dungeon.tile_listeners.append(self.tile_changed)
+
+    def tile_changed(self, x, y):
+        tile_size = self.dungeon.tile_size
+        chunk = (x * tile_size // self.chunk_size, y * tile_size // self.chunk_size)
+        if chunk in self.chunks:
+            self.dirty_tiles.setdefault(chunk, set()).add((x, y))
+
+    def _tile_range(self, chunk):
+        # Tiles overlapping a chunk, chunk_size doesn't have to be a multiple of tile_size
+        tile_size = self.dungeon.tile_size
+        min_x = chunk[0] * self.chunk_size // tile_size
+        min_y = chunk[1] * self.chunk_size // tile_size
+        max_x = min(((chunk[0] + 1) * self.chunk_size - 1) // tile_size, self.dungeon.width_tiles - 1)
+        max_y = min(((chunk[1] + 1) * self.chunk_size - 1) // tile_size, self.dungeon.height_tiles - 1)
+        return min_x, min_y, max_x, max_y
+
+    def _build_chunk(self, chunk):
+        origin_x = chunk[0] * self.chunk_size
+        origin_y = chunk[1] * self.chunk_size
+        surface = pygame.Surface((min(self.chunk_size, self.world_width - origin_x),
+                                  min(self.chunk_size, self.world_height - origin_y)))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        min_x, min_y, max_x, max_y = self._tile_range(chunk)
+        for y in range(min_y, max_y + 1):
+            for x in range(min_x, max_x + 1):
+                self.dungeon.draw_tile(surface, x, y, (origin_x, origin_y))
+        self.chunks_built += 1
+        return surface
+
+    def get_chunk(self, chunk):
+        surface = self.chunks.get(chunk)
+        if surface is None:
+            surface = self._build_chunk(chunk)
+            self.chunks[chunk] = surface
+            self.dirty_tiles.pop(chunk, None)
+            if len(self.chunks) > self.max_chunks:
+                old_chunk, _ = self.chunks.popitem(last=False)
+                self.dirty_tiles.pop(old_chunk, None)
+        else:
+            self.chunks.move_to_end(chunk)
+            tiles = self.dirty_tiles.pop(chunk, None)
+            if tiles:
+                origin = (chunk[0] * self.chunk_size, chunk[1] * self.chunk_size)
+                for x, y in tiles:
+                    self.dungeon.draw_tile(surface, x, y, origin)
+        return surface
+
+    def visible_chunks(self, camera):
+        viewport = camera.viewport.clip(pygame.Rect(0, 0, self.world_width, self.world_height))
+        if viewport.width <= 0 or viewport.height <= 0:
+            return []
+        chunk_size = self.chunk_size
+        return [(chunk_x, chunk_y)
+                for chunk_y in range(viewport.top // chunk_size, (viewport.bottom - 1) // chunk_size + 1)
+                for chunk_x in range(viewport.left // chunk_size, (viewport.right - 1) // chunk_size + 1)]
+
+    def draw(self, surface, camera):
+        self.chunks_drawn = 0
+        for chunk in self.visible_chunks(camera):
+            surface.blit(self.get_chunk(chunk),
+                         camera.world_to_screen((chunk[0] * self.chunk_size, chunk[1] * self.chunk_size)))
+            self.chunks_drawn += 1
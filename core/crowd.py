@@ -0,0 +1,160 @@
+import math
+import config
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+NEIGHBOR_CELL_OFFSETS = [(offset_x, offset_y) for offset_x in (-1, 0, 1) for offset_y in (-1, 0, 1)]
+# Half of the 3x3 block: every pair of neighbouring cells is visited once and both sides get the push
+HALF_NEIGHBOR_CELL_OFFSETS = [(0, 0), (1, -1), (1, 0), (1, 1), (0, 1)]
+
+class CrowdSolver:
+    # Soft separation between enemies, worked out once per frame for everyone instead of
+    # each enemy trying a move and undoing it when it lands on another one. Enemies closer
+    # than separation_radius push each other apart, harder the more they overlap, and the
+    # push is blended into their velocity so packs slide around each other instead of
+    # freezing in place.
+    # Neighbours are found on a grid with cells separation_radius wide, so only the 3x3
+    # cells around an enemy are ever compared.
+    def __init__(self, separation_radius=None, separation_strength=None, velocity_blend=None):
+        self.separation_radius = config.SEPARATION_RADIUS if separation_radius is None else separation_radius
+        self.separation_strength = config.SEPARATION_STRENGTH if separation_strength is None else separation_strength
+        self.velocity_blend = config.STEERING_VELOCITY_BLEND if velocity_blend is None else velocity_blend
+        self.pairs_tested = 0
+
+    def separation_forces(self, centers_x, centers_y):
+        # Push per enemy from everyone overlapping it, as two arrays (or lists without numpy)
+        if np is None:
+            return self._separation_forces_python(list(centers_x), list(centers_y))
+        centers_x = np.asarray(centers_x, dtype=float)
+        centers_y = np.asarray(centers_y, dtype=float)
+        count = len(centers_x)
+        force_x = np.zeros(count)
+        force_y = np.zeros(count)
+        if count < 2:
+            return force_x, force_y
+
+        radius = self.separation_radius
+        cell_x = np.floor(centers_x / radius).astype(np.int64)
+        cell_y = np.floor(centers_y / radius).astype(np.int64)
+        # Shift cells so neighbour keys never wrap into another column
+        cell_x -= cell_x.min() - 1
+        cell_y -= cell_y.min() - 1
+        column_height = int(cell_y.max()) + 2
+        keys = cell_x * column_height + cell_y
+
+        # Enemies sorted by cell, plus where each cell's run starts in that order. Keys are
+        # small and dense, so a lookup table beats searching the sorted keys.
+        order = np.argsort(keys, kind="stable")
+        cell_counts = np.bincount(keys, minlength=int(keys.max()) + column_height + 2)
+        cell_starts = np.cumsum(cell_counts) - cell_counts
+        everyone = np.arange(count)
+
+        for offset_x, offset_y in HALF_NEIGHBOR_CELL_OFFSETS:
+            neighbor_keys = keys + offset_x * column_height + offset_y
+            starts = cell_starts[neighbor_keys]
+            counts = cell_counts[neighbor_keys]
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            # Every (enemy, enemy in that neighbour cell) pair, flattened
+            first = np.repeat(everyone, counts)
+            run_offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+            second = order[np.repeat(starts, counts) + run_offsets]
+            self.pairs_tested += total
+
+            dx = centers_x[first] - centers_x[second]
+            dy = centers_y[first] - centers_y[second]
+            distances = np.sqrt(dx * dx + dy * dy)
+            if offset_x == 0 and offset_y == 0:
+                close = (first < second) & (distances < radius)
+            else:
+                close = distances < radius
+            first = first[close]
+            second = second[close]
+            dx = dx[close]
+            dy = dy[close]
+            distances = distances[close]
+
+            # Stacked exactly on top of each other: split them apart along x by index order
+            stacked = distances == 0
+            dx[stacked] = np.where(first[stacked] < second[stacked], -1.0, 1.0)
+            distances[stacked] = 1.0
+
+            push = (radius - distances) / radius * self.separation_strength / distances
+            push_x = dx * push
+            push_y = dy * push
+            force_x += np.bincount(first, weights=push_x, minlength=count) - np.bincount(second, weights=push_x, minlength=count)
+            force_y += np.bincount(first, weights=push_y, minlength=count) - np.bincount(second, weights=push_y, minlength=count)
+        return force_x, force_y
+
+    def _separation_forces_python(self, centers_x, centers_y):
+        radius = self.separation_radius
+        count = len(centers_x)
+        cells = {}
+        for index in range(count):
+            cell = (math.floor(centers_x[index] / radius), math.floor(centers_y[index] / radius))
+            cells.setdefault(cell, []).append(index)
+
+        force_x = [0.0] * count
+        force_y = [0.0] * count
+        for (cell_x, cell_y), members in cells.items():
+            for offset_x, offset_y in NEIGHBOR_CELL_OFFSETS:
+                others = cells.get((cell_x + offset_x, cell_y + offset_y))
+                if not others:
+                    continue
+                for first in members:
+                    for second in others:
+                        if first == second:
+                            continue
+                        self.pairs_tested += 1
+                        dx = centers_x[first] - centers_x[second]
+                        dy = centers_y[first] - centers_y[second]
+                        distance = math.sqrt(dx * dx + dy * dy)
+                        if distance >= radius:
+                            continue
+                        if distance == 0:
+                            dx = -1.0 if first < second else 1.0
+                            distance = 1.0
+                        push = (radius - distance) / radius * self.separation_strength / distance
+                        force_x[first] += dx * push
+                        force_y[first] += dy * push
+        return force_x, force_y
+
+    def update(self, enemies):
+        # Object enemies: hands each moving enemy its separation push for this frame,
+        # Enemy.update blends it in through steer(). Stunned enemies stand still but still
+        # push, nothing else stops the others walking through them
+        living = [enemy for enemy in enemies if enemy.alive]
+        force_x, force_y = self.separation_forces([enemy.rect.centerx for enemy in living],
+                                                  [enemy.rect.centery for enemy in living])
+        for index, enemy in enumerate(living):
+            if enemy.stun_timer == 0:
+                enemy.separation_force = (float(force_x[index]), float(force_y[index]))
+            else:
+                enemy.separation_force = (0.0, 0.0)
+
+    def steer(self, velocity, desired, separation, max_speed):
+        # New velocity: last frame's blended toward where we want to go plus the push,
+        # never faster than max_speed
+        target_x = desired[0] + separation[0]
+        target_y = desired[1] + separation[1]
+        blend = self.velocity_blend
+        new_x = velocity[0] + (target_x - velocity[0]) * blend
+        new_y = velocity[1] + (target_y - velocity[1]) * blend
+        speed = math.sqrt(new_x * new_x + new_y * new_y)
+        if speed > max_speed:
+            new_x *= max_speed / speed
+            new_y *= max_speed / speed
+        return new_x, new_y
+
+    def steer_batch(self, velocity_x, velocity_y, desired_x, desired_y, separation_x, separation_y, max_speed):
+        # steer() for whole arrays at once (EnemyPool)
+        blend = self.velocity_blend
+        new_x = velocity_x + (desired_x + separation_x - velocity_x) * blend
+        new_y = velocity_y + (desired_y + separation_y - velocity_y) * blend
+        speed = np.sqrt(new_x * new_x + new_y * new_y)
+        scale = max_speed / np.maximum(speed, max_speed)
+        return new_x * scale, new_y * scale
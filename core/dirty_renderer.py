@@ -0,0 +1,109 @@
+import pygame
+
+HEALTH_BAR_MARGIN = 16 # Room above a rect for the health bars Mage and Enemy draw there
+
+class DirtyRectRenderer:
+    # Alternative to Game.render for machines where pushing a whole frame is the slow
+    # part (software SDL, low power). Keeps a copy of the empty screen, and each frame it
+    # only paints that back where something was drawn last frame, draws everything again
+    # and hands just the touched rects to pygame.display.update.
+    # When the camera scrolls everything moves, so that frame is a full redraw.
+    def __init__(self, game, background_color):
+        self.game = game
+        self.screen = game.screen
+        self.background_color = background_color
+        self.background = None
+        self.background_camera_pos = None
+        self.changed_tiles = set()
+        self.previous_rects = []
+        self.rects_updated = 0
+        game.dungeon.tile_listeners.append(self.tile_changed)
+
+    def tile_changed(self, x, y):
+        self.changed_tiles.add((x, y))
+
+    def invalidate(self):
+        # Next render repaints and flips the whole screen
+        self.background = None
+
+    def _build_background(self):
+        camera = self.game.camera
+        self.background = pygame.Surface(self.screen.get_size())
+        if pygame.display.get_surface() is not None:
+            self.background = self.background.convert()
+        self.background.fill(self.background_color)
+        self.game.chunked_background.draw(self.background, camera)
+        self.background_camera_pos = (camera.x, camera.y)
+        self.changed_tiles.clear()
+
+    def _refresh_changed_tiles(self):
+        # Tiles changed since last frame get repainted straight into our copy
+        dungeon = self.game.dungeon
+        camera = self.game.camera
+        tile_size = dungeon.tile_size
+        screen_rect = self.screen.get_rect()
+        changed = []
+        for x, y in self.changed_tiles:
+            rect = camera.apply(pygame.Rect(x * tile_size, y * tile_size, tile_size, tile_size)).clip(screen_rect)
+            if rect.width and rect.height:
+                dungeon.draw_tile(self.background, x, y, (camera.x, camera.y))
+                changed.append(rect)
+        self.changed_tiles.clear()
+        return changed
+
+    def footprint(self, entity):
+        rect = self.game.camera.apply(entity.rect)
+        if hasattr(entity, 'pull_radius') and getattr(entity, 'state', None) == "active":
+            # Void hole debug circles reach well past the sprite
+            radius = max(entity.pull_radius, entity.damage_radius)
+            return pygame.Rect(rect.centerx - radius, rect.centery - radius, radius * 2, radius * 2).union(rect)
+        return pygame.Rect(rect.left, rect.top - HEALTH_BAR_MARGIN, rect.width, rect.height + HEALTH_BAR_MARGIN)
+
+    def current_rects(self):
+        game = self.game
+        screen_rect = self.screen.get_rect()
+        entities = []
+        if game.player.alive:
+            entities.append(game.player)
+        entities.extend(enemy for enemy in game.enemies if enemy.alive)
+        entities.extend(game.projectiles)
+        entities.extend(game.active_aoe_effects)
+        rects = []
+        for entity in entities:
+            rect = self.footprint(entity).clip(screen_rect)
+            if rect.width and rect.height:
+                rects.append(rect)
+        return rects
+
+    def overlay_rects(self):
+        overlay_rect = self.game.perf_overlay.rect
+        return [overlay_rect.clip(self.screen.get_rect())] if overlay_rect is not None else []
+
+    def render(self):
+        screen = self.screen
+        camera = self.game.camera
+        profiler = self.game.profiler
+        camera.follow(self.game.player.rect)
+        if self.background is None or self.background_camera_pos != (camera.x, camera.y):
+            self._build_background()
+            screen.blit(self.background, (0, 0))
+            profiler.lap("background")
+            self.game.draw_entities(screen)
+            self.game.present()
+            self.previous_rects = self.current_rects() + self.overlay_rects()
+            return
+
+        dirty_rects = self._refresh_changed_tiles() if self.changed_tiles else []
+        for rect in dirty_rects + self.previous_rects:
+            screen.blit(self.background, rect, rect)
+        profiler.lap("dirty_rects")
+
+        self.game.draw_entities(screen)
+        current_rects = self.current_rects()
+        profiler.lap("dirty_rects")
+        dirty_rects.extend(self.previous_rects)
+        dirty_rects.extend(current_rects)
+        self.game.present(dirty_rects)
+        self.rects_updated = len(dirty_rects)
+        # The overlay panel changes height with its rows, so it's painted back like any sprite
+        self.previous_rects = current_rects + self.overlay_rects()
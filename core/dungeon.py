@@ -1,4 +1,11 @@
 import pygame
+from collections import deque
+from core import pathfinding, hpa
+from core.pathfinding import NEIGHBOR_MOVES, PathCache
+
+NO_REGION = -1
+WALL_COLOR = (100, 100, 100)
+FLOOR_COLOR = (50, 50, 50)
 
 class Dungeon:
     def __init__(self, screen_width, screen_height, tile_size=32):
@@ -8,6 +15,18 @@ class Dungeon:
         self.width_tiles = screen_width // tile_size
         self.height_tiles = screen_height // tile_size
         self.tiles = self.create_basic_dungeon()
+        self.version = 0  # Bumped on every tile change so cached data (flow fields etc.) knows to rebuild
+
+        # Connected floor areas, flat by y * width_tiles + x. Two tiles with different labels
+        # can never reach each other, so pathfinding can give up without searching.
+        self.region_labels = [NO_REGION] * (self.width_tiles * self.height_tiles)
+        self.next_region_label = 0
+        self.label_all_regions()
+
+        self.path_cache = PathCache() # Keyed on self.version, so edits invalidate it by themselves
+        self.wall_checks = 0 # find_wall_collision calls, read by the frame profiler
+
+        self.tile_listeners = [] # Called with (x, y) after set_tile changes a tile, e.g. camera chunks
 
     def create_basic_dungeon(self):
         # Create Dungeon Layout
@@ -24,11 +43,135 @@ class Dungeon:
             layout.append(row)
         return layout
 
-    def draw(self, surface):
-        for y, row in enumerate(self.tiles):
-            for x, tile in enumerate(row):
-                tile_rect = pygame.Rect(x * self.tile_size, y * self.tile_size, self.tile_size, self.tile_size)
-                if tile == 0:  # Wall
-                    pygame.draw.rect(surface, (100, 100, 100), tile_rect)
-                elif tile == 1:  # Floor
-                    pygame.draw.rect(surface, (50, 50, 50), tile_rect)
\ No newline at end of file
+    def set_tile(self, x, y, value):
+        if self.tiles[y][x] == value:
+            return
+        self.tiles[y][x] = value
+        self.version += 1
+        pathfinding.tile_changed(self.tiles, x, y)
+        hpa.tile_changed(self.tiles, x, y)
+        self._update_regions_around(x, y)
+        for listener in self.tile_listeners:
+            listener(x, y)
+
+    def is_floor(self, x, y):
+        return 0 <= x < self.width_tiles and 0 <= y < self.height_tiles and self.tiles[y][x] == 1
+
+    def _can_step(self, x, y, move_x, move_y):
+        # Same movement rule as the pathfinders: diagonals only blocked by two side walls
+        if not self.is_floor(x + move_x, y + move_y):
+            return False
+        if move_x != 0 and move_y != 0:
+            return not (self.tiles[y][x + move_x] == 0 and self.tiles[y + move_y][x] == 0)
+        return True
+
+    def _flood_region(self, start_x, start_y, label):
+        labels = self.region_labels
+        width = self.width_tiles
+        labels[start_y * width + start_x] = label
+        frontier = deque([(start_x, start_y)])
+        while frontier:
+            x, y = frontier.popleft()
+            for move_x, move_y in NEIGHBOR_MOVES:
+                nx = x + move_x
+                ny = y + move_y
+                if self._can_step(x, y, move_x, move_y) and labels[ny * width + nx] != label:
+                    labels[ny * width + nx] = label
+                    frontier.append((nx, ny))
+
+    def label_all_regions(self):
+        self.region_labels = [NO_REGION] * (self.width_tiles * self.height_tiles)
+        for y in range(self.height_tiles):
+            for x in range(self.width_tiles):
+                if self.tiles[y][x] == 1 and self.region_labels[y * self.width_tiles + x] == NO_REGION:
+                    self._flood_region(x, y, self.next_region_label)
+                    self.next_region_label += 1
+
+    def _update_regions_around(self, x, y):
+        # Only the regions touching the changed tile can merge or split, so re-flood from it
+        # and its neighbours instead of relabelling the whole map
+        width = self.width_tiles
+        self.region_labels[y * width + x] = NO_REGION
+        seeds = [(x, y)] if self.tiles[y][x] == 1 else []
+        for move_x, move_y in NEIGHBOR_MOVES:
+            if self.is_floor(x + move_x, y + move_y):
+                seeds.append((x + move_x, y + move_y))
+
+        relabelled = set()
+        for seed_x, seed_y in seeds:
+            label = self.region_labels[seed_y * width + seed_x]
+            if label in relabelled:
+                continue
+            new_label = self.next_region_label
+            self.next_region_label += 1
+            self._flood_region(seed_x, seed_y, new_label)
+            relabelled.add(new_label)
+
+    def region_at(self, tile):
+        x, y = tile
+        if not (0 <= x < self.width_tiles and 0 <= y < self.height_tiles):
+            return NO_REGION
+        return self.region_labels[y * self.width_tiles + x]
+
+    def is_reachable(self, start_tile, goal_tile):
+        # O(1) check before a path search. Only says no when it's certain: a start that
+        # isn't on floor (enemy clipped into a wall) is left to the search to sort out.
+        start_region = self.region_at(start_tile)
+        if start_region == NO_REGION:
+            return True
+        return start_region == self.region_at(goal_tile)
+
+    def find_wall_collision(self, rect):
+        # Only looks at the tiles under rect, so the cost doesn't depend on the map size.
+        # Returns the first overlapping wall (row by row) as a Rect, or None.
+        self.wall_checks += 1
+        min_tx = max(int(rect.left // self.tile_size), 0)
+        max_tx = min(int(rect.right // self.tile_size), self.width_tiles - 1)
+        min_ty = max(int(rect.top // self.tile_size), 0)
+        max_ty = min(int(rect.bottom // self.tile_size), self.height_tiles - 1)
+
+        for ty in range(min_ty, max_ty + 1):
+            row = self.tiles[ty]
+            for tx in range(min_tx, max_tx + 1):
+                if row[tx] == 0:
+                    wall_rect = pygame.Rect(tx * self.tile_size, ty * self.tile_size, self.tile_size, self.tile_size)
+                    if rect.colliderect(wall_rect):
+                        return wall_rect
+        return None
+
+    @property
+    def world_rect(self):
+        return pygame.Rect(0, 0, self.width_tiles * self.tile_size, self.height_tiles * self.tile_size)
+
+    def collides_with_walls(self, rect):
+        return self.find_wall_collision(rect) is not None
+
+    def move_and_collide(self, rect, dx, dy):
+        # Moves rect one axis at a time and snaps it flush against the wall it runs into
+        rect.x += dx
+        wall_rect = self.find_wall_collision(rect)
+        if wall_rect is not None:
+            if dx > 0:
+                rect.right = wall_rect.left
+            elif dx < 0:
+                rect.left = wall_rect.right
+            dx = 0
+
+        rect.y += dy
+        wall_rect = self.find_wall_collision(rect)
+        if wall_rect is not None:
+            if dy > 0:
+                rect.bottom = wall_rect.top
+            elif dy < 0:
+                rect.top = wall_rect.bottom
+            dy = 0
+        return dx, dy
+
+    def draw_tile(self, surface, x, y, offset=(0, 0)):
+        # offset is the world position of the surface's top-left corner
+        tile = self.tiles[y][x]
+        tile_rect = pygame.Rect(x * self.tile_size - offset[0], y * self.tile_size - offset[1], self.tile_size, self.tile_size)
+        if tile == 0:  # Wall
+            pygame.draw.rect(surface, WALL_COLOR, tile_rect)
+        elif tile == 1:  # Floor
+            pygame.draw.rect(surface, FLOOR_COLOR, tile_rect)
@@ -3,27 +3,77 @@ import random
 from characters.mage import Mage
 from core.dungeon import Dungeon
 from characters.enemies import Enemy # Ensure this is the updated Enemy class
+from characters.enemy_pool import EnemyPool, HAS_NUMPY
 from core.projectile import Projectile, VoidHoleProjectile, FireballProjectile, LightningProjectile
+from core.pathfinding import FlowField, search_stats
+from core.path_scheduler import PathScheduler, AsyncPathSolver
+from core.spatial_hash import SpatialHash
+from core.aoe import AreaEffects
+from core.crowd import CrowdSolver
+from core.dirty_renderer import DirtyRectRenderer
+from core.camera import Camera, ChunkedBackground
+from core.render_target import RenderTarget
+from core.profiler import FrameProfiler
+from ui.perf_overlay import PerformanceOverlay
+from utils.surface_cache import surface_cache
+from utils.loader import loader
+import config
+
+BACKGROUND_COLOR = (10, 10, 20)
+HEADLESS_VIEW_SIZE = (1920, 1080) # Stand-in screen size without a display, same as main.py's base size
+CULLING_MARGIN = 32 # Pixels around the viewport still drawn, health bars sit above their sprites
+INTERPOLATION_MARGIN = 64 # Enemies this far off screen still get a previous position, they can move into view in one tick
 
 class Game:
-    def __init__(self, screen):
+    def __init__(self, screen=None):
+        # screen=None runs headless (simulate.py, benchmarks): nothing touches the display,
+        # the keyboard or the mouse, and render() does nothing.
+        # With RENDER_RESOLUTION set everything draws into an off-screen surface of that
+        # size and self.screen is that surface, the real display is only touched in present()
+        self.headless = screen is None
+        self.display = screen
+        self.render_target = None
+        if not self.headless and config.RENDER_RESOLUTION is not None and screen.get_size() != tuple(config.RENDER_RESOLUTION):
+            self.render_target = RenderTarget(screen, config.RENDER_RESOLUTION, config.RENDER_SMOOTH_SCALE)
+            screen = self.render_target.surface
         self.screen = screen
         self.running = True
         self.tile_size = 32
-        self.dungeon = Dungeon(screen.get_width(), screen.get_height(), self.tile_size)
+        view_width, view_height = screen.get_size() if screen is not None else HEADLESS_VIEW_SIZE
+        world_width = config.WORLD_WIDTH or view_width
+        world_height = config.WORLD_HEIGHT or view_height
+        self.dungeon = Dungeon(world_width, world_height, self.tile_size)
+        self.camera = Camera(view_width, view_height, world_width, world_height)
+        self.chunked_background = ChunkedBackground(self.dungeon)
+        self.flow_field = FlowField(self.dungeon) if config.USE_FLOW_FIELD else None
+        if config.USE_ASYNC_PATHFINDING:
+            self.path_scheduler = AsyncPathSolver(self.dungeon)
+        elif config.USE_PATH_SCHEDULER:
+            self.path_scheduler = PathScheduler(self.dungeon)
+        else:
+            self.path_scheduler = None
 
         self.player = Mage(0, 0) 
         player_start_x, player_start_y = self.find_spawn_location()
         if player_start_x is not None and player_start_y is not None:
             self.player.rect.topleft = (player_start_x, player_start_y)
         else:
-            self.player.rect.topleft = (screen.get_width() // 2, screen.get_height() // 2)
+            self.player.rect.topleft = (view_width // 2, view_height // 2)
             print("Warning: Player spawn location not found, defaulting to center.")
 
         # Initialize enemies
         self.enemies = []
+        self.enemy_grid = SpatialHash()
+        self.crowd = CrowdSolver() if config.USE_CROWD_STEERING else None
+        self.enemy_pool = None
+        if config.USE_ENEMY_POOL:
+            if HAS_NUMPY:
+                self.enemy_pool = EnemyPool(self.dungeon, self.flow_field, self.crowd)
+            else:
+                print("Warning: USE_ENEMY_POOL needs numpy, falling back to regular enemies.")
+        self.area_effects = AreaEffects(self.enemies, self.enemy_grid, self.enemy_pool)
         self.next_enemy_id = 0 
-        self.spawn_enemies(100) 
+        self.spawn_enemies(config.ENEMY_SPAWN_COUNT)
         
         # Projectile and effects groups
         self.projectiles = pygame.sprite.Group() 
@@ -33,6 +83,20 @@ class Game:
         self.player_damage_cooldown = 0
         self.player_damage_cooldown_duration = 60
 
+        self.dirty_renderer = None
+        if config.USE_DIRTY_RECT_RENDERING and not self.headless:
+            self.dirty_renderer = DirtyRectRenderer(self, BACKGROUND_COLOR)
+        self.movement_input = None # Scripted player movement, -1..1 per axis. None reads the keyboard (standing still headless)
+
+        # Centres from before the last update, render() draws between them and now
+        self.previous_positions = {}
+        self.render_alpha = 1.0
+
+        self.profiler = FrameProfiler()
+        self.watch_counters()
+        self.profiler.set_enabled(config.PROFILER_ENABLED)
+        self.perf_overlay = PerformanceOverlay(self.profiler)
+
         print("Game initialized.")
 
     def find_spawn_location(self):
@@ -64,8 +128,12 @@ class Game:
         for _ in range(num_enemies):
             spawn_x, spawn_y = self.find_valid_spawn_location_for_enemy()
             if spawn_x is not None and spawn_y is not None:
-                new_enemy = Enemy(x=spawn_x, y=spawn_y, enemy_id=self.next_enemy_id) 
+                if self.enemy_pool is not None:
+                    new_enemy = self.enemy_pool.spawn(x=spawn_x, y=spawn_y, enemy_id=self.next_enemy_id)
+                else:
+                    new_enemy = Enemy(x=spawn_x, y=spawn_y, enemy_id=self.next_enemy_id) 
                 self.enemies.append(new_enemy) 
+                self.enemy_grid.insert(new_enemy)
                 self.next_enemy_id += 1
                 print(f"Spawned {new_enemy.name} at ({spawn_x}, {spawn_y})")
             else:
@@ -95,12 +163,23 @@ class Game:
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_ESCAPE:
                 self.running = False
+            elif event.key == pygame.K_F3:
+                self.perf_overlay.visible = not self.perf_overlay.visible
+                self.update_profiler_enabled()
+            elif event.key == pygame.K_F4:
+                if self.profiler.csv_file is None:
+                    self.profiler.start_csv(config.PROFILER_CSV_PATH)
+                    print(f"Recording frame profile to {config.PROFILER_CSV_PATH}")
+                else:
+                    self.profiler.stop_csv()
+                    print("Stopped recording frame profile.")
+                self.update_profiler_enabled()
         
         if not self.player.alive: 
             return 
         
         if event.type == pygame.KEYDOWN:
-            mouse_pos = pygame.mouse.get_pos() 
+            mouse_pos = self.camera.screen_to_world(self.mouse_position())
             if event.key == pygame.K_z:
                 self.player.use_ability(ability_name="fireball", target=mouse_pos, game_context=self)
             elif event.key == pygame.K_x:
@@ -112,7 +191,7 @@ class Game:
                 
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1: 
-                mouse_pos = pygame.mouse.get_pos()
+                mouse_pos = self.camera.screen_to_world(self.mouse_position())
                 basic_projectile = Projectile(
                     x=self.player.rect.centerx,
                     y=self.player.rect.centery,
@@ -126,58 +205,67 @@ class Game:
                 print(f"DEBUG: Player basic attack projectile created towards {mouse_pos}")
 
 
+    def watch_counters(self):
+        # Running totals kept elsewhere, the profiler books how much each moved per frame
+        profiler = self.profiler
+        profiler.watch("astar_calls", lambda: sum(stats["queries"] for stats in search_stats.values()))
+        profiler.watch("nodes_expanded", lambda: sum(stats["nodes_expanded"] for stats in search_stats.values()))
+        profiler.watch("wall_checks", lambda: self.dungeon.wall_checks)
+        profiler.watch("hash_candidates", lambda: self.enemy_grid.candidates_tested)
+        if self.crowd is not None:
+            profiler.watch("crowd_pairs", lambda: self.crowd.pairs_tested)
+        # Surfaces our own caches built (effect cache misses, camera chunks, sprite table
+        # entries), not every pygame.Surface, so only an estimate
+        profiler.watch("surface_builds_est", lambda: surface_cache.misses + self.chunked_background.chunks_built + len(loader.images))
+        profiler.watch("enemies", lambda: sum(1 for enemy in self.enemies if enemy.alive), is_total=False)
+
+    def update_profiler_enabled(self):
+        # On while anything wants its numbers: the config flag, the overlay or a CSV recording
+        enabled = config.PROFILER_ENABLED or self.perf_overlay.visible or self.profiler.csv_file is not None
+        if enabled != self.profiler.enabled:
+            self.profiler.set_enabled(enabled)
+
     def update(self):
         if not self.running:
             return
+        profiler = self.profiler
+        profiler.start()
 
-        keys = pygame.key.get_pressed()
+        if isinstance(self.path_scheduler, AsyncPathSolver):
+            self.path_scheduler.deliver_results()
+
+        # draw() snaps rects back onto pixel_pos, pick that up before anything queries the hash.
+        # Pooled rects only ever change through the pool, which says which ones did
+        if self.enemy_pool is not None:
+            for enemy in self.enemy_pool.take_changed_views():
+                self.enemy_grid.update(enemy)
+        else:
+            for enemy in self.enemies:
+                self.enemy_grid.update(enemy)
+        self.snapshot_positions()
+        profiler.lap("sync")
 
         if self.player.alive:
             dx, dy = 0, 0
-            left = keys[pygame.K_a] or keys[pygame.K_LEFT]
-            right = keys[pygame.K_d] or keys[pygame.K_RIGHT]
-            up = keys[pygame.K_w] or keys[pygame.K_UP]
-            down = keys[pygame.K_s] or keys[pygame.K_DOWN]
+            if self.movement_input is not None:
+                move_x, move_y = self.movement_input
+            elif self.headless:
+                move_x, move_y = 0, 0
+            else:
+                keys = pygame.key.get_pressed()
+                move_x = (keys[pygame.K_d] or keys[pygame.K_RIGHT]) - (keys[pygame.K_a] or keys[pygame.K_LEFT])
+                move_y = (keys[pygame.K_s] or keys[pygame.K_DOWN]) - (keys[pygame.K_w] or keys[pygame.K_UP])
+            profiler.lap("input")
 
-            movement_vector = pygame.math.Vector2(right - left, down - up)
+            movement_vector = pygame.math.Vector2(move_x, move_y)
             if movement_vector.length_squared() > 0:
                 movement_vector.scale_to_length(self.player.speed)
                 dx, dy = movement_vector.x, movement_vector.y
 
-            original_player_x = self.player.rect.x
-            original_player_y = self.player.rect.y
-
-            self.player.rect.x += dx
-            for y_tile in range(self.dungeon.height_tiles):
-                for x_tile in range(self.dungeon.width_tiles):
-                    if self.dungeon.tiles[y_tile][x_tile] == 0:
-                        wall_rect = pygame.Rect(x_tile * self.tile_size, y_tile * self.tile_size, self.tile_size, self.tile_size)
-                        if self.player.rect.colliderect(wall_rect):
-                            if dx > 0:
-                                self.player.rect.right = wall_rect.left
-                            elif dx < 0:
-                                self.player.rect.left = wall_rect.right
-                            dx = 0
-                            break
-                if dx == 0 and self.player.rect.x != original_player_x :
-                    break 
-
-            self.player.rect.y += dy
-            for y_tile in range(self.dungeon.height_tiles):
-                for x_tile in range(self.dungeon.width_tiles):
-                    if self.dungeon.tiles[y_tile][x_tile] == 0:
-                        wall_rect = pygame.Rect(x_tile * self.tile_size, y_tile * self.tile_size, self.tile_size, self.tile_size)
-                        if self.player.rect.colliderect(wall_rect):
-                            if dy > 0:
-                                self.player.rect.bottom = wall_rect.top
-                            elif dy < 0:
-                                self.player.rect.top = wall_rect.bottom
-                            dy = 0
-                            break
-                if dy == 0 and self.player.rect.y != original_player_y:
-                    break
+            self.dungeon.move_and_collide(self.player.rect, dx, dy)
 
             self.player.update_cooldowns()
+        profiler.lap("player_move")
 
         for projectile in list(self.projectiles): 
             if not projectile.alive(): 
@@ -187,7 +275,7 @@ class Game:
             last_known_center = projectile.rect.center 
 
             if isinstance(projectile, VoidHoleProjectile):
-                projectile.update(self.enemies, self.dungeon.tiles, self.dungeon.tile_size)
+                projectile.update(self.enemies, self.dungeon, self.area_effects)
             else:
                 projectile.update() 
 
@@ -195,24 +283,25 @@ class Game:
                 if isinstance(projectile, FireballProjectile): 
                     if hasattr(projectile, 'is_exploding_on_impact') and projectile.is_exploding_on_impact:
                         print(f"DEBUG Game.update: Fireball (killed by its update) - exploding at {last_known_center}")
-                        projectile.explode(self.enemies, last_known_center)
+                        projectile.explode(self.enemies, last_known_center, self.area_effects)
                 self.projectiles.remove(projectile) 
                 continue 
             
             if not isinstance(projectile, (LightningProjectile, VoidHoleProjectile)):
-                enemies_hit = pygame.sprite.spritecollide(projectile, self.enemies, False, pygame.sprite.collide_rect)
+                enemies_hit = self.enemy_grid.query_rect(projectile.rect)
                 if enemies_hit:
-                    target_enemy = enemies_hit[0] 
+                    target_enemy = min(enemies_hit, key=lambda enemy: enemy.id) # First one in the enemy list, like spritecollide gave
                     if target_enemy.alive:
                         print(f"DEBUG Game.update: GENERIC projectile ({type(projectile).__name__}) hit {target_enemy.name}")
                         target_enemy.take_damage(projectile.damage)
                     
                     if isinstance(projectile, FireballProjectile):
                         print(f"DEBUG Game.update: Fireball (hit enemy via spritecollide) - exploding at {target_enemy.rect.center}")
-                        projectile.explode(self.enemies, target_enemy.rect.center)
+                        projectile.explode(self.enemies, target_enemy.rect.center, self.area_effects)
                     
                     if not isinstance(projectile, FireballProjectile) or not projectile.is_exploding_on_impact:
                          projectile.kill() 
+        profiler.lap("projectiles")
 
         for effect in list(self.active_aoe_effects): 
             if not effect.alive():
@@ -220,24 +309,54 @@ class Game:
                 continue
 
             if isinstance(effect, VoidHoleProjectile): 
-                effect.update(self.enemies, self.dungeon.tiles, self.dungeon.tile_size)
+                effect.update(self.enemies, self.dungeon, self.area_effects)
             
             if not effect.alive(): 
                 self.active_aoe_effects.remove(effect)
+        profiler.lap("aoe_effects")
+
+        if self.flow_field is not None:
+            self.flow_field.update((int(self.player.rect.centerx // self.tile_size),
+                                    int(self.player.rect.centery // self.tile_size)))
 
-        for enemy in list(self.enemies): 
-            if enemy.alive:
-                enemy.update(self.player, self.dungeon, self.enemies)
-            else: 
-                if enemy in self.enemies: 
-                    self.enemies.remove(enemy)
+        if self.enemy_pool is not None:
+            # Moves the whole horde in one go, only the enemies whose rects changed and the
+            # dead need touching afterwards
+            self.enemy_pool.update(self.player)
+            for enemy in self.enemy_pool.take_changed_views():
+                self.enemy_grid.update(enemy)
+            dead_enemies = self.enemy_pool.remove_dead()
+            if dead_enemies:
+                self.enemies[:] = [enemy for enemy in self.enemies if enemy.alive] # In place, AreaEffects holds this list
+                for enemy in dead_enemies:
+                    self.enemy_grid.remove(enemy)
                     print(f"DEBUG: Removed dead {enemy.name} from game enemy list.")
+        else:
+            if self.crowd is not None:
+                # Separation for everyone from this frame's positions, each Enemy.update steers with it
+                self.crowd.update(self.enemies)
+
+            for enemy in list(self.enemies): 
+                if enemy.alive:
+                    enemy.update(self.player, self.dungeon, self.enemies, game_context=self)
+                    # Moves, stun outlines and void hole pulls all change the rect
+                    self.enemy_grid.update(enemy)
+                else: 
+                    if enemy in self.enemies: 
+                        self.enemies.remove(enemy)
+                        self.enemy_grid.remove(enemy)
+                        print(f"DEBUG: Removed dead {enemy.name} from game enemy list.")
+        profiler.lap("enemies")
+
+        if self.path_scheduler is not None:
+            self.path_scheduler.process()
+        profiler.lap("pathfinding")
 
         if self.player.alive:
             if self.player_damage_cooldown > 0:
                 self.player_damage_cooldown -= 1
             else:
-                for enemy in self.enemies: 
+                for enemy in sorted(self.enemy_grid.query_rect(self.player.rect), key=lambda enemy: enemy.id): 
                     if enemy.alive and self.player.rect.colliderect(enemy.rect):
                         print(f"DEBUG: Player collided with {enemy.name}")
                         self.player.take_damage(enemy.damage) 
@@ -245,24 +364,117 @@ class Game:
                         if not self.player.alive: 
                             print("GAME OVER - Player has been defeated.")
                         break 
+        profiler.lap("contact_damage")
+        if self.headless:
+            # No render to finish the frame
+            profiler.end_frame()
 
-    def render(self):
-        self.screen.fill((10, 10, 20)) 
+    def shutdown(self):
+        if isinstance(self.path_scheduler, AsyncPathSolver):
+            self.path_scheduler.shutdown()
+        self.profiler.stop_csv()
+
+    def snapshot_positions(self):
+        # Where everything near the screen is before this tick moves it
+        if self.headless or not config.INTERPOLATE_RENDERING:
+            return
+        nearby = self.camera.viewport.inflate(2 * INTERPOLATION_MARGIN, 2 * INTERPOLATION_MARGIN)
+        positions = {self.player: self.player.rect.center}
+        for enemy in self.enemy_grid.query_rect(nearby):
+            positions[enemy] = enemy.rect.center
+        for sprite in self.projectiles:
+            positions[sprite] = sprite.rect.center
+        for effect in self.active_aoe_effects:
+            positions[effect] = effect.rect.center
+        self.previous_positions = positions
+
+    def draw_offset(self, entity):
+        # How far back toward its previous position entity is drawn this frame
+        if self.render_alpha >= 1.0:
+            return (0, 0)
+        previous = self.previous_positions.get(entity)
+        if previous is None:
+            return (0, 0)
+        back = 1.0 - self.render_alpha
+        return (round((previous[0] - entity.rect.centerx) * back), round((previous[1] - entity.rect.centery) * back))
+
+    def draw_interpolated(self, entity, surface, camera, draw=None):
+        # entity.draw() (or draw) with the camera nudged so the entity lands at its interpolated spot
+        offset_x, offset_y = self.draw_offset(entity)
+        camera.x -= offset_x
+        camera.y -= offset_y
+        (draw or entity.draw)(surface, camera)
+        camera.x += offset_x
+        camera.y += offset_y
+
+    def render(self, alpha=1.0):
+        # alpha is how far we are between the last tick and the next (core/game_loop.py)
+        if self.headless:
+            return
+        self.profiler.start()
+        if self.dirty_renderer is not None:
+            # Its rects come from the real positions, so no interpolation there
+            self.render_alpha = 1.0
+            self.dirty_renderer.render()
+            return
+        self.render_alpha = alpha if config.INTERPOLATE_RENDERING else 1.0
+
+        self.screen.fill(BACKGROUND_COLOR) 
         
-        self.dungeon.draw(self.screen)
+        self.camera.follow(self.player.rect.move(self.draw_offset(self.player)))
+        self.chunked_background.draw(self.screen, self.camera)
+        self.profiler.lap("background")
+        self.draw_entities(self.screen)
         
+        self.present()
+
+    def present(self, rects=None):
+        # Shows the finished frame, only the given screen rects of it if there are any
+        profiler = self.profiler
+        overlay_rect = self.perf_overlay.draw(self.screen)
+        if overlay_rect is not None and rects is not None:
+            rects = rects + [overlay_rect]
+        profiler.lap("overlay")
+        if self.render_target is not None:
+            self.render_target.present(rects)
+        elif rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update(rects)
+        profiler.lap("present")
+        profiler.end_frame()
+
+    def mouse_position(self):
+        # Mouse in self.screen pixels, which aren't display pixels with a render target
+        if self.render_target is not None:
+            return self.render_target.to_internal(pygame.mouse.get_pos())
+        return pygame.mouse.get_pos()
+
+    def draw_entities(self, surface):
+        # Only what overlaps the viewport is drawn, with a margin for health bars and void hole circles
+        camera = self.camera
+        viewport = camera.viewport
+        padded_viewport = viewport.inflate(2 * CULLING_MARGIN, 2 * CULLING_MARGIN)
+        profiler = self.profiler
+
         if self.player.alive:
-            self.player.draw(self.screen)
+            self.draw_interpolated(self.player, surface, camera)
+        profiler.lap("draw_player")
             
-        for enemy in self.enemies: 
+        for enemy in sorted(self.enemy_grid.query_rect(padded_viewport), key=lambda enemy: enemy.id): 
             if enemy.alive: 
-                enemy.draw(self.screen)
+                self.draw_interpolated(enemy, surface, camera)
+        profiler.lap("draw_enemies")
         
-        self.projectiles.draw(self.screen) 
+        for projectile in self.projectiles:
+            if viewport.colliderect(projectile.rect):
+                surface.blit(projectile.image, camera.apply(projectile.rect).move(self.draw_offset(projectile)))
+        profiler.lap("draw_projectiles")
 
-        self.active_aoe_effects.draw(self.screen)
+        for effect in self.active_aoe_effects:
+            if padded_viewport.colliderect(effect.rect):
+                surface.blit(effect.image, camera.apply(effect.rect).move(self.draw_offset(effect)))
         for effect in self.active_aoe_effects: 
             if hasattr(effect, 'draw_debug'):
-                effect.draw_debug(self.screen)
-        
-        pygame.display.flip()
+                self.draw_interpolated(effect, surface, camera, effect.draw_debug)
+        profiler.lap("draw_effects")
@@ -0,0 +1,55 @@
+import pygame
+import config
+
+class FixedTimestepLoop:
+    # Runs Game.update at a fixed TICK_RATE however fast frames come out. Real time goes
+    # into an accumulator, every full tick in it is simulated, and the leftover fraction
+    # is handed to render() so it can draw between the last two ticks. Frames are capped
+    # at MAX_FPS so the CPU isn't spinning on frames nobody sees, and can be well under
+    # the tick rate.
+    def __init__(self, game, tick_rate=None, max_fps=None, max_ticks_per_frame=None):
+        self.game = game
+        self.tick_rate = config.TICK_RATE if tick_rate is None else tick_rate
+        self.max_fps = config.MAX_FPS if max_fps is None else max_fps
+        self.max_ticks_per_frame = config.MAX_TICKS_PER_FRAME if max_ticks_per_frame is None else max_ticks_per_frame
+        self.tick_ms = 1000 / self.tick_rate
+        self.clock = pygame.time.Clock()
+        self.accumulator = 0.0
+        self.ticks = 0
+        self.frames = 0
+        self.dropped_ms = 0.0
+
+    def step(self, elapsed_ms):
+        # Feeds elapsed_ms of real time in and runs the ticks that are due, returns how many
+        self.accumulator += elapsed_ms
+        ticks_run = 0
+        while self.accumulator >= self.tick_ms and ticks_run < self.max_ticks_per_frame:
+            self.game.update()
+            self.accumulator -= self.tick_ms
+            self.ticks += 1
+            ticks_run += 1
+        if self.accumulator >= self.tick_ms:
+            # Can't keep up (or we were paused in a debugger): let the game slow down
+            # instead of trying to catch up forever
+            kept = self.accumulator % self.tick_ms
+            self.dropped_ms += self.accumulator - kept
+            self.accumulator = kept
+        return ticks_run
+
+    def alpha(self):
+        # How far we are between the last tick and the next one, 0..1
+        return self.accumulator / self.tick_ms
+
+    def run(self):
+        game = self.game
+        self.clock.tick()
+        while game.running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    game.running = False
+                game.handle_input(event)
+            if not game.running:
+                break
+            self.step(self.clock.tick(self.max_fps))
+            game.render(self.alpha())
+            self.frames += 1
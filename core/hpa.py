@@ -0,0 +1,277 @@
+import heapq
+from collections import deque
+import config
+from core.pathfinding import NEIGHBOR_MOVES, STRAIGHT_COST, octile_distance
+
+ENTRANCE_SPLIT_LENGTH = 6 # Border openings at least this wide get a transition at each end instead of one in the middle
+
+class HierarchicalPathfinder:
+    # HPA*: the map is cut into square clusters, every opening along a cluster border gets
+    # one or two transition tiles, and the distances between transitions inside each cluster
+    # are worked out up front. A query only searches that small abstract graph and then
+    # fills in real tiles for the first few legs, the rest is refined when the enemy
+    # asks again from further along.
+    # Moves cost 1 like everywhere else, so clusters are searched with plain BFS.
+    # Paths are near-shortest, not shortest: they go through the transition tiles, which
+    # costs up to about 1.4x the optimal length. Only paths a few tiles long that cross a
+    # cluster border come out worse, up to 2.5x in benchmarks/pathfinding.py (which prints
+    # the worst ratio per map).
+    def __init__(self, dungeon_tiles, cluster_size=None):
+        self.tiles = dungeon_tiles
+        self.width = len(dungeon_tiles[0])
+        self.height = len(dungeon_tiles)
+        self.cluster_size = config.HPA_CLUSTER_SIZE if cluster_size is None else cluster_size
+        self.cluster_columns = (self.width + self.cluster_size - 1) // self.cluster_size
+        self.cluster_rows = (self.height + self.cluster_size - 1) // self.cluster_size
+
+        self.border_links = {} # (cluster_a, cluster_b) -> [(tile_in_a, tile_in_b), ...]
+        self.inter_links = {} # transition tile -> set of transition tiles across a border
+        self.intra_edges = {} # cluster -> {transition tile: {transition tile: distance}}
+        self.nodes_expanded = 0
+        self.clusters_rebuilt = 0
+
+        for cluster_y in range(self.cluster_rows):
+            for cluster_x in range(self.cluster_columns):
+                if cluster_x + 1 < self.cluster_columns:
+                    self._build_border((cluster_x, cluster_y), (cluster_x + 1, cluster_y))
+                if cluster_y + 1 < self.cluster_rows:
+                    self._build_border((cluster_x, cluster_y), (cluster_x, cluster_y + 1))
+        for cluster_y in range(self.cluster_rows):
+            for cluster_x in range(self.cluster_columns):
+                self._build_intra_edges((cluster_x, cluster_y))
+
+    def cluster_of(self, tile):
+        return (tile[0] // self.cluster_size, tile[1] // self.cluster_size)
+
+    def _cluster_bounds(self, cluster):
+        min_x = cluster[0] * self.cluster_size
+        min_y = cluster[1] * self.cluster_size
+        return min_x, min_y, min(min_x + self.cluster_size, self.width), min(min_y + self.cluster_size, self.height)
+
+    def _is_floor(self, x, y):
+        return self.tiles[y][x] == 1
+
+    def _build_border(self, cluster_a, cluster_b):
+        # cluster_b is always to the right of or below cluster_a
+        key = (cluster_a, cluster_b)
+        for tile_a, tile_b in self.border_links.get(key, ()):
+            self.inter_links[tile_a].discard(tile_b)
+            self.inter_links[tile_b].discard(tile_a)
+
+        min_x, min_y, max_x, max_y = self._cluster_bounds(cluster_a)
+        if cluster_b[0] != cluster_a[0]:
+            side_a = [(max_x - 1, y) for y in range(min_y, max_y)]
+            side_b = [(max_x, y) for y in range(min_y, max_y)]
+        else:
+            side_a = [(x, max_y - 1) for x in range(min_x, max_x)]
+            side_b = [(x, max_y) for x in range(min_x, max_x)]
+
+        links = []
+        run_start = None
+        for i in range(len(side_a) + 1):
+            is_open = i < len(side_a) and self._is_floor(*side_a[i]) and self._is_floor(*side_b[i])
+            if is_open and run_start is None:
+                run_start = i
+            elif not is_open and run_start is not None:
+                run_end = i - 1
+                if run_end - run_start + 1 >= ENTRANCE_SPLIT_LENGTH:
+                    picks = (run_start, run_end)
+                else:
+                    picks = ((run_start + run_end) // 2,)
+                for pick in picks:
+                    links.append((side_a[pick], side_b[pick]))
+                run_start = None
+
+        self.border_links[key] = links
+        for tile_a, tile_b in links:
+            self.inter_links.setdefault(tile_a, set()).add(tile_b)
+            self.inter_links.setdefault(tile_b, set()).add(tile_a)
+
+    def _cluster_transitions(self, cluster):
+        transitions = set()
+        cluster_x, cluster_y = cluster
+        for key in (((cluster_x - 1, cluster_y), cluster), ((cluster_x, cluster_y - 1), cluster),
+                    (cluster, (cluster_x + 1, cluster_y)), (cluster, (cluster_x, cluster_y + 1))):
+            for tile_a, tile_b in self.border_links.get(key, ()):
+                transitions.add(tile_a if key[0] == cluster else tile_b)
+        return transitions
+
+    def _cluster_bfs(self, cluster, source_tile):
+        # Distances and parents inside one cluster only
+        min_x, min_y, max_x, max_y = self._cluster_bounds(cluster)
+        tiles = self.tiles
+        distances = {source_tile: 0}
+        parents = {source_tile: None}
+        frontier = deque([source_tile])
+        while frontier:
+            current = frontier.popleft()
+            x, y = current
+            next_distance = distances[current] + 1
+            for move_x, move_y in NEIGHBOR_MOVES:
+                nx = x + move_x
+                ny = y + move_y
+                if not (min_x <= nx < max_x and min_y <= ny < max_y):
+                    continue
+                neighbor = (nx, ny)
+                if neighbor in distances or tiles[ny][nx] != 1:
+                    continue
+                if move_x != 0 and move_y != 0 and tiles[y][nx] == 0 and tiles[ny][x] == 0:
+                    continue
+                distances[neighbor] = next_distance
+                parents[neighbor] = current
+                frontier.append(neighbor)
+        return distances, parents
+
+    def _build_intra_edges(self, cluster):
+        transitions = self._cluster_transitions(cluster)
+        edges = {}
+        for transition in transitions:
+            distances, _ = self._cluster_bfs(cluster, transition)
+            edges[transition] = {
+                other: distances[other] for other in transitions
+                if other != transition and other in distances
+            }
+        self.intra_edges[cluster] = edges
+        self.clusters_rebuilt += 1
+
+    def tile_changed(self, x, y):
+        # Only the cluster holding the tile needs new distances, unless the tile sits on a
+        # cluster edge: then the shared border and the cluster across it are redone as well
+        cluster = self.cluster_of((x, y))
+        cluster_x, cluster_y = cluster
+        min_x, min_y, max_x, max_y = self._cluster_bounds(cluster)
+        touched = {cluster}
+
+        if x == min_x and cluster_x > 0:
+            touched.add((cluster_x - 1, cluster_y))
+            self._build_border((cluster_x - 1, cluster_y), cluster)
+        if x == max_x - 1 and cluster_x + 1 < self.cluster_columns:
+            touched.add((cluster_x + 1, cluster_y))
+            self._build_border(cluster, (cluster_x + 1, cluster_y))
+        if y == min_y and cluster_y > 0:
+            touched.add((cluster_x, cluster_y - 1))
+            self._build_border((cluster_x, cluster_y - 1), cluster)
+        if y == max_y - 1 and cluster_y + 1 < self.cluster_rows:
+            touched.add((cluster_x, cluster_y + 1))
+            self._build_border(cluster, (cluster_x, cluster_y + 1))
+
+        for touched_cluster in touched:
+            self._build_intra_edges(touched_cluster)
+
+    def find_path(self, start_tile, goal_tile, refine_all=False):
+        self.nodes_expanded = 0
+        if not (0 <= start_tile[0] < self.width and 0 <= start_tile[1] < self.height) or \
+           not (0 <= goal_tile[0] < self.width and 0 <= goal_tile[1] < self.height):
+            return None
+
+        if goal_tile != start_tile and self.tiles[goal_tile[1]][goal_tile[0]] != 1:
+            return None
+
+        start_cluster = self.cluster_of(start_tile)
+        goal_cluster = self.cluster_of(goal_tile)
+        start_distances, start_parents = self._cluster_bfs(start_cluster, start_tile)
+
+        if start_cluster == goal_cluster and goal_tile in start_distances:
+            return self._walk_parents(start_parents, goal_tile)[::-1]
+
+        goal_distances, goal_parents = self._cluster_bfs(goal_cluster, goal_tile)
+        abstract_path = self._search_abstract(start_tile, goal_tile, start_cluster, goal_cluster,
+                                              start_distances, goal_distances)
+        if abstract_path is None:
+            return None
+
+        # Turn the first few abstract legs into real tiles, about a cluster's worth of steps,
+        # unless the whole path was asked for
+        path = [start_tile]
+        for leg_start, leg_end in zip(abstract_path, abstract_path[1:]):
+            if not refine_all and len(path) > self.cluster_size:
+                break
+            if leg_start == start_tile and leg_end in start_parents:
+                path.extend(self._walk_parents(start_parents, leg_end)[::-1][1:])
+            elif leg_end == goal_tile and leg_start in goal_parents:
+                path.extend(self._walk_parents(goal_parents, leg_start)[1:])
+            elif leg_end in self.inter_links.get(leg_start, ()):
+                path.append(leg_end)
+            else:
+                _, leg_parents = self._cluster_bfs(self.cluster_of(leg_start), leg_start)
+                path.extend(self._walk_parents(leg_parents, leg_end)[::-1][1:])
+        return path
+
+    def _walk_parents(self, parents, tile):
+        # Tiles from tile back to the BFS source
+        steps = []
+        while tile is not None:
+            steps.append(tile)
+            tile = parents[tile]
+        return steps
+
+    def _search_abstract(self, start_tile, goal_tile, start_cluster, goal_cluster, start_distances, goal_distances):
+        # start and goal are only linked into the graph for this query, through the
+        # transitions their own clusters can reach
+        start_edges = {
+            transition: start_distances[transition]
+            for transition in self.intra_edges[start_cluster] if transition in start_distances
+        }
+        goal_edges = {
+            transition: goal_distances[transition]
+            for transition in self.intra_edges[goal_cluster] if transition in goal_distances
+        }
+
+        g_score = {start_tile: 0}
+        parents = {start_tile: None}
+        closed = set()
+        counter = 0
+        open_heap = [(octile_distance(goal_tile[0] - start_tile[0], goal_tile[1] - start_tile[1]), 0, counter, start_tile)]
+
+        while open_heap:
+            _, _, _, current = heapq.heappop(open_heap)
+            if current in closed:
+                continue
+            if current == goal_tile:
+                path = []
+                while current is not None:
+                    path.append(current)
+                    current = parents[current]
+                return path[::-1]
+            closed.add(current)
+            self.nodes_expanded += 1
+
+            if current == start_tile:
+                neighbors = list(start_edges.items())
+            else:
+                neighbors = list(self.intra_edges[self.cluster_of(current)].get(current, {}).items())
+            neighbors.extend((other, STRAIGHT_COST) for other in self.inter_links.get(current, ()))
+            if current in goal_edges:
+                neighbors.append((goal_tile, goal_edges[current]))
+
+            current_g = g_score[current]
+            for neighbor, cost in neighbors:
+                if neighbor in closed:
+                    continue
+                tentative_g = current_g + cost
+                if tentative_g >= g_score.get(neighbor, tentative_g + 1):
+                    continue
+                g_score[neighbor] = tentative_g
+                parents[neighbor] = current
+                neighbor_h = octile_distance(goal_tile[0] - neighbor[0], goal_tile[1] - neighbor[1])
+                counter += 1
+                heapq.heappush(open_heap, (tentative_g + neighbor_h, neighbor_h, counter, neighbor))
+        return None
+
+# One prebuilt hierarchy per tile grid, same as the GridAStar engines
+MAX_CACHED_HIERARCHIES = 4
+_hierarchies = {}
+
+def get_hierarchical_pathfinder(dungeon_tiles):
+    hierarchy = _hierarchies.get(id(dungeon_tiles))
+    if hierarchy is None or hierarchy.tiles is not dungeon_tiles:
+        if len(_hierarchies) >= MAX_CACHED_HIERARCHIES:
+            del _hierarchies[next(iter(_hierarchies))]
+        hierarchy = HierarchicalPathfinder(dungeon_tiles)
+        _hierarchies[id(dungeon_tiles)] = hierarchy
+    return hierarchy
+
+def tile_changed(dungeon_tiles, x, y):
+    hierarchy = _hierarchies.get(id(dungeon_tiles))
+    if hierarchy is not None and hierarchy.tiles is dungeon_tiles:
+        hierarchy.tile_changed(x, y)
@@ -0,0 +1,287 @@
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, BrokenExecutor
+from multiprocessing import shared_memory
+import config
+from characters.enemies import cached_astar_pathfind
+from core.pathfinding import GridAStar, record_search, HEURISTIC_MANHATTAN, ALGORITHM_ASTAR, ALGORITHM_JPS, ALGORITHM_HPA
+from core.hpa import HierarchicalPathfinder
+
+PRIORITY_NEAREST = "nearest" # Enemies closest to their goal (the player) first
+PRIORITY_OLDEST = "oldest" # Longest waiting requests first
+
+class PathRequest:
+    def __init__(self, enemy, goal_pixel, submitted_frame):
+        self.enemy = enemy
+        self.goal_pixel = goal_pixel
+        self.submitted_frame = submitted_frame
+
+def is_reachable_from(dungeon, enemy, goal_pixel):
+    tile_size = dungeon.tile_size
+    return dungeon.is_reachable((int(enemy.rect.centerx // tile_size), int(enemy.rect.centery // tile_size)),
+                                (int(goal_pixel[0] // tile_size), int(goal_pixel[1] // tile_size)))
+
+class PathScheduler:
+    # Enemies hand their path requests in here instead of running A* inline, and
+    # process() works through them in priority order until the frame budget is spent.
+    # Whatever is left over waits for the next frame while those enemies keep walking
+    # their old path.
+    def __init__(self, dungeon, budget_ms=None, priority=None, max_wait_frames=None):
+        self.dungeon = dungeon
+        self.budget_ms = config.PATHFINDING_FRAME_BUDGET_MS if budget_ms is None else budget_ms
+        self.priority = config.PATHFINDING_PRIORITY if priority is None else priority
+        self.max_wait_frames = config.PATHFINDING_MAX_WAIT_FRAMES if max_wait_frames is None else max_wait_frames
+        self.pending = {} # enemy id -> PathRequest, one live request per enemy
+        self.frame = 0
+
+        self.paths_solved = 0
+        self.last_frame_solved = 0
+        self.last_frame_ms = 0.0
+
+    def request_path(self, enemy, goal_pixel):
+        if not is_reachable_from(self.dungeon, enemy, goal_pixel):
+            # Nothing to queue, a search would only flood the enemy's whole region
+            self.cancel(enemy)
+            enemy.set_path(None, self.dungeon)
+            return
+        request = self.pending.get(enemy.id)
+        if request is None:
+            self.pending[enemy.id] = PathRequest(enemy, goal_pixel, self.frame)
+        else:
+            # Re-requesting just moves the goal, the enemy keeps its place in the queue
+            request.goal_pixel = goal_pixel
+
+    def cancel(self, enemy):
+        self.pending.pop(enemy.id, None)
+
+    def has_pending(self, enemy):
+        return enemy.id in self.pending
+
+    def _priority_key(self, request):
+        waited = self.frame - request.submitted_frame
+        overdue = 0 if waited >= self.max_wait_frames else 1 # Starved requests jump the queue
+        if self.priority == PRIORITY_OLDEST:
+            return (overdue, request.submitted_frame)
+        enemy_x, enemy_y = request.enemy.rect.center
+        dx = enemy_x - request.goal_pixel[0]
+        dy = enemy_y - request.goal_pixel[1]
+        return (overdue, dx * dx + dy * dy, request.submitted_frame)
+
+    def process(self):
+        self.frame += 1
+        self.last_frame_solved = 0
+        if not self.pending:
+            self.last_frame_ms = 0.0
+            return 0
+
+        start_time = time.perf_counter()
+        deadline = start_time + self.budget_ms / 1000.0
+        dungeon = self.dungeon
+
+        for request in sorted(self.pending.values(), key=self._priority_key):
+            # Always solve at least one so a tiny budget can't stall everyone
+            if self.last_frame_solved > 0 and time.perf_counter() >= deadline:
+                break
+
+            enemy = request.enemy
+            del self.pending[enemy.id]
+            if not enemy.alive:
+                continue
+
+            # Solve from where the enemy is now, not where it was when it asked. A wall placed
+            # since then may have cut it off
+            if is_reachable_from(dungeon, enemy, request.goal_pixel):
+                path = cached_astar_pathfind(dungeon, enemy.rect.center, request.goal_pixel)
+            else:
+                path = None
+            enemy.set_path(path, dungeon)
+            self.last_frame_solved += 1
+
+        self.paths_solved += self.last_frame_solved
+        self.last_frame_ms = (time.perf_counter() - start_time) * 1000.0
+        return self.last_frame_solved
+
+
+WORKER_ALGORITHMS = (ALGORITHM_ASTAR, ALGORITHM_JPS, ALGORITHM_HPA)
+
+# Each worker thread (or process) keeps its own engines, GridAStar's arrays aren't shareable
+_worker_state = threading.local()
+
+def _read_snapshot(snapshot, size):
+    # Threads get the bytes themselves, processes the name of the shared memory block
+    # AsyncPathSolver wrote them to, so the map is copied once per version, not per request
+    if not isinstance(snapshot, str):
+        return snapshot
+    block = shared_memory.SharedMemory(name=snapshot)
+    try:
+        return bytes(block.buf[:size])
+    finally:
+        block.close()
+
+def solve_on_snapshot(snapshot, width, height, snapshot_version, start_tile, goal_tile, algorithm):
+    # Returns the path, the nodes expanded and the algorithm that actually ran
+    if getattr(_worker_state, 'snapshot_version', None) != snapshot_version:
+        tiles = _read_snapshot(snapshot, width * height)
+        _worker_state.rows = [tiles[y * width:(y + 1) * width] for y in range(height)]
+        _worker_state.engine = None
+        _worker_state.hierarchy = None
+        _worker_state.snapshot_version = snapshot_version
+
+    if algorithm == ALGORITHM_HPA:
+        if _worker_state.hierarchy is None:
+            _worker_state.hierarchy = HierarchicalPathfinder(_worker_state.rows)
+        hierarchy = _worker_state.hierarchy
+        return hierarchy.find_path(start_tile, goal_tile), hierarchy.nodes_expanded, algorithm
+
+    if _worker_state.engine is None:
+        _worker_state.engine = GridAStar(_worker_state.rows)
+    engine = _worker_state.engine
+    if algorithm == ALGORITHM_JPS:
+        path = engine.find_path_jps(start_tile, goal_tile)
+    else:
+        path = engine.find_path(start_tile, goal_tile, heuristic=HEURISTIC_MANHATTAN)
+        algorithm = ALGORITHM_ASTAR
+    return path, engine.nodes_expanded, algorithm
+
+class AsyncPathSolver:
+    # Same request_path() front end as PathScheduler, but the searches run on a
+    # concurrent.futures pool against a read-only bytes snapshot of Dungeon.tiles. Finished
+    # paths are handed back to their enemies by deliver_results() at the start of the next
+    # Game.update, so a long search never holds up a frame.
+    def __init__(self, dungeon, workers=None, use_processes=None):
+        self.dungeon = dungeon
+        self.workers = config.PATHFINDING_WORKERS if workers is None else workers
+        self.use_processes = config.PATHFINDING_USE_PROCESSES if use_processes is None else use_processes
+        self.executor = self._make_executor()
+        self.in_flight = {} # enemy id -> (enemy, future, start tile, goal tile, snapshot version)
+        self.requeued_goals = {} # enemy id -> newest goal asked for while a search was running
+        self.snapshot = None # The tile bytes, or with processes the shared memory block's name
+        self.snapshot_version = None
+        self.shared_blocks = {} # snapshot version -> SharedMemory, freed once nothing in flight uses it
+
+        self.algorithm = config.PATHFINDING_ALGORITHM
+        if self.algorithm not in WORKER_ALGORITHMS:
+            print(f"Warning: unknown PATHFINDING_ALGORITHM '{self.algorithm}' for the worker pool, using astar.")
+            self.algorithm = ALGORITHM_ASTAR
+
+        self.paths_solved = 0
+        self.last_frame_solved = 0
+
+    def _make_executor(self):
+        if self.use_processes:
+            return ProcessPoolExecutor(max_workers=self.workers)
+        return ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pathfinding")
+
+    def _current_snapshot(self):
+        if self.snapshot_version != self.dungeon.version:
+            tiles = bytes(tile for row in self.dungeon.tiles for tile in row)
+            self.snapshot_version = self.dungeon.version
+            if self.use_processes:
+                block = shared_memory.SharedMemory(create=True, size=len(tiles))
+                block.buf[:len(tiles)] = tiles
+                self.shared_blocks[self.snapshot_version] = block
+                self.snapshot = block.name
+            else:
+                self.snapshot = tiles
+            self._free_shared_blocks()
+        return self.snapshot
+
+    def _free_shared_blocks(self, everything=False):
+        in_use = {entry[4] for entry in self.in_flight.values()}
+        for version, block in list(self.shared_blocks.items()):
+            if everything or (version != self.snapshot_version and version not in in_use):
+                block.close()
+                block.unlink()
+                del self.shared_blocks[version]
+
+    def request_path(self, enemy, goal_pixel):
+        if not is_reachable_from(self.dungeon, enemy, goal_pixel):
+            self.cancel(enemy)
+            enemy.set_path(None, self.dungeon)
+            return
+        if enemy.id in self.in_flight:
+            self.requeued_goals[enemy.id] = goal_pixel
+            return
+        self._submit(enemy, goal_pixel)
+
+    def _submit(self, enemy, goal_pixel):
+        tile_size = self.dungeon.tile_size
+        start_tile = (int(enemy.rect.centerx // tile_size), int(enemy.rect.centery // tile_size))
+        goal_tile = (int(goal_pixel[0] // tile_size), int(goal_pixel[1] // tile_size))
+
+        found, path = self.dungeon.path_cache.lookup(start_tile, goal_tile, self.dungeon.version)
+        if found:
+            enemy.set_path(path, self.dungeon)
+            return
+
+        arguments = (self._current_snapshot(), self.dungeon.width_tiles, self.dungeon.height_tiles,
+                     self.snapshot_version, start_tile, goal_tile, self.algorithm)
+        try:
+            future = self.executor.submit(solve_on_snapshot, *arguments)
+        except BrokenExecutor:
+            # The pool broke before deliver_results saw any of its searches fail
+            print("Warning: path worker pool broke, starting a new one.")
+            self._replace_executor()
+            future = self.executor.submit(solve_on_snapshot, *arguments)
+        self.in_flight[enemy.id] = (enemy, future, start_tile, goal_tile, self.snapshot_version)
+
+    def cancel(self, enemy):
+        entry = self.in_flight.pop(enemy.id, None)
+        if entry is not None:
+            entry[1].cancel()
+        self.requeued_goals.pop(enemy.id, None)
+
+    def has_pending(self, enemy):
+        return enemy.id in self.in_flight
+
+    def deliver_results(self):
+        self.last_frame_solved = 0
+        replaced_executor = False
+        for enemy_id, (enemy, future, start_tile, goal_tile, snapshot_version) in list(self.in_flight.items()):
+            if not future.done():
+                continue
+            del self.in_flight[enemy_id]
+            newer_goal = self.requeued_goals.pop(enemy_id, None)
+            if not enemy.alive or future.cancelled():
+                continue
+
+            try:
+                path, nodes_expanded, algorithm = future.result()
+            except Exception as error:
+                # A failed search must not take the game loop down with it. The enemy goes
+                # without a path and asks again once its recalculation timer runs out
+                print(f"Warning: path search for {enemy.name} failed: {error!r}")
+                enemy.set_path(None, self.dungeon)
+                if isinstance(error, BrokenExecutor) and not replaced_executor:
+                    # A worker process died and took the pool with it, the rest of its
+                    # searches fail the same way. New requests go to a fresh pool
+                    self._replace_executor()
+                    replaced_executor = True
+                continue
+            record_search(algorithm, nodes_expanded)
+            if snapshot_version == self.dungeon.version:
+                self.dungeon.path_cache.store(start_tile, goal_tile, snapshot_version, path)
+            enemy.set_path(path, self.dungeon)
+            self.last_frame_solved += 1
+
+            if newer_goal is not None:
+                self.request_path(enemy, newer_goal)
+
+        self.paths_solved += self.last_frame_solved
+        if len(self.shared_blocks) > 1:
+            self._free_shared_blocks()
+        return self.last_frame_solved
+
+    def _replace_executor(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._make_executor()
+
+    def process(self):
+        # Nothing to do per frame, the pool works on its own
+        return 0
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.in_flight.clear()
+        self.requeued_goals.clear()
+        self._free_shared_blocks(everything=True)
@@ -0,0 +1,629 @@
+import heapq
+from collections import deque, OrderedDict
+import config
+
+# Same move set as astar_pathfind: 4 straight + 4 diagonal, all cost 1
+NEIGHBOR_MOVES = [
+    (0, -1), (0, 1), (-1, 0), (1, 0),
+    (-1, -1), (-1, 1), (1, -1), (1, 1)
+]
+
+UNREACHABLE = -1
+
+WALL_CELL = b"\x00"
+FLOOR_CELL = b"\x01"
+
+def _find_next(cells, value, start, direction, limit=None):
+    # First index from start (inclusive) in the given direction holding value, stopping
+    # before limit
+    if direction > 0:
+        end = len(cells) if limit is None else limit
+        if start >= end:
+            return UNREACHABLE
+        return cells.find(value, start, end)
+    end = -1 if limit is None else limit
+    if start <= end:
+        return UNREACHABLE
+    return cells.rfind(value, end + 1, start + 1)
+
+class FlowField:
+    # Distance map toward a single goal tile (the player), shared by every enemy.
+    # Rebuilt only when the goal tile or the dungeon layout changes, after that
+    # any enemy can look up its next step in O(1).
+    def __init__(self, dungeon):
+        self.dungeon = dungeon
+        self.width = dungeon.width_tiles
+        self.height = dungeon.height_tiles
+        self.goal_tile = None
+        self.dungeon_version = None
+        self.distances = [UNREACHABLE] * (self.width * self.height)
+        self.next_index = [UNREACHABLE] * (self.width * self.height)
+        self.rebuild_count = 0
+
+    def update(self, goal_tile):
+        if goal_tile == self.goal_tile and self.dungeon_version == self.dungeon.version:
+            return False
+        self.rebuild(goal_tile)
+        return True
+
+    def rebuild(self, goal_tile):
+        self.goal_tile = goal_tile
+        self.dungeon_version = self.dungeon.version
+        self.rebuild_count += 1
+
+        width = self.width
+        height = self.height
+        tiles = self.dungeon.tiles
+        distances = [UNREACHABLE] * (width * height)
+        next_index = [UNREACHABLE] * (width * height)
+
+        goal_x, goal_y = goal_tile
+        if not (0 <= goal_x < width and 0 <= goal_y < height):
+            self.distances = distances
+            self.next_index = next_index
+            return
+
+        # Every move costs 1, so a BFS gives the same distances as Dijkstra
+        goal_index = goal_y * width + goal_x
+        distances[goal_index] = 0
+        frontier = deque([(goal_x, goal_y)])
+
+        while frontier:
+            x, y = frontier.popleft()
+            current_index = y * width + x
+            next_distance = distances[current_index] + 1
+
+            for move_x, move_y in NEIGHBOR_MOVES:
+                nx = x + move_x
+                ny = y + move_y
+                if not (0 <= nx < width and 0 <= ny < height):
+                    continue
+                neighbor_index = ny * width + nx
+                if distances[neighbor_index] != UNREACHABLE:
+                    continue
+                if tiles[ny][nx] != 1:  # 1 is floor/walkable
+                    continue
+
+                # Diagonals are only blocked when both side tiles are walls (same rule as astar_pathfind)
+                if move_x != 0 and move_y != 0:
+                    if tiles[y][nx] == 0 and tiles[ny][x] == 0:
+                        continue
+
+                distances[neighbor_index] = next_distance
+                next_index[neighbor_index] = current_index
+                frontier.append((nx, ny))
+
+        self.distances = distances
+        self.next_index = next_index
+
+    def distance_at(self, tile):
+        x, y = tile
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return UNREACHABLE
+        return self.distances[y * self.width + x]
+
+    def next_tile(self, tile):
+        # Neighbouring tile one step closer to the goal, or None if the tile is
+        # the goal itself or cannot reach it
+        x, y = tile
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        step_index = self.next_index[y * self.width + x]
+        if step_index == UNREACHABLE:
+            return None
+        return (step_index % self.width, step_index // self.width)
+
+
+# Move costs used by GridAStar. Every move in the game costs 1 today, diagonals included,
+# so the octile heuristic collapses to max(dx, dy). Keep these integers, GridAStar packs
+# them into its heap keys.
+STRAIGHT_COST = 1
+DIAGONAL_COST = 1
+
+HEURISTIC_MANHATTAN = "manhattan" # What astar_pathfind has always used, keeps paths identical
+HEURISTIC_OCTILE = "octile" # Admissible for the 8-way moves, gives shortest paths
+
+ALGORITHM_ASTAR = "astar"
+ALGORITHM_JPS = "jps" # Jump Point Search, shortest paths with far fewer expanded nodes on open floor
+ALGORITHM_HPA = "hpa" # Hierarchical search over map clusters (core/hpa.py), near-shortest paths for big maps
+
+# Running totals per algorithm so the two can be compared in game
+search_stats = {
+    ALGORITHM_ASTAR: {"queries": 0, "nodes_expanded": 0},
+    ALGORITHM_JPS: {"queries": 0, "nodes_expanded": 0},
+    ALGORITHM_HPA: {"queries": 0, "nodes_expanded": 0},
+}
+
+def record_search(algorithm, nodes_expanded):
+    stats = search_stats[algorithm]
+    stats["queries"] += 1
+    stats["nodes_expanded"] += nodes_expanded
+
+def reset_search_stats():
+    for stats in search_stats.values():
+        stats["queries"] = 0
+        stats["nodes_expanded"] = 0
+
+def octile_distance(dx, dy):
+    dx = abs(dx)
+    dy = abs(dy)
+    if dx < dy:
+        dx, dy = dy, dx
+    return STRAIGHT_COST * (dx - dy) + DIAGONAL_COST * dy
+
+class GridAStar:
+    # A* over flat tile indices. The grid is stored with a one tile wall border, so a
+    # tile's index is (y + 1) * stride + (x + 1) with stride = width + 2, and neighbours
+    # never need bounds checks. The score/parent arrays are allocated once per map and
+    # reused by every query: each query bumps self.generation and a cell's values only
+    # count if its stamp matches, so nothing needs clearing.
+    def __init__(self, dungeon_tiles):
+        self.load(dungeon_tiles)
+
+    def load(self, dungeon_tiles):
+        self.tiles = dungeon_tiles
+        self.width = len(dungeon_tiles[0])
+        self.height = len(dungeon_tiles)
+        self.stride = self.width + 2
+        size = self.stride * (self.height + 2)
+
+        self.walkable = bytearray(size)
+        self.walkable_columns = bytearray(size) # Same cells column by column, for vertical jumps
+        self.blocks_diagonal = bytearray(b"\x01") * size
+        for y in range(self.height):
+            for x in range(self.width):
+                self.refresh_tile(x, y)
+
+        self.g_score = [0] * size
+        self.f_score = [0] * size
+        self.parent = [UNREACHABLE] * size
+        self.open_stamp = [0] * size
+        self.closed_stamp = [0] * size
+        self.generation = 0
+        self.nodes_expanded = 0
+
+        stride = self.stride
+        self.moves = []
+        for move_x, move_y in NEIGHBOR_MOVES:
+            if move_x != 0 and move_y != 0:
+                self.moves.append((move_x, move_y, move_y * stride + move_x, move_x, move_y * stride, DIAGONAL_COST))
+            else:
+                self.moves.append((move_x, move_y, move_y * stride + move_x, 0, 0, STRAIGHT_COST))
+
+    def index_of(self, x, y):
+        return (y + 1) * self.stride + x + 1
+
+    def tile_of(self, index):
+        y, x = divmod(index, self.stride)
+        return (x - 1, y - 1)
+
+    def refresh_tile(self, x, y):
+        tile = self.tiles[y][x]
+        index = self.index_of(x, y)
+        self.walkable[index] = 1 if tile == 1 else 0 # 1 is floor/walkable
+        self.walkable_columns[(x + 1) * (self.height + 2) + y + 1] = self.walkable[index]
+        self.blocks_diagonal[index] = 1 if tile == 0 else 0
+
+    def find_path(self, start_tile, goal_tile, heuristic=HEURISTIC_MANHATTAN):
+        start_x, start_y = start_tile
+        goal_x, goal_y = goal_tile
+        self.nodes_expanded = 0
+        if not (0 <= start_x < self.width and 0 <= start_y < self.height) or \
+           not (0 <= goal_x < self.width and 0 <= goal_y < self.height):
+            return None
+
+        self.generation += 1
+        generation = self.generation
+        walkable = self.walkable
+        blocks_diagonal = self.blocks_diagonal
+        g_score = self.g_score
+        f_score = self.f_score
+        parent = self.parent
+        open_stamp = self.open_stamp
+        closed_stamp = self.closed_stamp
+        stride = self.stride
+        use_octile = heuristic == HEURISTIC_OCTILE
+        diagonal_saving = 2 * STRAIGHT_COST - DIAGONAL_COST
+
+        # Heap entries are single ints: ((f * h_limit + tie_h) * push_limit + push_counter) * size + index.
+        # Manhattan orders by f then push order, exactly like the old (f, counter, Node) tuples.
+        # Octile has lots of equal f values on open floor, so it breaks ties on the lower h first.
+        size = len(walkable)
+        push_limit = len(self.moves) * size + 1
+        h_limit = (self.width + self.height) * max(STRAIGHT_COST, DIAGONAL_COST) + 1
+
+        start_index = self.index_of(start_x, start_y)
+        goal_index = self.index_of(goal_x, goal_y)
+        # Heuristics work on padded coordinates, the border offset cancels out
+        goal_x += 1
+        goal_y += 1
+
+        dx = abs(start_x + 1 - goal_x)
+        dy = abs(start_y + 1 - goal_y)
+        start_h = STRAIGHT_COST * (dx + dy) - diagonal_saving * min(dx, dy) if use_octile else dx + dy
+        g_score[start_index] = 0
+        f_score[start_index] = start_h
+        parent[start_index] = UNREACHABLE
+        open_stamp[start_index] = generation
+
+        open_heap = [(start_h * h_limit * push_limit) * size + start_index]
+        push_counter = 1
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+        moves = self.moves
+        tie_limit = h_limit * push_limit
+        nodes_expanded = 0
+
+        while open_heap:
+            rest, current_index = divmod(heappop(open_heap), size)
+
+            if closed_stamp[current_index] == generation or f_score[current_index] < rest // tie_limit:
+                continue # Stale entry, the cell was closed or improved after this push
+
+            if current_index == goal_index:
+                self.nodes_expanded = nodes_expanded
+                return self._build_path(current_index)
+
+            closed_stamp[current_index] = generation
+            nodes_expanded += 1
+            current_g = g_score[current_index]
+            y, x = divmod(current_index, stride)
+
+            for move_x, move_y, offset, side_x, side_y, move_cost in moves:
+                neighbor_index = current_index + offset
+                if not walkable[neighbor_index] or closed_stamp[neighbor_index] == generation:
+                    continue
+
+                # Diagonals are only blocked when both side tiles are walls
+                if side_x and blocks_diagonal[current_index + side_x] and blocks_diagonal[current_index + side_y]:
+                    continue
+
+                tentative_g = current_g + move_cost
+                if open_stamp[neighbor_index] == generation and tentative_g >= g_score[neighbor_index]:
+                    continue
+
+                dx = x + move_x - goal_x
+                if dx < 0:
+                    dx = -dx
+                dy = y + move_y - goal_y
+                if dy < 0:
+                    dy = -dy
+                if use_octile:
+                    neighbor_h = STRAIGHT_COST * (dx + dy) - diagonal_saving * (dx if dx < dy else dy)
+                    neighbor_f = tentative_g + neighbor_h
+                    tie_key = neighbor_f * h_limit + neighbor_h
+                else:
+                    neighbor_f = tentative_g + dx + dy
+                    tie_key = neighbor_f * h_limit
+
+                open_stamp[neighbor_index] = generation
+                g_score[neighbor_index] = tentative_g
+                f_score[neighbor_index] = neighbor_f
+                parent[neighbor_index] = current_index
+                heappush(open_heap, (tie_key * push_limit + push_counter) * size + neighbor_index)
+                push_counter += 1
+
+        self.nodes_expanded = nodes_expanded
+        return None
+
+    def _build_path(self, end_index):
+        parent = self.parent
+        tile_of = self.tile_of
+        path = []
+        index = end_index
+        while index != UNREACHABLE:
+            path.append(tile_of(index))
+            index = parent[index]
+        return path[::-1]
+
+    def find_path_jps(self, start_tile, goal_tile):
+        # Jump Point Search: same results as octile A* on this uniform cost grid, but straight
+        # and diagonal runs across open floor are skipped over instead of pushed tile by tile.
+        # Assumes tiles are either floor (1) or wall (0), so a diagonal is allowed when at
+        # least one of its two side tiles is walkable, like astar_pathfind.
+        start_x, start_y = start_tile
+        goal_x, goal_y = goal_tile
+        self.nodes_expanded = 0
+        if not (0 <= start_x < self.width and 0 <= start_y < self.height) or \
+           not (0 <= goal_x < self.width and 0 <= goal_y < self.height):
+            return None
+
+        self.generation += 1
+        generation = self.generation
+        walkable = self.walkable
+        g_score = self.g_score
+        f_score = self.f_score
+        parent = self.parent
+        open_stamp = self.open_stamp
+        closed_stamp = self.closed_stamp
+        stride = self.stride
+        jump = self._jump
+
+        size = len(walkable)
+        push_limit = 8 * size + 1
+        h_limit = (self.width + self.height) * max(STRAIGHT_COST, DIAGONAL_COST) + 1
+        tie_limit = h_limit * push_limit
+
+        start_index = self.index_of(start_x, start_y)
+        goal_index = self.index_of(goal_x, goal_y)
+        goal_x += 1
+        goal_y += 1
+
+        start_h = octile_distance(start_x + 1 - goal_x, start_y + 1 - goal_y)
+        g_score[start_index] = 0
+        f_score[start_index] = start_h
+        parent[start_index] = UNREACHABLE
+        open_stamp[start_index] = generation
+
+        open_heap = [((start_h * h_limit + start_h) * push_limit) * size + start_index]
+        push_counter = 1
+        nodes_expanded = 0
+
+        while open_heap:
+            rest, current_index = divmod(heapq.heappop(open_heap), size)
+
+            if closed_stamp[current_index] == generation or f_score[current_index] < rest // tie_limit:
+                continue
+
+            if current_index == goal_index:
+                self.nodes_expanded = nodes_expanded
+                return self._build_jump_path(current_index)
+
+            closed_stamp[current_index] = generation
+            nodes_expanded += 1
+            current_g = g_score[current_index]
+            y, x = divmod(current_index, stride)
+
+            for move_x, move_y in self._pruned_directions(current_index, x, y):
+                jump_index = jump(current_index, move_x, move_y, goal_index)
+                if jump_index == UNREACHABLE or closed_stamp[jump_index] == generation:
+                    continue
+
+                jump_y, jump_x = divmod(jump_index, stride)
+                tentative_g = current_g + octile_distance(jump_x - x, jump_y - y)
+                if open_stamp[jump_index] == generation and tentative_g >= g_score[jump_index]:
+                    continue
+
+                jump_h = octile_distance(jump_x - goal_x, jump_y - goal_y)
+                jump_f = tentative_g + jump_h
+                open_stamp[jump_index] = generation
+                g_score[jump_index] = tentative_g
+                f_score[jump_index] = jump_f
+                parent[jump_index] = current_index
+                heapq.heappush(open_heap, ((jump_f * h_limit + jump_h) * push_limit + push_counter) * size + jump_index)
+                push_counter += 1
+
+        self.nodes_expanded = nodes_expanded
+        return None
+
+    def _pruned_directions(self, index, x, y):
+        walkable = self.walkable
+        stride = self.stride
+        parent_index = self.parent[index]
+
+        if parent_index == UNREACHABLE:
+            # Start node, every legal move is a candidate
+            return [(move_x, move_y) for move_x, move_y in NEIGHBOR_MOVES
+                    if self._can_move(index, move_x, move_y)]
+
+        parent_y, parent_x = divmod(parent_index, stride)
+        move_x = (x > parent_x) - (x < parent_x)
+        move_y = (y > parent_y) - (y < parent_y)
+        directions = []
+
+        if move_x != 0 and move_y != 0:
+            horizontal_open = walkable[index + move_x]
+            vertical_open = walkable[index + move_y * stride]
+            if vertical_open:
+                directions.append((0, move_y))
+            if horizontal_open:
+                directions.append((move_x, 0))
+            if (horizontal_open or vertical_open) and walkable[index + move_y * stride + move_x]:
+                directions.append((move_x, move_y))
+            # Forced neighbours behind the corner we just came round
+            if not walkable[index - move_x] and vertical_open and walkable[index + move_y * stride - move_x]:
+                directions.append((-move_x, move_y))
+            if not walkable[index - move_y * stride] and horizontal_open and walkable[index - move_y * stride + move_x]:
+                directions.append((move_x, -move_y))
+        else:
+            step = move_y * stride + move_x
+            side = 1 if move_x == 0 else stride
+            if walkable[index + step]:
+                directions.append((move_x, move_y))
+                for side_sign in (1, -1):
+                    if not walkable[index + side * side_sign] and walkable[index + step + side * side_sign]:
+                        if move_x == 0:
+                            directions.append((side_sign, move_y))
+                        else:
+                            directions.append((move_x, side_sign))
+        return directions
+
+    def _can_move(self, index, move_x, move_y):
+        walkable = self.walkable
+        stride = self.stride
+        if not walkable[index + move_y * stride + move_x]:
+            return False
+        if move_x != 0 and move_y != 0:
+            return walkable[index + move_x] or walkable[index + move_y * stride]
+        return True
+
+    def _jump_straight(self, index, move_x, move_y, goal_index):
+        # Straight runs are scanned with bytearray.find over the row (or over the column in
+        # the transposed copy) instead of stepping tile by tile in Python
+        if move_y == 0:
+            return self._scan_line(self.walkable, self.stride, index, move_x, goal_index)
+
+        column_stride = self.height + 2
+        row, column = divmod(index, self.stride)
+        goal_row, goal_column = divmod(goal_index, self.stride)
+        hit = self._scan_line(self.walkable_columns, column_stride, column * column_stride + row,
+                              move_y, goal_column * column_stride + goal_row)
+        if hit == UNREACHABLE:
+            return UNREACHABLE
+        column, row = divmod(hit, column_stride)
+        return row * self.stride + column
+
+    def _scan_line(self, cells, line_stride, index, direction, goal_index):
+        # Cells are contiguous along the scan direction and the neighbouring lines sit at
+        # +/- line_stride. Returns the first goal or jump point before the next wall.
+        wall = _find_next(cells, WALL_CELL, index + direction, direction)
+        found = UNREACHABLE
+        if (index < goal_index < wall) or (wall < goal_index < index):
+            found = goal_index
+
+        # A tile is a jump point when the side tile next to it is a wall, the side tile one
+        # step further is open and the tile ahead is open. So look for wall -> open
+        # transitions along both side lines.
+        for side in (line_stride, -line_stride):
+            limit = wall + side  # The open side tile has to sit before the wall in our line
+            search = index + 2 * direction + side
+            while True:
+                open_side = _find_next(cells, FLOOR_CELL, search, direction, limit)
+                if open_side == UNREACHABLE:
+                    break
+                if not cells[open_side - direction]:
+                    candidate = open_side - direction - side
+                    if found == UNREACHABLE or (candidate - found) * direction < 0:
+                        found = candidate
+                    break
+                wall_side = _find_next(cells, WALL_CELL, open_side, direction, limit - direction)
+                if wall_side == UNREACHABLE:
+                    break
+                search = wall_side + direction
+        return found
+
+    def _jump(self, index, move_x, move_y, goal_index):
+        if move_x == 0 or move_y == 0:
+            return self._jump_straight(index, move_x, move_y, goal_index)
+
+        walkable = self.walkable
+        step_y = move_y * self.stride
+        step = step_y + move_x
+        while True:
+            if not (walkable[index + move_x] or walkable[index + step_y]):
+                return UNREACHABLE
+            index += step
+            if not walkable[index]:
+                return UNREACHABLE
+            if index == goal_index:
+                return index
+            horizontal_open = walkable[index + move_x]
+            vertical_open = walkable[index + step_y]
+            if (not walkable[index - move_x] and vertical_open and walkable[index + step_y - move_x]) or \
+               (not walkable[index - step_y] and horizontal_open and walkable[index - step_y + move_x]):
+                return index
+            if self._jump_straight(index, move_x, 0, goal_index) != UNREACHABLE or \
+               self._jump_straight(index, 0, move_y, goal_index) != UNREACHABLE:
+                return index
+
+    def _build_jump_path(self, end_index):
+        # Fill in the tiles between consecutive jump points
+        parent = self.parent
+        tile_of = self.tile_of
+        jump_points = []
+        index = end_index
+        while index != UNREACHABLE:
+            jump_points.append(tile_of(index))
+            index = parent[index]
+        jump_points.reverse()
+
+        path = [jump_points[0]]
+        for next_x, next_y in jump_points[1:]:
+            x, y = path[-1]
+            move_x = (next_x > x) - (next_x < x)
+            move_y = (next_y > y) - (next_y < y)
+            while (x, y) != (next_x, next_y):
+                x += move_x
+                y += move_y
+                path.append((x, y))
+        return path
+
+class PathCache:
+    # LRU of finished paths keyed by (start tile, goal tile). Entries belong to one dungeon
+    # version and the whole cache empties itself as soon as it is asked about a newer one.
+    # A path also answers for any start tile lying on it: the rest of it is still a path
+    # to the same goal, so enemies strung along a corridor share one search.
+    def __init__(self, max_entries=None):
+        self.max_entries = config.PATH_CACHE_SIZE if max_entries is None else max_entries
+        self.entries = OrderedDict() # (start, goal) -> (path, {tile: position in path})
+        self.keys_by_goal = {} # goal -> set of entry keys
+        self.version = None
+
+        self.hits = 0
+        self.suffix_hits = 0
+        self.misses = 0
+
+    def _check_version(self, version):
+        if version != self.version:
+            self.entries.clear()
+            self.keys_by_goal.clear()
+            self.version = version
+
+    def lookup(self, start_tile, goal_tile, version):
+        # Returns (found, path). path can be None for a cached "no path".
+        self._check_version(version)
+        key = (start_tile, goal_tile)
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, (list(entry[0]) if entry[0] is not None else None)
+
+        for other_key in self.keys_by_goal.get(goal_tile, ()):
+            path, positions = self.entries[other_key]
+            position = positions.get(start_tile) if positions else None
+            if position is not None:
+                self.entries.move_to_end(other_key)
+                self.suffix_hits += 1
+                return True, path[position:]
+
+        self.misses += 1
+        return False, None
+
+    def store(self, start_tile, goal_tile, version, path):
+        if version != self.version:
+            self._check_version(version)
+        # Partial paths (HPA refines lazily) can't stand in for the full route
+        if path is not None and path[-1] != goal_tile:
+            return
+
+        key = (start_tile, goal_tile)
+        positions = {tile: position for position, tile in enumerate(path)} if path is not None else None
+        self.entries[key] = (list(path) if path is not None else None, positions)
+        self.entries.move_to_end(key)
+        self.keys_by_goal.setdefault(goal_tile, set()).add(key)
+
+        while len(self.entries) > self.max_entries:
+            old_key, _ = self.entries.popitem(last=False)
+            goal_keys = self.keys_by_goal[old_key[1]]
+            goal_keys.discard(old_key)
+            if not goal_keys:
+                del self.keys_by_goal[old_key[1]]
+
+    def hit_rate(self):
+        total = self.hits + self.suffix_hits + self.misses
+        return (self.hits + self.suffix_hits) / total if total else 0.0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.suffix_hits = 0
+        self.misses = 0
+
+# One engine per tile grid so the arrays get reused between astar_pathfind calls
+MAX_CACHED_ENGINES = 8
+_grid_engines = {}
+
+def get_grid_engine(dungeon_tiles):
+    engine = _grid_engines.get(id(dungeon_tiles))
+    if engine is None or engine.tiles is not dungeon_tiles:
+        if len(_grid_engines) >= MAX_CACHED_ENGINES:
+            del _grid_engines[next(iter(_grid_engines))]
+        engine = GridAStar(dungeon_tiles)
+        _grid_engines[id(dungeon_tiles)] = engine
+    return engine
+
+def tile_changed(dungeon_tiles, x, y):
+    # Called by Dungeon.set_tile so cached engines see the new layout
+    engine = _grid_engines.get(id(dungeon_tiles))
+    if engine is not None and engine.tiles is dungeon_tiles:
+        engine.refresh_tile(x, y)
@@ -0,0 +1,126 @@
+import csv
+import time
+from collections import deque
+import config
+
+# Phases Game books every frame, in frame order. Anything else lapped shows up too, this
+# just fixes the order (and the CSV columns) for the usual ones.
+PHASES = ("sync", "input", "player_move", "projectiles", "aoe_effects", "enemies", "pathfinding", "contact_damage",
+          "background", "draw_player", "draw_enemies", "draw_projectiles", "draw_effects", "dirty_rects",
+          "overlay", "present")
+
+class FrameProfiler:
+    # Where each frame's time goes, by named phase, plus per-frame counters. Phases are
+    # laps: start() marks the beginning of an update or render and every lap(name) books
+    # the time since the previous mark under name, so instrumenting a block of code is
+    # one line after it. Ticks within one frame add up into that frame's phases.
+    # Counters are read from running totals the rest of the game already keeps (watch()),
+    # so hot code doesn't need to know about us.
+    # Disabled, every call returns on its first line.
+    def __init__(self, history_length=None):
+        self.enabled = False
+        self.history_length = config.PROFILER_HISTORY_FRAMES if history_length is None else history_length
+        self.history = deque(maxlen=self.history_length) # Finished frames: {"phases": {...}, "counters": {...}}
+        self.phases = {}
+        self.counters = {}
+        self.sources = {} # name -> (read, is_total)
+        self.last_totals = {}
+        self.last_mark = 0.0
+        self.frame_start = None
+        self.frame_number = 0
+        self.csv_file = None
+        self.csv_writer = None
+        self.csv_columns = None
+
+    def set_enabled(self, enabled):
+        self.enabled = enabled
+        self.phases = {}
+        self.counters = {}
+        self.frame_start = None
+        # Totals moved on while we weren't looking, don't book that on the first frame
+        self.last_totals = {name: read() for name, (read, is_total) in self.sources.items() if is_total}
+
+    def start(self):
+        if not self.enabled:
+            return
+        self.last_mark = time.perf_counter()
+        if self.frame_start is None:
+            self.frame_start = self.last_mark
+
+    def lap(self, name):
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        self.phases[name] = self.phases.get(name, 0.0) + (now - self.last_mark) * 1000
+        self.last_mark = now
+
+    def watch(self, name, read, is_total=True):
+        # read() returns a running total (booked as the change per frame) or, with
+        # is_total=False, a value that is recorded as it is (enemy count)
+        self.sources[name] = (read, is_total)
+        if is_total:
+            self.last_totals[name] = read()
+
+    def end_frame(self):
+        if not self.enabled:
+            return
+        for name, (read, is_total) in self.sources.items():
+            value = read()
+            if is_total:
+                self.counters[name] = self.counters.get(name, 0) + value - self.last_totals.get(name, 0)
+                self.last_totals[name] = value
+            else:
+                self.counters[name] = value
+        frame = {"frame": self.frame_number,
+                 "total_ms": (time.perf_counter() - self.frame_start) * 1000 if self.frame_start is not None else 0.0,
+                 "phases": self.phases, "counters": self.counters}
+        self.history.append(frame)
+        if self.csv_writer is not None:
+            self._write_csv_row(frame)
+        self.frame_number += 1
+        self.phases = {}
+        self.counters = {}
+        self.frame_start = None
+
+    def last_frame(self):
+        return self.history[-1] if self.history else None
+
+    def phase_names(self):
+        # PHASES that have shown up in the history, then any others in the order they first did
+        names = {}
+        seen = set()
+        for frame in self.history:
+            seen.update(frame["phases"])
+        for name in PHASES:
+            if name in seen:
+                names[name] = None
+        for frame in self.history:
+            for name in frame["phases"]:
+                names.setdefault(name, None)
+        return list(names)
+
+    def start_csv(self, path):
+        # One row per frame from now on, until stop_csv()
+        self.stop_csv()
+        self.csv_file = open(path, "w", newline="")
+        self.csv_writer = csv.writer(self.csv_file)
+        self.csv_columns = None
+
+    def stop_csv(self):
+        if self.csv_file is not None:
+            self.csv_file.close()
+        self.csv_file = None
+        self.csv_writer = None
+
+    def _write_csv_row(self, frame):
+        if self.csv_columns is None:
+            # Columns are fixed by the first frame, so the usual phases are always in even
+            # if that frame didn't have them (no projectiles yet)
+            phases = list(dict.fromkeys(list(PHASES) + list(frame["phases"])))
+            counters = list(dict.fromkeys(list(self.sources) + list(frame["counters"])))
+            self.csv_columns = (phases, counters)
+            self.csv_writer.writerow(["frame", "total_ms"] + [f"{name}_ms" for name in phases] + counters)
+        phases, counters = self.csv_columns
+        self.csv_writer.writerow([frame["frame"], round(frame["total_ms"], 4)] +
+                                 [round(frame["phases"].get(name, 0.0), 4) for name in phases] +
+                                 [frame["counters"].get(name, 0) for name in counters])
@@ -1,16 +1,19 @@
 import pygame
 import math
+from utils.surface_cache import surface_cache
+from utils.loader import loader
+import config
 
 LIGHTNING_COLOR = (173, 216, 230)
 LIGHTNING_WIDTH = 8
 LIGHTNING_LENGTH = 15
 LIGHTNING_SPEED = 7
+FIREBALL_SIZE = (20, 20)
 
 class Projectile(pygame.sprite.Sprite):
     def __init__(self, x, y, target_x, target_y, damage, owner, dungeon):
         super().__init__()
-        self.image = pygame.Surface((10, 10))  # Simple square for now
-        self.image.fill((255, 255, 0))  # Yellow color
+        self.image = loader.solid("projectile", (10, 10), (255, 255, 0))  # Simple yellow square for now, shared by every shot
         self.rect = self.image.get_rect()
         self.rect.x = x
         self.rect.y = y
@@ -42,13 +45,14 @@ class Projectile(pygame.sprite.Sprite):
                 self.kill()
                 return
 
-        # Checks if projectile off screen
-        if self.rect.x < 0 or self.rect.x > pygame.display.get_surface().get_width() or \
-           self.rect.y < 0 or self.rect.y > pygame.display.get_surface().get_height():
-            self.kill()  # Removes projectile if off screen
+        # Checks if projectile left the world (the map can be bigger than the screen now)
+        world_rect = self.dungeon.world_rect
+        if self.rect.x < 0 or self.rect.x > world_rect.width or \
+           self.rect.y < 0 or self.rect.y > world_rect.height:
+            self.kill()  # Removes projectile if off the map
 
-    def draw(self, surface):
-        surface.blit(self.image, self.rect)
+    def draw(self, surface, camera=None):
+        surface.blit(self.image, camera.apply(self.rect) if camera is not None else self.rect)
 
 class VoidHoleProjectile(pygame.sprite.Sprite):
     def __init__(self, caster_center_pos, target_mouse_pos, owner, 
@@ -84,12 +88,12 @@ class VoidHoleProjectile(pygame.sprite.Sprite):
         self.distance_traveled = 0
 
 
-        self.travel_image = pygame.Surface([20, 20], pygame.SRCALPHA)
-        pygame.draw.circle(self.travel_image, (100, 80, 180), (10, 10), 10)
+        self.travel_image = surface_cache.circle(10, (100, 80, 180))
         self.image = self.travel_image
         self.rect = self.image.get_rect(center=caster_center_pos)
 
         self.aoe_lifetime_seconds = lifetime_seconds
+        self.elapsed_ms = 0
         self.aoe_activation_time = 0 
         self.pull_radius = pull_radius
         self.damage_radius = damage_radius
@@ -110,32 +114,27 @@ class VoidHoleProjectile(pygame.sprite.Sprite):
         print(f"Void Hole projectile activating at {self.rect.center}")
         self.state = "active"
         self.is_active_effect = True
-        self.aoe_activation_time = pygame.time.get_ticks()
+        self.aoe_activation_time = self.elapsed_ms
         self.last_damage_application_time = self.aoe_activation_time # Start DPS timer
 
         # Change visual to the actual void hole
-        self.active_image = pygame.Surface([40, 40], pygame.SRCALPHA) 
-        pygame.draw.circle(self.active_image, (20, 0, 40), (20, 20), 20) 
+        self.active_image = surface_cache.circle(20, (20, 0, 40))
         self.image = self.active_image
         current_center = self.rect.center 
         self.rect = self.image.get_rect(center=current_center)
 
-    def update(self, enemies_list, dungeon_tiles, tile_size):
-        current_time = pygame.time.get_ticks()
+    def update(self, enemies_list, dungeon, area_effects=None):
+        # Game time, one fixed tick per update, so the hole lasts and hurts the same at any frame rate
+        self.elapsed_ms += 1000 / config.TICK_RATE
+        current_time = self.elapsed_ms
 
         if self.state == "traveling":
             self.pos += self.velocity
             self.rect.center = round(self.pos.x), round(self.pos.y)
             self.distance_traveled += self.velocity.length()
 
-            for r_idx, row in enumerate(dungeon_tiles):
-                for c_idx, tile_val in enumerate(row):
-                    if tile_val == 0:
-                        wall_rect = pygame.Rect(c_idx * tile_size, r_idx * tile_size, tile_size, tile_size)
-                        if self.rect.colliderect(wall_rect):
-                            self._transition_to_active_phase()
-                            break
-                if self.state == "active": break
+            if dungeon.collides_with_walls(self.rect):
+                self._transition_to_active_phase()
 
             if self.state == "traveling" and self.distance_traveled >= self.total_distance_to_travel:
                 self._transition_to_active_phase()
@@ -151,51 +150,58 @@ class VoidHoleProjectile(pygame.sprite.Sprite):
                 print("Void Hole effect expired.")
                 return
 
-            for enemy in enemies_list:
-                if not enemy.alive: continue
-                enemy_pos_vec = pygame.math.Vector2(enemy.rect.center)
-                void_hole_center_vec = pygame.math.Vector2(self.rect.center)
-                distance_vector = void_hole_center_vec - enemy_pos_vec
-                distance = distance_vector.length()
-                
-                if 0 < distance < self.pull_radius:
-                    move_vector = distance_vector.normalize() * self.pull_strength
-                    # Store original position for collision rollback (ESSENTIAL)
-                    original_ex, original_ey = enemy.rect.x, enemy.rect.y
-                    enemy.rect.x += move_vector.x
-                    # TODO: Check X collision for enemy with dungeon_tiles, if collision: enemy.rect.x = original_ex
-                    enemy.rect.y += move_vector.y
-                    # TODO: Check Y collision for enemy with dungeon_tiles, if collision: enemy.rect.y = original_ey
+            if area_effects is not None:
+                # Whole pull in one batch, negative strength pulls toward the hole
+                area_effects.apply_radial_impulse(self.rect.center, self.pull_radius, -self.pull_strength, dungeon)
+            else:
+                for enemy in enemies_list:
+                    if not enemy.alive: continue
+                    enemy_pos_vec = pygame.math.Vector2(enemy.rect.center)
+                    void_hole_center_vec = pygame.math.Vector2(self.rect.center)
+                    distance_vector = void_hole_center_vec - enemy_pos_vec
+                    distance = distance_vector.length()
+
+                    if 0 < distance < self.pull_radius:
+                        move_vector = distance_vector.normalize() * self.pull_strength
+                        # Store original position for collision rollback (ESSENTIAL)
+                        original_ex, original_ey = enemy.rect.x, enemy.rect.y
+                        enemy.rect.x += move_vector.x
+                        if dungeon.collides_with_walls(enemy.rect):
+                            enemy.rect.x = original_ex
+                        enemy.rect.y += move_vector.y
+                        if dungeon.collides_with_walls(enemy.rect):
+                            enemy.rect.y = original_ey
 
             if current_time - self.last_damage_application_time >= self.damage_interval:
                 self.last_damage_application_time = current_time
                 damage_this_tick = self.dps
-                for enemy in enemies_list:
-                    if not enemy.alive: continue
-                    if pygame.math.Vector2(self.rect.center).distance_to(enemy.rect.center) < self.damage_radius:
-                        enemy.take_damage(damage_this_tick)
+                if area_effects is not None:
+                    area_effects.damage_circle(self.rect.center, self.damage_radius, damage_this_tick)
+                else:
+                    for enemy in enemies_list:
+                        if not enemy.alive: continue
+                        if pygame.math.Vector2(self.rect.center).distance_to(enemy.rect.center) < self.damage_radius:
+                            enemy.take_damage(damage_this_tick)
         
         # If it somehow got into a bad state or needs to be cleaned up
         elif not self.is_active_effect and self.state != "traveling":
             self.kill()
 
-    def draw_debug(self, surface):
+    def draw_debug(self, surface, camera=None):
         if self.state == "active":
+            center_x, center_y = camera.world_to_screen(self.rect.center) if camera is not None else self.rect.center
             # Pull Radius
-            s_pull = pygame.Surface((self.pull_radius * 2, self.pull_radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(s_pull, (100, 100, 100, 80), (self.pull_radius, self.pull_radius), self.pull_radius)
-            surface.blit(s_pull, (self.rect.centerx - self.pull_radius, self.rect.centery - self.pull_radius))
+            s_pull = surface_cache.circle(self.pull_radius, (100, 100, 100, 80))
+            surface.blit(s_pull, (center_x - self.pull_radius, center_y - self.pull_radius))
             # Damage Radius
-            s_damage = pygame.Surface((self.damage_radius * 2, self.damage_radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(s_damage, (200, 0, 0, 80), (self.damage_radius, self.damage_radius), self.damage_radius)
-            surface.blit(s_damage, (self.rect.centerx - self.damage_radius, self.rect.centery - self.damage_radius))
+            s_damage = surface_cache.circle(self.damage_radius, (200, 0, 0, 80))
+            surface.blit(s_damage, (center_x - self.damage_radius, center_y - self.damage_radius))
 
 class FireballProjectile(pygame.sprite.Sprite):
     def __init__(self, x, y, target_x, target_y, damage, owner, dungeon,
                  aoe_radius=200, aoe_damage_factor=0.5):
         super().__init__()
-        self.image = pygame.Surface((20, 20))
-        self.image.fill((255, 100, 0))
+        self.image = loader.image("fireball.png", FIREBALL_SIZE)
         self.rect = self.image.get_rect(center=(x,y))
         
         self.pos = pygame.math.Vector2(x, y)
@@ -237,23 +243,29 @@ class FireballProjectile(pygame.sprite.Sprite):
             self.kill() 
             return
 
-        screen_rect = pygame.display.get_surface().get_rect()
-        if not screen_rect.colliderect(self.rect):
+        if not self.dungeon.world_rect.colliderect(self.rect):
             self.is_exploding_on_impact = False
             self.kill()
 
-    def explode(self, all_enemies_list, impact_position):
+    def explode(self, all_enemies_list, impact_position, area_effects=None):
         print(f"Fireball exploding at {impact_position} with AoE radius {self.aoe_radius} for {self.aoe_damage} damage.")
         aoe_hit_count = 0
-        for enemy in all_enemies_list:
-            if not enemy.alive:
-                continue
-
-            distance = pygame.math.Vector2(impact_position).distance_to(enemy.rect.center)
-            if distance < self.aoe_radius:
+        if area_effects is not None:
+            hits, distances = area_effects.query_circle(impact_position, self.aoe_radius, with_distances=True)
+            for enemy, distance in zip(hits, distances):
                 print(f"  AoE hit: {enemy.name} at distance {distance:.2f}")
                 enemy.take_damage(self.aoe_damage)
-                aoe_hit_count +=1
+            aoe_hit_count = len(hits)
+        else:
+            for enemy in all_enemies_list:
+                if not enemy.alive:
+                    continue
+
+                distance = pygame.math.Vector2(impact_position).distance_to(enemy.rect.center)
+                if distance < self.aoe_radius:
+                    print(f"  AoE hit: {enemy.name} at distance {distance:.2f}")
+                    enemy.take_damage(self.aoe_damage)
+                    aoe_hit_count +=1
         if aoe_hit_count > 0:
             print(f"  AoE hit {aoe_hit_count} additional targets.")
 
@@ -278,9 +290,9 @@ class LightningProjectile(pygame.sprite.Sprite):
             self.hit_in_chain = hit_in_chain
 
         # Visuals
-        self.image = pygame.Surface((LIGHTNING_LENGTH, LIGHTNING_WIDTH), pygame.SRCALPHA)
-        self.image.fill(LIGHTNING_COLOR) 
-        self.original_image = self.image.copy() 
+        # Shared by every bolt, along with its rotations
+        self.original_image = loader.solid("lightning", (LIGHTNING_LENGTH, LIGHTNING_WIDTH), LIGHTNING_COLOR)
+        self.image = self.original_image
         self.rect = self.image.get_rect(center=(x, y))
         
         self.pos = pygame.math.Vector2(x, y)
@@ -295,7 +307,7 @@ class LightningProjectile(pygame.sprite.Sprite):
 
         if self.velocity.length_squared() > 0:
             angle = self.velocity.angle_to(pygame.math.Vector2(1, 0)) 
-            self.image = pygame.transform.rotate(self.original_image, -angle) 
+            self.image = surface_cache.rotated(self.original_image, -angle)
             self.rect = self.image.get_rect(center=self.rect.center)
         
         print(f"DEBUG: LightningProjectile CREATED. Arc: {self.current_arc_count}, Target: ({target_x},{target_y}), Vel: {self.velocity}, hit_in_chain: {self.hit_in_chain}")
@@ -321,13 +333,18 @@ class LightningProjectile(pygame.sprite.Sprite):
             self.kill() 
             return
 
-        screen_rect = pygame.display.get_surface().get_rect()
-        if not screen_rect.colliderect(self.rect):
-            print(f"DEBUG: LightningProjectile off screen at {self.rect.center}, killing.")
+        if not self.dungeon.world_rect.colliderect(self.rect):
+            print(f"DEBUG: LightningProjectile off the map at {self.rect.center}, killing.")
             self.kill()
             return
 
-        for enemy in self.game_context.enemies:
+        enemy_grid = getattr(self.game_context, 'enemy_grid', None)
+        if enemy_grid is not None:
+            # Lowest id first, same pick as walking the enemy list
+            candidates = sorted(enemy_grid.query_rect(self.rect), key=lambda enemy: enemy.id)
+        else:
+            candidates = self.game_context.enemies
+        for enemy in candidates:
             if not enemy.alive or not hasattr(enemy, 'id') or not hasattr(enemy, 'apply_stun'):
                 continue 
 
@@ -344,6 +361,10 @@ class LightningProjectile(pygame.sprite.Sprite):
 
         if hasattr(enemy, 'apply_stun'):
              enemy.apply_stun(self.stun_duration_frames, is_lightning_stun=True)
+             # The stun outline grows the rect, keep the hash in step
+             enemy_grid = getattr(self.game_context, 'enemy_grid', None)
+             if enemy_grid is not None:
+                 enemy_grid.update(enemy)
         else:
             print(f"Warning: Enemy ID {enemy.id} does not have apply_stun method.")
         
@@ -394,6 +415,15 @@ class LightningProjectile(pygame.sprite.Sprite):
             print("DEBUG find_next_arc_target: game_context.enemies is missing or None.")
             return None
 
+        area_effects = getattr(self.game_context, 'area_effects', None)
+        if area_effects is not None:
+            closest_enemy = area_effects.nearest(current_enemy_pos_tuple, self.arc_range, exclude_ids=self.hit_in_chain)
+            if closest_enemy:
+                print(f"DEBUG find_next_arc_target: Selected arc target: ID {closest_enemy.id}")
+            else:
+                print("DEBUG find_next_arc_target: No suitable arc target found.")
+            return closest_enemy
+
         for potential_target in self.game_context.enemies:
             if not hasattr(potential_target, 'id') or not hasattr(potential_target, 'rect') or not hasattr(potential_target, 'alive'):
                 print(f"DEBUG find_next_arc_target: Skipping potential target due to missing attributes: {potential_target}")
@@ -423,5 +453,5 @@ class LightningProjectile(pygame.sprite.Sprite):
             print("DEBUG find_next_arc_target: No suitable arc target found.")
         return closest_enemy
 
-    def draw(self, surface):
-        surface.blit(self.image, self.rect)
\ No newline at end of file
+    def draw(self, surface, camera=None):
+        surface.blit(self.image, camera.apply(self.rect) if camera is not None else self.rect)
\ No newline at end of file
@@ -0,0 +1,49 @@
+import pygame
+
+class RenderTarget:
+    # Off-screen surface the game draws into at a fixed internal resolution, stretched onto
+    # the real display once per frame. Keeps the aspect ratio, so a display with a
+    # different shape gets black bars. Drawing costs the same on a 4K monitor as on a
+    # 1080p one, only the final scale grows with the display.
+    def __init__(self, display, resolution, smooth=False):
+        self.display = display
+        self.smooth = smooth
+        self.surface = pygame.Surface(resolution)
+        if pygame.display.get_surface() is not None:
+            self.surface = self.surface.convert()
+
+        display_width, display_height = display.get_size()
+        scale = min(display_width / resolution[0], display_height / resolution[1])
+        self.scale = scale
+        self.scaled_rect = pygame.Rect(0, 0, round(resolution[0] * scale), round(resolution[1] * scale))
+        self.scaled_rect.center = (display_width // 2, display_height // 2)
+        # Scaling straight into this saves allocating a full-size surface every frame
+        self.scaled_area = display.subsurface(self.scaled_rect)
+        display.fill((0, 0, 0))
+
+    def to_internal(self, display_pos):
+        # Display pixel (mouse) -> pixel on the internal surface, clamped to it
+        x = (display_pos[0] - self.scaled_rect.x) / self.scale
+        y = (display_pos[1] - self.scaled_rect.y) / self.scale
+        width, height = self.surface.get_size()
+        return (min(max(int(x), 0), width - 1), min(max(int(y), 0), height - 1))
+
+    def to_display_rect(self, rect):
+        # Internal rect -> the display rect it ends up covering, rounded outward
+        left = int(rect.left * self.scale) + self.scaled_rect.x
+        top = int(rect.top * self.scale) + self.scaled_rect.y
+        right = int(rect.right * self.scale + 0.999) + self.scaled_rect.x
+        bottom = int(rect.bottom * self.scale + 0.999) + self.scaled_rect.y
+        return pygame.Rect(left, top, right - left, bottom - top)
+
+    def present(self, rects=None):
+        # Stretches the frame onto the display and pushes it, or only rects (internal
+        # coordinates) of it when given
+        if self.smooth:
+            pygame.transform.smoothscale(self.surface, self.scaled_rect.size, self.scaled_area)
+        else:
+            pygame.transform.scale(self.surface, self.scaled_rect.size, self.scaled_area)
+        if rects is None:
+            pygame.display.flip()
+        else:
+            pygame.display.update([self.to_display_rect(rect) for rect in rects])
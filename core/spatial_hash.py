@@ -0,0 +1,142 @@
+import config
+
+class SpatialHash:
+    # Uniform grid of buckets for anything with a .rect (enemies). An item sits in every
+    # cell its rect touches, so rect and radius queries only look at nearby buckets
+    # instead of the whole list. Call update() after an item moves and remove() when it
+    # dies. Results can still hold dead items, callers filter on .alive like before.
+    def __init__(self, cell_size=None):
+        self.cell_size = config.SPATIAL_HASH_CELL_SIZE if cell_size is None else cell_size
+        self.cells = {} # (cell_x, cell_y) -> {item: None}, dicts keep insertion order
+        self.item_ranges = {} # item -> (min_cell_x, min_cell_y, max_cell_x, max_cell_y)
+        self.queries = 0
+        self.candidates_tested = 0
+
+    def __len__(self):
+        return len(self.item_ranges)
+
+    def __contains__(self, item):
+        return item in self.item_ranges
+
+    def _cell_range(self, rect):
+        cell_size = self.cell_size
+        return (int(rect.left // cell_size), int(rect.top // cell_size),
+                int((rect.right - 1) // cell_size), int((rect.bottom - 1) // cell_size))
+
+    def insert(self, item):
+        cell_range = self._cell_range(item.rect)
+        self.item_ranges[item] = cell_range
+        min_x, min_y, max_x, max_y = cell_range
+        for cell_y in range(min_y, max_y + 1):
+            for cell_x in range(min_x, max_x + 1):
+                self.cells.setdefault((cell_x, cell_y), {})[item] = None
+
+    def remove(self, item):
+        cell_range = self.item_ranges.pop(item, None)
+        if cell_range is None:
+            return
+        min_x, min_y, max_x, max_y = cell_range
+        for cell_y in range(min_y, max_y + 1):
+            for cell_x in range(min_x, max_x + 1):
+                bucket = self.cells.get((cell_x, cell_y))
+                if bucket is not None:
+                    bucket.pop(item, None)
+                    if not bucket:
+                        del self.cells[(cell_x, cell_y)]
+
+    def update(self, item):
+        # Cheap when the item stayed inside the same cells, which is most frames
+        cell_range = self._cell_range(item.rect)
+        if self.item_ranges.get(item) == cell_range:
+            return
+        self.remove(item)
+        self.insert(item)
+
+    def clear(self):
+        self.cells.clear()
+        self.item_ranges.clear()
+
+    def _items_in_cells(self, min_x, min_y, max_x, max_y):
+        found = {}
+        cells = self.cells
+        for cell_y in range(min_y, max_y + 1):
+            for cell_x in range(min_x, max_x + 1):
+                bucket = cells.get((cell_x, cell_y))
+                if bucket:
+                    found.update(bucket)
+        return found
+
+    def query_rect(self, rect):
+        # Items whose rect overlaps rect
+        self.queries += 1
+        candidates = self._items_in_cells(*self._cell_range(rect))
+        self.candidates_tested += len(candidates)
+        return [item for item in candidates if rect.colliderect(item.rect)]
+
+    def candidates_near(self, center, radius):
+        # Everything in the cells a circle touches, without the distance test. For callers
+        # that do their own narrow phase in bulk (core/aoe.py)
+        self.queries += 1
+        center_x, center_y = center
+        cell_size = self.cell_size
+        candidates = self._items_in_cells(int((center_x - radius) // cell_size), int((center_y - radius) // cell_size),
+                                          int((center_x + radius) // cell_size), int((center_y + radius) // cell_size))
+        self.candidates_tested += len(candidates)
+        return list(candidates)
+
+    def query_radius(self, center, radius):
+        # Items whose rect centre lies strictly within radius of center
+        center_x, center_y = center
+        candidates = self.candidates_near(center, radius)
+        radius_sq = radius * radius
+        result = []
+        for item in candidates:
+            item_x, item_y = item.rect.center
+            dx = item_x - center_x
+            dy = item_y - center_y
+            if dx * dx + dy * dy < radius_sq:
+                result.append(item)
+        return result
+
+    def nearest(self, center, max_radius, predicate=None, sort_key=None):
+        # Closest item (by rect centre) strictly within max_radius that passes predicate.
+        # Searches outward ring by ring and stops once no closer cell can exist. Ties go to
+        # the smallest sort_key, e.g. enemy id to match the old list order.
+        self.queries += 1
+        center_x, center_y = center
+        cell_size = self.cell_size
+        origin_x = int(center_x // cell_size)
+        origin_y = int(center_y // cell_size)
+        max_ring = int(max_radius // cell_size) + 1
+
+        best = None
+        best_distance_sq = max_radius * max_radius
+        seen = set()
+        for ring in range(max_ring + 1):
+            # Anything in this ring or further out is at least (ring - 1) cells away
+            if best is not None and ((ring - 1) * cell_size) ** 2 > best_distance_sq:
+                break
+            for cell_y in range(origin_y - ring, origin_y + ring + 1):
+                on_edge_row = cell_y == origin_y - ring or cell_y == origin_y + ring
+                step = 1 if on_edge_row else 2 * ring
+                for cell_x in range(origin_x - ring, origin_x + ring + 1, max(step, 1)):
+                    bucket = self.cells.get((cell_x, cell_y))
+                    if not bucket:
+                        continue
+                    for item in bucket:
+                        if item in seen:
+                            continue
+                        seen.add(item)
+                        self.candidates_tested += 1
+                        if predicate is not None and not predicate(item):
+                            continue
+                        item_x, item_y = item.rect.center
+                        dx = item_x - center_x
+                        dy = item_y - center_y
+                        distance_sq = dx * dx + dy * dy
+                        if distance_sq < best_distance_sq or \
+                           (distance_sq == best_distance_sq and best is not None and sort_key is not None
+                            and sort_key(item) < sort_key(best)):
+                            best = item
+                            best_distance_sq = distance_sq
+        return best
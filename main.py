@@ -1,34 +1,35 @@
 import pygame
 from core.game import Game
+from core.game_loop import FixedTimestepLoop
+import config
 
 # Initialize pygame
 pygame.init()
 
-base_width = 1920
-base_height = 1080
-
 info = pygame.display.Info()
 screen_width = info.current_w
 screen_height = info.current_h
 
-screen = pygame.display.set_mode((screen_width, screen_height), pygame.FULLSCREEN)
+if config.RENDER_RESOLUTION is not None and config.RENDER_HARDWARE_SCALE:
+    # SDL stretches the RENDER_RESOLUTION window to the monitor (on the GPU where it can)
+    # and maps the mouse for us, so the game just sees a display of that size
+    display_size, display_flags = config.RENDER_RESOLUTION, pygame.FULLSCREEN | pygame.SCALED
+else:
+    display_size, display_flags = (screen_width, screen_height), pygame.FULLSCREEN
+try:
+    screen = pygame.display.set_mode(display_size, display_flags, vsync=1 if config.VSYNC else 0)
+except pygame.error:
+    # Not every renderer can do vsync, MAX_FPS still caps the frame rate
+    screen = pygame.display.set_mode(display_size, display_flags)
 pygame.display.set_caption("My Roguelike Game")
 
 # Initialize Game class from core/game.py
 game = Game(screen)
 
-running = True
-while running:
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT:
-            running = False
-        game.handle_input(event)
-        if not game.running:
-            running = False
-
-    game.update()
-    game.render()
+# Simulation at a fixed TICK_RATE, rendering as often as MAX_FPS allows
+FixedTimestepLoop(game).run()
 
+game.shutdown()
 pygame.quit()
 
 pygame.quit()
\ No newline at end of file
@@ -0,0 +1,95 @@
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+import config
+
+# Runs the game without a window for a fixed number of ticks, as fast as it goes.
+# For balance and performance checks on machines without a display, e.g.
+#   python simulate.py --ticks 5000 --enemies 2000 --pool --autocast --json
+
+AUTOCAST_ABILITIES = ("fireball", "void_hole", "lightning_storm")
+AUTOCAST_RANGE = 600 # Only casts at enemies closer than this
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the game headless for a number of ticks.")
+    parser.add_argument("--ticks", type=int, default=1000, help="simulation ticks to run")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for the dungeon and spawns")
+    parser.add_argument("--enemies", type=int, default=None, help="enemies to spawn (config.ENEMY_SPAWN_COUNT)")
+    parser.add_argument("--world", default=None, help="world size in pixels as WIDTHxHEIGHT")
+    parser.add_argument("--pool", action="store_true", help="use the NumPy enemy pool")
+    parser.add_argument("--autocast", action="store_true", help="player casts every ability at the nearest enemy when ready")
+    parser.add_argument("--profile-csv", metavar="PATH", help="write per-tick phase timings and counters to this CSV")
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    parser.add_argument("--verbose", action="store_true", help="keep the game's own prints")
+    return parser.parse_args(argv)
+
+def apply_args_to_config(args):
+    if args.enemies is not None:
+        config.ENEMY_SPAWN_COUNT = args.enemies
+    if args.world:
+        config.WORLD_WIDTH, config.WORLD_HEIGHT = (int(value) for value in args.world.lower().split("x"))
+    if args.pool:
+        config.USE_ENEMY_POOL = True
+    if args.profile_csv:
+        config.PROFILER_ENABLED = True
+
+def autocast(game):
+    player = game.player
+    if not player.alive:
+        return
+    target = game.area_effects.nearest(player.rect.center, AUTOCAST_RANGE)
+    if target is None:
+        return
+    for ability_name in AUTOCAST_ABILITIES:
+        if not player.is_on_cooldown(ability_name):
+            player.use_ability(ability_name, target=target.rect.center, game_context=game)
+
+def run(ticks, autocast_enabled=False, game=None, profile_csv=None):
+    # Ticks an already built (or new headless) game, returns the summary dict
+    from core.game import Game
+    if game is None:
+        game = Game()
+    if profile_csv:
+        game.profiler.start_csv(profile_csv) # One row per tick headless, shutdown() closes it
+    enemies_at_start = len(game.enemies)
+    start = time.perf_counter()
+    ticks_run = 0
+    for _ in range(ticks):
+        if not game.running:
+            break
+        if autocast_enabled:
+            autocast(game)
+        game.update()
+        ticks_run += 1
+    elapsed = time.perf_counter() - start
+    game.shutdown()
+    return {
+        "ticks": ticks_run,
+        "seconds": round(elapsed, 3),
+        "ticks_per_second": round(ticks_run / elapsed, 1) if elapsed > 0 else None,
+        "enemies_alive": sum(1 for enemy in game.enemies if enemy.alive),
+        "enemies_killed": enemies_at_start - len(game.enemies),
+        "player_alive": game.player.alive,
+        "player_health": game.player.health,
+    }
+
+def main(argv=None):
+    args = parse_args(argv)
+    apply_args_to_config(args)
+    random.seed(args.seed)
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with output:
+        summary = run(args.ticks, args.autocast, profile_csv=args.profile_csv)
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        for key, value in summary.items():
+            print(f"{key}: {value}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
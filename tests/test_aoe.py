@@ -0,0 +1,60 @@
+import pygame
+from core.dungeon import Dungeon
+from core.aoe import AreaEffects
+from core.spatial_hash import SpatialHash
+from characters.enemies import Enemy
+
+TILE_SIZE = 32
+
+class Player:
+    def __init__(self, x, y):
+        self.rect = pygame.Rect(x, y, 30, 30)
+
+def make_area_effects(enemies, use_grid):
+    if not use_grid:
+        return AreaEffects(enemies)
+    grid = SpatialHash()
+    for enemy in enemies:
+        grid.insert(enemy)
+    return AreaEffects(enemies, grid)
+
+def check_push_stops_at_wall(use_grid):
+    # Enemy one tile right of the left border wall, pushed hard to the left
+    dungeon = Dungeon(20 * TILE_SIZE, 20 * TILE_SIZE, TILE_SIZE)
+    enemy = Enemy(TILE_SIZE + 1, 5 * TILE_SIZE, 0)
+    area_effects = make_area_effects([enemy], use_grid)
+    center = (enemy.rect.centerx + 40, enemy.rect.centery)
+    for _ in range(5):
+        assert area_effects.apply_radial_impulse(center, 200, 25, dungeon) == 1
+        assert not dungeon.collides_with_walls(enemy.rect)
+        center = (enemy.rect.centerx + 40, enemy.rect.centery)
+    assert enemy.rect.left >= TILE_SIZE
+
+def test_push_toward_wall_keeps_enemy_on_floor():
+    check_push_stops_at_wall(use_grid=False)
+
+def test_push_toward_wall_keeps_enemy_on_floor_with_spatial_hash():
+    check_push_stops_at_wall(use_grid=True)
+
+def test_pull_moves_enemy_along_open_floor():
+    dungeon = Dungeon(20 * TILE_SIZE, 20 * TILE_SIZE, TILE_SIZE)
+    enemy = Enemy(5 * TILE_SIZE, 5 * TILE_SIZE, 0)
+    area_effects = make_area_effects([enemy], use_grid=False)
+    start_x = enemy.rect.x
+    area_effects.apply_radial_impulse((enemy.rect.centerx + 100, enemy.rect.centery), 200, -3, dungeon)
+    assert enemy.rect.x == start_x + 3
+
+def test_pull_survives_the_next_enemy_update():
+    # Enemy.update and draw rebuild the rect from pixel_pos, the pull has to move both
+    dungeon = Dungeon(20 * TILE_SIZE, 20 * TILE_SIZE, TILE_SIZE)
+    enemy = Enemy(5 * TILE_SIZE, 5 * TILE_SIZE, 0)
+    enemy.speed = 0 # Stand still so only the pull moves it
+    area_effects = make_area_effects([enemy], use_grid=False)
+    start = enemy.rect.topleft
+    for _ in range(4):
+        area_effects.apply_radial_impulse((enemy.rect.centerx + 100, enemy.rect.centery + 100), 300, -2.5, dungeon)
+        enemy.update(Player(15 * TILE_SIZE, 15 * TILE_SIZE), dungeon, [enemy])
+    enemy.draw(pygame.Surface((20 * TILE_SIZE, 20 * TILE_SIZE)))
+    # Four diagonal pulls of 2.5 pixels, about 7 pixels along each axis
+    assert enemy.rect.topleft == (start[0] + 7, start[1] + 7)
+    assert abs(enemy.pixel_pos.x - (start[0] + 10 / 2 ** 0.5)) < 1e-6
@@ -0,0 +1,37 @@
+import pytest
+import pygame
+from core.crowd import CrowdSolver
+from core.dungeon import Dungeon
+from characters.enemies import Enemy
+
+TILE_SIZE = 32
+
+class Player:
+    def __init__(self, x, y):
+        self.rect = pygame.Rect(x, y, 30, 30)
+
+def test_stunned_enemy_still_pushes_movers():
+    crowd = CrowdSolver(separation_radius=32, separation_strength=3.0)
+    mover = Enemy(5 * TILE_SIZE, 5 * TILE_SIZE, 0)
+    stunned = Enemy(5 * TILE_SIZE + 12, 5 * TILE_SIZE, 1)
+    stunned.apply_stun(30)
+    stunned.separation_force = (1.0, 1.0) # Left over from before the stun
+    crowd.update([mover, stunned])
+    assert mover.separation_force[0] < 0 and mover.separation_force[1] == 0
+    assert stunned.separation_force == (0.0, 0.0)
+
+def test_pooled_mover_does_not_walk_through_a_stunned_enemy():
+    pytest.importorskip("numpy")
+    from characters.enemy_pool import EnemyPool
+
+    # Both on the same row, the player far off to the right past the stunned one
+    dungeon = Dungeon(20 * TILE_SIZE, 20 * TILE_SIZE, TILE_SIZE)
+    pool = EnemyPool(dungeon, crowd=CrowdSolver(separation_radius=32, separation_strength=3.0))
+    mover = pool.spawn(4 * TILE_SIZE + 1, 5 * TILE_SIZE + 1, 0)
+    stunned = pool.spawn(5 * TILE_SIZE + 1, 5 * TILE_SIZE + 1, 1)
+    stunned.apply_stun(1000)
+    player = Player(15 * TILE_SIZE + 1, 5 * TILE_SIZE + 1)
+    for _ in range(120):
+        pool.update(player)
+        assert mover.rect.centerx < stunned.rect.centerx
+    assert stunned.rect.topleft == (5 * TILE_SIZE + 1, 5 * TILE_SIZE + 1)
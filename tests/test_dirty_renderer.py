@@ -0,0 +1,76 @@
+import random
+import pygame
+import pytest
+import config
+from core.game import Game, BACKGROUND_COLOR
+
+SCREEN_SIZE = (640, 480)
+
+@pytest.fixture
+def game(monkeypatch):
+    monkeypatch.setattr(config, "USE_DIRTY_RECT_RENDERING", True)
+    monkeypatch.setattr(config, "ENEMY_SPAWN_COUNT", 30)
+    monkeypatch.setattr(config, "WORLD_WIDTH", None)
+    monkeypatch.setattr(config, "WORLD_HEIGHT", None)
+    monkeypatch.setattr(config, "RENDER_RESOLUTION", None)
+    pygame.display.init()
+    pygame.font.init()
+    random.seed(1)
+    game = Game(pygame.display.set_mode(SCREEN_SIZE))
+    yield game
+    game.shutdown()
+    pygame.display.quit()
+
+def full_redraw(game):
+    surface = pygame.Surface(game.screen.get_size()).convert()
+    surface.fill(BACKGROUND_COLOR)
+    game.chunked_background.draw(surface, game.camera)
+    game.draw_entities(surface)
+    return surface
+
+def differs(game, expected, ignore_rect=None):
+    actual = game.screen.copy()
+    if ignore_rect is not None:
+        # The panel itself is drawn from the profiler's newest frame, only what's around it is compared
+        actual.fill((255, 0, 255), ignore_rect)
+        expected.fill((255, 0, 255), ignore_rect)
+    return pygame.image.tobytes(actual, "RGB") != pygame.image.tobytes(expected, "RGB")
+
+def test_dirty_frames_match_a_full_redraw(game):
+    for tick in range(60):
+        game.update()
+        if tick == 5:
+            target = (game.player.rect.centerx + 150, game.player.rect.centery)
+            for ability_name in ("fireball", "void_hole", "lightning_storm"):
+                game.player.use_ability(ability_name, target=target, game_context=game)
+        if tick == 20:
+            game.dungeon.set_tile(5, 5, 0)
+        if tick == 40:
+            game.dungeon.set_tile(5, 5, 1)
+        game.render()
+        assert not differs(game, full_redraw(game)), f"tick {tick}"
+
+def press(game, key):
+    game.handle_input(pygame.event.Event(pygame.KEYDOWN, key=key))
+
+def test_overlay_leaves_no_stale_pixels(game):
+    press(game, pygame.K_F3)
+    for _ in range(5):
+        game.update()
+        game.render()
+    big_rect = game.perf_overlay.rect
+    assert big_rect is not None
+
+    # Forgetting the history drops every row but the title, the panel shrinks a lot
+    game.profiler.history.clear()
+    game.update()
+    game.render()
+    small_rect = game.perf_overlay.rect
+    assert small_rect.height < big_rect.height
+    assert not differs(game, full_redraw(game), small_rect)
+
+    press(game, pygame.K_F3)
+    game.update()
+    game.render()
+    assert game.perf_overlay.rect is None
+    assert not differs(game, full_redraw(game))
@@ -0,0 +1,48 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from core.dungeon import Dungeon
+from characters.enemy_pool import EnemyPool
+
+TILE_SIZE = 32
+
+def make_pool():
+    dungeon = Dungeon(20 * TILE_SIZE, 20 * TILE_SIZE, TILE_SIZE)
+    return dungeon, EnemyPool(dungeon)
+
+def test_wall_check_covers_rects_bigger_than_a_tile():
+    dungeon, pool = make_pool()
+    # A 70px rect spans three tiles a side, the wall is only under its middle column
+    dungeon.set_tile(5, 3, 0)
+    view = pool.spawn(4 * TILE_SIZE + 10, 4 * TILE_SIZE + 8, 0, width=70, height=20)
+    pool.nudge([view.index], [0.0], [-20.0])
+    assert not dungeon.collides_with_walls(view.rect)
+
+def test_stunned_enemy_is_not_nudged_into_a_wall():
+    dungeon, pool = make_pool()
+    view = pool.spawn(TILE_SIZE + 2, 5 * TILE_SIZE, 0)
+    view.apply_stun(30, is_lightning_stun=True) # The outlined sprite is bigger than a tile
+    assert view.rect.width > TILE_SIZE
+    for _ in range(10):
+        pool.nudge([view.index], [-5.0], [0.0])
+        assert not dungeon.collides_with_walls(view.rect)
+
+def test_remove_dead_compacts_and_detaches():
+    dungeon, pool = make_pool()
+    views = [pool.spawn(3 * TILE_SIZE + index, 3 * TILE_SIZE, index) for index in range(6)]
+    views[1].take_damage(1000)
+    views[4].take_damage(1000)
+    dead = pool.remove_dead()
+    assert dead == [views[1], views[4]]
+    assert pool.count == 4
+    assert pool.views == [views[0], views[2], views[3], views[5]]
+    assert [view.index for view in pool.views] == [0, 1, 2, 3]
+    assert list(pool.ids[:pool.count]) == [0, 2, 3, 5]
+    assert all(not view.alive and view.index is None for view in dead)
+    assert pool.remove_dead() == []
+
+    # Freed slots are reused instead of growing the arrays
+    capacity = len(pool.pos_x)
+    pool.spawn(5 * TILE_SIZE, 5 * TILE_SIZE, 6)
+    assert pool.count == 5 and len(pool.pos_x) == capacity
@@ -0,0 +1,80 @@
+import random
+from core.dungeon import Dungeon
+from core.hpa import HierarchicalPathfinder, get_hierarchical_pathfinder
+from core.pathfinding import GridAStar, NEIGHBOR_MOVES
+
+TILE_SIZE = 32
+CLUSTER_SIZE = 8
+
+def make_dungeon(width_tiles=48, height_tiles=40, wall_density=0.2, seed=3):
+    dungeon = Dungeon(width_tiles * TILE_SIZE, height_tiles * TILE_SIZE, TILE_SIZE)
+    rng = random.Random(seed)
+    for y in range(1, height_tiles - 1):
+        for x in range(1, width_tiles - 1):
+            if rng.random() < wall_density:
+                dungeon.set_tile(x, y, 0)
+    return dungeon
+
+def floor_tiles(tiles):
+    return [(x, y) for y, row in enumerate(tiles) for x, tile in enumerate(row) if tile == 1]
+
+def assert_legal(tiles, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    for x, y in path:
+        assert tiles[y][x] == 1, f"path goes through wall {(x, y)}"
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        move = (x1 - x0, y1 - y0)
+        assert move in NEIGHBOR_MOVES, f"{(x0, y0)} -> {(x1, y1)} is not one step"
+        if move[0] and move[1]:
+            # Same rule as the grid engines: a diagonal can't squeeze between two walls
+            assert tiles[y0][x1] == 1 or tiles[y1][x0] == 1, f"{(x0, y0)} -> {(x1, y1)} cuts a corner"
+
+def check_queries(tiles, hierarchy, rng, count=150):
+    engine = GridAStar(tiles)
+    floor = floor_tiles(tiles)
+    for _ in range(count):
+        start, goal = rng.choice(floor), rng.choice(floor)
+        path = hierarchy.find_path(start, goal, refine_all=True)
+        reference = engine.find_path(start, goal)
+        assert (path is None) == (reference is None), f"{start} -> {goal} reachability differs from A*"
+        if path is not None:
+            assert_legal(tiles, path, start, goal)
+
+def test_paths_are_legal():
+    dungeon = make_dungeon()
+    check_queries(dungeon.tiles, HierarchicalPathfinder(dungeon.tiles, CLUSTER_SIZE), random.Random(1))
+
+def test_partial_path_is_a_legal_prefix():
+    dungeon = make_dungeon(wall_density=0.1)
+    hierarchy = HierarchicalPathfinder(dungeon.tiles, CLUSTER_SIZE)
+    rng = random.Random(2)
+    floor = floor_tiles(dungeon.tiles)
+    for _ in range(50):
+        start, goal = rng.choice(floor), rng.choice(floor)
+        path = hierarchy.find_path(start, goal)
+        if path:
+            assert_legal(dungeon.tiles, path, start, path[-1])
+
+def test_paths_stay_legal_after_set_tile():
+    dungeon = make_dungeon(wall_density=0.1)
+    hierarchy = get_hierarchical_pathfinder(dungeon.tiles)
+    rng = random.Random(4)
+    # Cluster edges and corners as well as the middles, those rebuild the neighbours too
+    cluster_size = hierarchy.cluster_size
+    edits = [(x, y) for x in (cluster_size - 1, cluster_size, 2 * cluster_size - 1, 2 * cluster_size, 5)
+             for y in (cluster_size - 1, cluster_size, 7, 2 * cluster_size)]
+    for x, y in edits:
+        dungeon.set_tile(x, y, 1 - dungeon.tiles[y][x])
+        check_queries(dungeon.tiles, hierarchy, rng, count=20)
+
+    fresh = HierarchicalPathfinder(dungeon.tiles, cluster_size)
+    assert hierarchy.intra_edges == fresh.intra_edges
+    assert hierarchy.border_links == fresh.border_links
+    assert {tile: links for tile, links in hierarchy.inter_links.items() if links} == fresh.inter_links
+
+def test_walled_off_goal_is_unreachable():
+    dungeon = make_dungeon(wall_density=0)
+    for x in range(dungeon.width_tiles):
+        dungeon.set_tile(x, 20, 0)
+    hierarchy = HierarchicalPathfinder(dungeon.tiles, CLUSTER_SIZE)
+    assert hierarchy.find_path((3, 3), (3, 30), refine_all=True) is None
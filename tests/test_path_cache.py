@@ -0,0 +1,67 @@
+from core.pathfinding import PathCache
+from core.dungeon import Dungeon
+from characters.enemies import cached_astar_pathfind
+
+PATH = [(1, 1), (2, 2), (3, 3), (4, 3), (5, 3)]
+GOAL = (5, 3)
+
+def test_exact_hit_returns_a_copy():
+    cache = PathCache(max_entries=8)
+    cache.store((1, 1), GOAL, 0, PATH)
+    found, path = cache.lookup((1, 1), GOAL, 0)
+    assert found and path == PATH
+    path.pop(0) # Enemy.set_path pops its first waypoint, that mustn't reach the cache
+    assert cache.lookup((1, 1), GOAL, 0) == (True, PATH)
+    assert cache.hits == 2 and cache.misses == 0
+
+def test_suffix_hit_from_a_tile_on_a_cached_path():
+    cache = PathCache(max_entries=8)
+    cache.store((1, 1), GOAL, 0, PATH)
+    assert cache.lookup((3, 3), GOAL, 0) == (True, [(3, 3), (4, 3), (5, 3)])
+    assert cache.suffix_hits == 1
+    # Same start on the path but a different goal is not an answer
+    assert cache.lookup((3, 3), (9, 9), 0) == (False, None)
+    assert cache.misses == 1
+
+def test_unreachable_result_is_cached():
+    cache = PathCache(max_entries=8)
+    cache.store((1, 1), (9, 9), 0, None)
+    assert cache.lookup((1, 1), (9, 9), 0) == (True, None)
+    # A "no path" has no tiles to offer suffixes from
+    assert cache.lookup((2, 2), (9, 9), 0) == (False, None)
+
+def test_partial_paths_are_not_stored():
+    # HPA hands back only the first refined stretch, it doesn't end at the goal
+    cache = PathCache(max_entries=8)
+    cache.store((1, 1), (20, 20), 0, [(1, 1), (2, 2), (3, 3)])
+    assert cache.lookup((1, 1), (20, 20), 0) == (False, None)
+    assert not cache.entries and not cache.keys_by_goal
+
+def test_new_version_clears_everything():
+    cache = PathCache(max_entries=8)
+    cache.store((1, 1), GOAL, 0, PATH)
+    cache.store((1, 1), (9, 9), 0, None)
+    assert cache.lookup((1, 1), GOAL, 1) == (False, None)
+    assert cache.lookup((1, 1), (9, 9), 1) == (False, None)
+    assert cache.lookup((3, 3), GOAL, 1) == (False, None)
+    assert not cache.entries and not cache.keys_by_goal
+
+def test_least_recently_used_entry_goes_first():
+    cache = PathCache(max_entries=2)
+    cache.store((1, 1), (2, 1), 0, [(1, 1), (2, 1)])
+    cache.store((1, 2), (2, 2), 0, [(1, 2), (2, 2)])
+    cache.lookup((1, 1), (2, 1), 0) # Now the most recently used
+    cache.store((1, 3), (2, 3), 0, [(1, 3), (2, 3)])
+    assert cache.lookup((1, 2), (2, 2), 0) == (False, None)
+    assert cache.lookup((1, 1), (2, 1), 0)[0]
+    assert cache.lookup((1, 3), (2, 3), 0)[0]
+    assert (2, 2) not in cache.keys_by_goal
+
+def test_set_tile_invalidates_dungeon_cache():
+    dungeon = Dungeon(10 * 32, 10 * 32, 32)
+    start_pixel, goal_pixel = (1 * 32 + 16, 1 * 32 + 16), (8 * 32 + 16, 1 * 32 + 16)
+    path = cached_astar_pathfind(dungeon, start_pixel, goal_pixel)
+    assert (4, 1) in path
+    dungeon.set_tile(4, 1, 0)
+    path = cached_astar_pathfind(dungeon, start_pixel, goal_pixel)
+    assert path[-1] == (8, 1) and (4, 1) not in path
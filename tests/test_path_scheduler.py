@@ -0,0 +1,55 @@
+import os
+import time
+import pytest
+from core import path_scheduler
+from core.dungeon import Dungeon
+from core.path_scheduler import AsyncPathSolver
+from characters.enemies import Enemy
+
+TILE_SIZE = 32
+real_solve = path_scheduler.solve_on_snapshot
+
+def solve_or_fail(snapshot, width, height, snapshot_version, start_tile, goal_tile, algorithm):
+    # Enemies on row 3 make their search blow up, everyone else gets a real path
+    if start_tile[1] == 3:
+        raise ValueError("search blew up")
+    return real_solve(snapshot, width, height, snapshot_version, start_tile, goal_tile, algorithm)
+
+def solve_or_die(snapshot, width, height, snapshot_version, start_tile, goal_tile, algorithm):
+    # Kills the worker process, which breaks the whole pool
+    if start_tile[1] == 3:
+        os._exit(1)
+    time.sleep(0.5) # Still running when the pool breaks
+    return real_solve(snapshot, width, height, snapshot_version, start_tile, goal_tile, algorithm)
+
+def wait_for_results(solver, timeout=10.0):
+    deadline = time.perf_counter() + timeout
+    while solver.in_flight and time.perf_counter() < deadline:
+        solver.deliver_results()
+        time.sleep(0.01)
+
+
+@pytest.mark.parametrize("use_processes, solve", [(False, solve_or_fail), (True, solve_or_die)])
+def test_failed_searches_do_not_stop_delivery(monkeypatch, use_processes, solve):
+    monkeypatch.setattr(path_scheduler, "solve_on_snapshot", solve)
+    dungeon = Dungeon(20 * TILE_SIZE, 20 * TILE_SIZE, TILE_SIZE)
+    failing = Enemy(3 * TILE_SIZE, 3 * TILE_SIZE, 0)
+    working = Enemy(3 * TILE_SIZE, 8 * TILE_SIZE, 1)
+    goal_pixel = (15 * TILE_SIZE + 16, 15 * TILE_SIZE + 16)
+    solver = AsyncPathSolver(dungeon, workers=2, use_processes=use_processes)
+    try:
+        solver.request_path(failing, goal_pixel)
+        solver.request_path(working, goal_pixel)
+        wait_for_results(solver)
+        assert not solver.in_flight
+        assert failing.path == []
+        if not use_processes:
+            assert working.path and working.path[-1] == (15, 15)
+        else:
+            # Its search died with the pool, a new request goes to the replacement pool
+            monkeypatch.setattr(path_scheduler, "solve_on_snapshot", real_solve)
+            solver.request_path(working, goal_pixel)
+            wait_for_results(solver)
+            assert working.path and working.path[-1] == (15, 15)
+    finally:
+        solver.shutdown()
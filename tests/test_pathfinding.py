@@ -0,0 +1,131 @@
+import heapq
+import random
+from core.pathfinding import GridAStar, get_grid_engine, tile_changed, NEIGHBOR_MOVES, STRAIGHT_COST, DIAGONAL_COST, HEURISTIC_OCTILE
+from benchmarks.pathfinding import maze, scattered
+
+def reference_astar(tiles, start, goal):
+    # The Node-based A* GridAStar replaced, kept as-is apart from the Node class becoming
+    # lists: [position, parent, g, h, f], Manhattan, (f, push counter) heap order
+    width, height = len(tiles[0]), len(tiles)
+    start_node = [start, None, 0, abs(start[0] - goal[0]) + abs(start[1] - goal[1]), 0]
+    start_node[4] = start_node[3]
+    heap = [(start_node[4], 0, start_node)]
+    counter = 1
+    open_nodes = {start: start_node}
+    closed = set()
+    while heap:
+        current_f, _, current = heapq.heappop(heap)
+        position = current[0]
+        if position not in open_nodes or open_nodes[position][4] < current_f:
+            continue
+        if position == goal:
+            path = []
+            while current is not None:
+                path.append(current[0])
+                current = current[1]
+            return path[::-1]
+        closed.add(position)
+        del open_nodes[position]
+        for move_x, move_y in NEIGHBOR_MOVES:
+            neighbor = (position[0] + move_x, position[1] + move_y)
+            if not (0 <= neighbor[0] < width and 0 <= neighbor[1] < height):
+                continue
+            if tiles[neighbor[1]][neighbor[0]] != 1 or neighbor in closed:
+                continue
+            if move_x and move_y and tiles[position[1]][neighbor[0]] == 0 and tiles[neighbor[1]][position[0]] == 0:
+                continue
+            tentative_g = current[2] + 1
+            existing = open_nodes.get(neighbor)
+            if existing is not None and tentative_g >= existing[2]:
+                continue
+            node = existing if existing is not None else [neighbor, None, 0, 0, 0]
+            node[1] = current
+            node[2] = tentative_g
+            node[3] = abs(neighbor[0] - goal[0]) + abs(neighbor[1] - goal[1])
+            node[4] = node[2] + node[3]
+            heapq.heappush(heap, (node[4], counter, node))
+            counter += 1
+            open_nodes[neighbor] = node
+    return None
+
+def floor_tiles(tiles):
+    return [(x, y) for y, row in enumerate(tiles) for x, tile in enumerate(row) if tile == 1]
+
+def random_queries(tiles, count, seed):
+    rng = random.Random(seed)
+    floor = floor_tiles(tiles)
+    return [(rng.choice(floor), rng.choice(floor)) for _ in range(count)]
+
+def path_cost(path):
+    return sum(DIAGONAL_COST if x0 != x1 and y0 != y1 else STRAIGHT_COST
+               for (x0, y0), (x1, y1) in zip(path, path[1:]))
+
+def assert_legal(tiles, path, start, goal):
+    assert path[0] == start and path[-1] == goal
+    for (x0, y0), (x1, y1) in zip(path, path[1:]):
+        assert (x1 - x0, y1 - y0) in NEIGHBOR_MOVES, f"{(x0, y0)} -> {(x1, y1)} is not one step"
+        assert tiles[y1][x1] == 1, f"{(x1, y1)} is a wall"
+        if x0 != x1 and y0 != y1:
+            assert tiles[y0][x1] == 1 or tiles[y1][x0] == 1, f"{(x0, y0)} -> {(x1, y1)} squeezes between two walls"
+
+ROOM = [
+    "#########",
+    "#...#...#",
+    "#.#.#.#.#",
+    "#.#...#.#",
+    "#.#####.#",
+    "#.......#",
+    "#########",
+]
+
+def parse(rows):
+    return [[0 if char == "#" else 1 for char in row] for row in rows]
+
+def test_fixed_map_paths():
+    tiles = parse(ROOM)
+    engine = GridAStar(tiles)
+    assert engine.find_path((1, 1), (7, 1)) == [(1, 1), (2, 1), (3, 2), (4, 3), (5, 2), (6, 1), (7, 1)]
+    assert engine.find_path((1, 1), (1, 1)) == [(1, 1)]
+    assert engine.find_path((1, 1), (4, 4)) is None # Wall goal
+    assert engine.find_path((1, 1), (20, 1)) is None # Off the map
+
+def test_diagonal_between_two_walls_is_blocked():
+    tiles = parse([
+        "####",
+        "#.##",
+        "##.#",
+        "####",
+    ])
+    assert GridAStar(tiles).find_path((1, 1), (2, 2)) is None
+    assert reference_astar(tiles, (1, 1), (2, 2)) is None
+
+def test_paths_identical_to_previous_astar():
+    rng = random.Random(11)
+    maps = [scattered(0.1)(24, rng), scattered(0.3)(24, rng), maze(25, rng), parse(ROOM)]
+    for tiles in maps:
+        engine = GridAStar(tiles)
+        for start, goal in random_queries(tiles, 150, seed=len(tiles)):
+            assert engine.find_path(start, goal) == reference_astar(tiles, start, goal), f"{start} -> {goal}"
+
+def test_engine_follows_set_tile_edits():
+    tiles = parse(ROOM)
+    engine = get_grid_engine(tiles)
+    engine.find_path((1, 1), (7, 1))
+    tiles[3][4] = 0
+    tile_changed(tiles, 4, 3) # What Dungeon.set_tile does
+    path = engine.find_path((1, 1), (7, 1))
+    assert path == reference_astar(tiles, (1, 1), (7, 1))
+    assert (4, 3) not in path
+
+def test_jps_matches_octile_astar_cost():
+    rng = random.Random(5)
+    maps = [scattered(0.1)(32, rng), scattered(0.3)(32, rng), maze(33, rng), maze(21, rng)]
+    for tiles in maps:
+        engine = GridAStar(tiles)
+        for start, goal in random_queries(tiles, 200, seed=len(tiles) + 1):
+            reference = engine.find_path(start, goal, heuristic=HEURISTIC_OCTILE)
+            path = engine.find_path_jps(start, goal)
+            assert (path is None) == (reference is None), f"{start} -> {goal}"
+            if path is not None:
+                assert_legal(tiles, path, start, goal)
+                assert path_cost(path) == path_cost(reference), f"{start} -> {goal}"
@@ -0,0 +1,67 @@
+import random
+from core.dungeon import Dungeon
+from core.path_scheduler import PathScheduler, AsyncPathSolver
+from core.pathfinding import search_stats, reset_search_stats
+from characters.enemies import Enemy
+
+TILE_SIZE = 32
+
+def same_partition(labels_a, labels_b):
+    # Labels are just numbers handed out in flood order, compare which tiles share one
+    mapping = {}
+    for label_a, label_b in zip(labels_a, labels_b):
+        if mapping.setdefault(label_a, label_b) != label_b:
+            return False
+    return len(set(mapping.values())) == len(mapping)
+
+def full_reflood(dungeon):
+    fresh = Dungeon(dungeon.width_tiles * TILE_SIZE, dungeon.height_tiles * TILE_SIZE, TILE_SIZE)
+    fresh.tiles = [row[:] for row in dungeon.tiles]
+    fresh.label_all_regions()
+    return fresh.region_labels
+
+def test_region_labels_match_full_reflood_after_set_tile():
+    dungeon = Dungeon(30 * TILE_SIZE, 24 * TILE_SIZE, TILE_SIZE)
+    rng = random.Random(7)
+    for _ in range(300):
+        x = rng.randrange(1, dungeon.width_tiles - 1)
+        y = rng.randrange(1, dungeon.height_tiles - 1)
+        dungeon.set_tile(x, y, 0 if rng.random() < 0.6 else 1)
+        assert same_partition(dungeon.region_labels, full_reflood(dungeon)), f"labels wrong after setting {(x, y)}"
+
+def test_wall_splitting_the_map_makes_goal_unreachable():
+    dungeon = Dungeon(20 * TILE_SIZE, 20 * TILE_SIZE, TILE_SIZE)
+    assert dungeon.is_reachable((2, 2), (2, 17))
+    for x in range(dungeon.width_tiles):
+        dungeon.set_tile(x, 15, 0)
+    assert not dungeon.is_reachable((2, 2), (2, 17))
+    dungeon.set_tile(5, 15, 1)
+    assert dungeon.is_reachable((2, 2), (2, 17))
+
+def cut_off_setup():
+    dungeon = Dungeon(20 * TILE_SIZE, 20 * TILE_SIZE, TILE_SIZE)
+    for x in range(dungeon.width_tiles):
+        dungeon.set_tile(x, 15, 0)
+    enemy = Enemy(2 * TILE_SIZE, 2 * TILE_SIZE, 0)
+    goal_pixel = (2 * TILE_SIZE + 16, 17 * TILE_SIZE + 16)
+    return dungeon, enemy, goal_pixel
+
+def test_scheduler_does_not_queue_unreachable_goals():
+    dungeon, enemy, goal_pixel = cut_off_setup()
+    scheduler = PathScheduler(dungeon)
+    reset_search_stats()
+    scheduler.request_path(enemy, goal_pixel)
+    assert not scheduler.has_pending(enemy)
+    scheduler.process()
+    assert sum(stats["queries"] for stats in search_stats.values()) == 0
+    assert enemy.path == []
+
+def test_async_solver_does_not_submit_unreachable_goals():
+    dungeon, enemy, goal_pixel = cut_off_setup()
+    solver = AsyncPathSolver(dungeon, workers=1, use_processes=False)
+    try:
+        solver.request_path(enemy, goal_pixel)
+        assert not solver.has_pending(enemy)
+        assert enemy.path == []
+    finally:
+        solver.shutdown()
@@ -0,0 +1,116 @@
+import random
+import pygame
+from core.spatial_hash import SpatialHash
+
+class Item:
+    def __init__(self, item_id, x, y, size):
+        self.id = item_id
+        self.rect = pygame.Rect(x, y, size, size)
+
+def scatter(count, seed, spread=600):
+    rng = random.Random(seed)
+    return [Item(i, rng.randint(-spread // 4, spread), rng.randint(-spread // 4, spread), rng.choice((8, 24, 32, 70)))
+            for i in range(count)]
+
+def distance_sq(item, center):
+    dx = item.rect.centerx - center[0]
+    dy = item.rect.centery - center[1]
+    return dx * dx + dy * dy
+
+def brute_nearest(items, center, max_radius, predicate=None):
+    # The old list scan: first item in id order wins ties
+    best = None
+    best_distance_sq = max_radius * max_radius
+    for item in sorted(items, key=lambda item: item.id):
+        if predicate is not None and not predicate(item):
+            continue
+        item_distance_sq = distance_sq(item, center)
+        if item_distance_sq < best_distance_sq:
+            best, best_distance_sq = item, item_distance_sq
+    return best
+
+def build(items, cell_size=64):
+    grid = SpatialHash(cell_size)
+    for item in items:
+        grid.insert(item)
+    return grid
+
+def ids(items):
+    return sorted(item.id for item in items)
+
+def test_rect_queries_match_brute_force():
+    items = scatter(200, seed=1)
+    grid = build(items)
+    rng = random.Random(2)
+    for _ in range(100):
+        query = pygame.Rect(rng.randint(-200, 600), rng.randint(-200, 600), rng.randint(1, 300), rng.randint(1, 300))
+        assert ids(grid.query_rect(query)) == ids(item for item in items if query.colliderect(item.rect))
+
+def test_radius_queries_match_brute_force():
+    items = scatter(200, seed=3)
+    grid = build(items)
+    rng = random.Random(4)
+    for _ in range(100):
+        center = (rng.uniform(-200, 600), rng.uniform(-200, 600))
+        radius = rng.uniform(1, 250)
+        expected = ids(item for item in items if distance_sq(item, center) < radius * radius)
+        assert ids(grid.query_radius(center, radius)) == expected
+        # The broad phase may hold extra items but must never miss one
+        assert set(expected) <= set(ids(grid.candidates_near(center, radius)))
+
+def test_nearest_matches_brute_force():
+    items = scatter(200, seed=5)
+    grid = build(items)
+    rng = random.Random(6)
+    predicate = lambda item: item.id % 3 != 0
+    for _ in range(200):
+        center = (rng.randint(-200, 600), rng.randint(-200, 600))
+        radius = rng.uniform(1, 400)
+        sort_key = lambda item: item.id
+        assert grid.nearest(center, radius, sort_key=sort_key) is brute_nearest(items, center, radius)
+        assert grid.nearest(center, radius, predicate, sort_key) is brute_nearest(items, center, radius, predicate)
+
+def test_nearest_ties_go_to_lowest_id():
+    # Four items the same distance from the centre, in different cells, inserted highest id first
+    items = [Item(item_id, x, y, 16) for item_id, (x, y) in zip((7, 5, 9, 6), ((192, 92), (-8, 92), (92, -8), (92, 192)))]
+    grid = build(items)
+    sort_key = lambda item: item.id
+    assert grid.nearest((100, 100), 500, sort_key=sort_key).id == 5
+    assert grid.nearest((100, 100), 500, lambda item: item.id != 5, sort_key).id == 6
+    # Strictly inside the radius, an item exactly on it doesn't count
+    assert grid.nearest((100, 100), 100, sort_key=sort_key) is None
+
+def test_update_and_remove_keep_queries_correct():
+    items = scatter(150, seed=7)
+    grid = build(items, cell_size=48)
+    rng = random.Random(8)
+    live = list(items)
+    for step in range(300):
+        item = rng.choice(live)
+        if step % 10 == 0:
+            grid.remove(item)
+            live.remove(item)
+            assert item not in grid
+            continue
+        item.rect.move_ip(rng.randint(-60, 60), rng.randint(-60, 60))
+        grid.update(item)
+
+    assert len(grid) == len(live)
+    # No bucket still holds a removed item or an item outside that cell
+    for (cell_x, cell_y), bucket in grid.cells.items():
+        assert bucket
+        cell_rect = pygame.Rect(cell_x * 48, cell_y * 48, 48, 48)
+        for item in bucket:
+            assert item in grid and cell_rect.colliderect(item.rect)
+
+    for _ in range(50):
+        query = pygame.Rect(rng.randint(-300, 700), rng.randint(-300, 700), rng.randint(1, 200), rng.randint(1, 200))
+        assert ids(grid.query_rect(query)) == ids(item for item in live if query.colliderect(item.rect))
+        center = query.center
+        assert ids(grid.query_radius(center, 120)) == ids(item for item in live if distance_sq(item, center) < 120 * 120)
+        assert grid.nearest(center, 300, sort_key=lambda item: item.id) is brute_nearest(live, center, 300)
+
+    grid.remove(live[0]) # Removing twice is harmless
+    grid.remove(live[0])
+    grid.clear()
+    assert len(grid) == 0 and not grid.cells
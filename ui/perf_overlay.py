@@ -0,0 +1,82 @@
+import pygame
+
+PANEL_WIDTH = 300
+GRAPH_HEIGHT = 60
+LINE_HEIGHT = 15
+PADDING = 6
+VALUE_RIGHT = 200 # Numbers are right-aligned on this x, the default font isn't monospaced
+PANEL_COLOR = (0, 0, 0)
+TEXT_COLOR = (230, 230, 230)
+BUDGET_COLOR = (200, 60, 60) # Line across the graph at one frame's worth of ticks
+FRAME_BUDGET_MS = 1000 / 60
+# Phase colours in the stacked graph, handed out in phase order
+PHASE_COLORS = [(230, 90, 90), (230, 160, 60), (220, 220, 80), (120, 210, 90), (70, 190, 200),
+                (80, 120, 230), (160, 100, 230), (220, 100, 180), (170, 170, 170), (240, 200, 150)]
+
+class PerformanceOverlay:
+    # Top-left panel with the last frame's phase times and counters from a FrameProfiler,
+    # and a stacked graph of the recent frames underneath, one column per frame.
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.visible = False
+        self.font = None
+        self.rect = None # Where the panel went last draw, None while hidden
+
+    def panel_rect(self):
+        frame = self.profiler.last_frame()
+        lines = 1 + (len(frame["phases"]) + len(frame["counters"]) if frame else 0)
+        return pygame.Rect(0, 0, PANEL_WIDTH, PADDING * 3 + GRAPH_HEIGHT + lines * LINE_HEIGHT)
+
+    def draw(self, surface):
+        if not self.visible:
+            self.rect = None
+            return None
+        if self.font is None:
+            self.font = pygame.font.Font(None, 18)
+        profiler = self.profiler
+        frame = profiler.last_frame()
+        rect = self.panel_rect()
+        self.rect = rect
+        surface.fill(PANEL_COLOR, rect)
+        if frame is None:
+            return rect
+
+        phase_names = profiler.phase_names()
+        colors = {name: PHASE_COLORS[index % len(PHASE_COLORS)] for index, name in enumerate(phase_names)}
+
+        y = PADDING
+        self._row(surface, "frame", f"{frame['total_ms']:.2f} ms", y, TEXT_COLOR)
+        y += LINE_HEIGHT
+        for name in phase_names:
+            if name in frame["phases"]:
+                self._row(surface, name, f"{frame['phases'][name]:.2f} ms", y, colors[name])
+                y += LINE_HEIGHT
+        for name, value in frame["counters"].items():
+            self._row(surface, name, str(value), y, TEXT_COLOR)
+            y += LINE_HEIGHT
+
+        # Stacked phase times for the history, newest on the right. Scaled so two frame
+        # budgets fill the graph, anything over is clipped at the top.
+        graph_bottom = y + PADDING + GRAPH_HEIGHT
+        scale = GRAPH_HEIGHT / (2 * FRAME_BUDGET_MS)
+        column_width = max(1, (PANEL_WIDTH - 2 * PADDING) // max(profiler.history_length, 1))
+        x = PANEL_WIDTH - PADDING - column_width * len(profiler.history)
+        for past_frame in profiler.history:
+            top = graph_bottom
+            for name in phase_names:
+                height = past_frame["phases"].get(name, 0.0) * scale
+                if height <= 0:
+                    continue
+                new_top = max(top - height, graph_bottom - GRAPH_HEIGHT)
+                if new_top < top:
+                    surface.fill(colors[name], (x, round(new_top), column_width, round(top) - round(new_top)))
+                top = new_top
+            x += column_width
+        budget_y = graph_bottom - round(FRAME_BUDGET_MS * scale)
+        pygame.draw.line(surface, BUDGET_COLOR, (PADDING, budget_y), (PANEL_WIDTH - PADDING, budget_y))
+        return rect
+
+    def _row(self, surface, label, value, y, color):
+        surface.blit(self.font.render(label, True, color), (PADDING, y))
+        value_image = self.font.render(value, True, color)
+        surface.blit(value_image, (VALUE_RIGHT - value_image.get_width(), y))
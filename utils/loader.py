@@ -0,0 +1,110 @@
+import os
+import pygame
+import config
+
+IMAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "assets", "images")
+
+def _display_ready():
+    # convert() needs a display mode, headless tools and early imports don't have one yet
+    return pygame.display.get_surface() is not None
+
+class TextureAtlas:
+    # Small sprites packed onto a few big pages, handed out as named subsurfaces. Packing
+    # is in shelves: sprites go left to right along the current row and a new row starts
+    # under the tallest one so far. A full page starts a new page.
+    def __init__(self, page_size=None, padding=1):
+        self.page_size = config.ATLAS_PAGE_SIZE if page_size is None else page_size
+        self.padding = padding
+        self.pages = []
+        self.sprites = {} # name -> subsurface of a page
+        self.shelf_x = 0
+        self.shelf_y = 0
+        self.shelf_height = 0
+
+    def _new_page(self):
+        page = pygame.Surface((self.page_size, self.page_size), pygame.SRCALPHA)
+        if _display_ready():
+            page = page.convert_alpha()
+        page.fill((0, 0, 0, 0))
+        self.pages.append(page)
+        self.shelf_x = 0
+        self.shelf_y = 0
+        self.shelf_height = 0
+        return page
+
+    def fits(self, size):
+        return size[0] <= self.page_size and size[1] <= self.page_size
+
+    def add(self, name, image):
+        if name in self.sprites:
+            return self.sprites[name]
+        width, height = image.get_size()
+        if not self.pages:
+            self._new_page()
+        if self.shelf_x + width > self.page_size:
+            self.shelf_x = 0
+            self.shelf_y += self.shelf_height + self.padding
+            self.shelf_height = 0
+        if self.shelf_y + height > self.page_size:
+            self._new_page()
+        page = self.pages[-1]
+        page.blit(image, (self.shelf_x, self.shelf_y))
+        sprite = page.subsurface((self.shelf_x, self.shelf_y, width, height))
+        self.sprites[name] = sprite
+        self.shelf_x += width + self.padding
+        self.shelf_height = max(self.shelf_height, height)
+        return sprite
+
+    def get(self, name):
+        return self.sprites.get(name)
+
+class AssetLoader:
+    # Every image the game draws comes from here exactly once, converted to the display
+    # format so blits don't convert pixels every frame. Anything up to
+    # ATLAS_MAX_SPRITE_SIZE goes onto the atlas, bigger images stay on their own.
+    # Callers get shared surfaces back: never draw onto them, copy first.
+    def __init__(self, image_dir=IMAGE_DIR, atlas=None, max_sprite_size=None):
+        self.image_dir = image_dir
+        self.atlas = TextureAtlas() if atlas is None else atlas
+        self.max_sprite_size = config.ATLAS_MAX_SPRITE_SIZE if max_sprite_size is None else max_sprite_size
+        self.images = {} # name -> shared surface
+        self.files_loaded = 0
+
+    def add(self, name, image, alpha=True):
+        # Registers a surface built in code under name, packed like a loaded image
+        if name in self.images:
+            return self.images[name]
+        width, height = image.get_size()
+        if width <= self.max_sprite_size and height <= self.max_sprite_size and self.atlas.fits((width, height)):
+            image = self.atlas.add(name, image)
+        elif _display_ready():
+            image = image.convert_alpha() if alpha else image.convert()
+        self.images[name] = image
+        return image
+
+    def image(self, filename, size=None, alpha=True):
+        # An image from assets/images, optionally scaled to size
+        name = filename if size is None else f"{filename}@{size[0]}x{size[1]}"
+        image = self.images.get(name)
+        if image is not None:
+            return image
+        image = pygame.image.load(os.path.join(self.image_dir, filename))
+        self.files_loaded += 1
+        if size is not None and image.get_size() != tuple(size):
+            image = pygame.transform.smoothscale(image.convert_alpha() if _display_ready() else image, size)
+        return self.add(name, image, alpha)
+
+    def solid(self, name, size, color):
+        # Plain coloured rectangle for things that don't have art yet
+        image = self.images.get(name)
+        if image is not None:
+            return image
+        image = pygame.Surface(size, pygame.SRCALPHA)
+        image.fill(color)
+        return self.add(name, image, True)
+
+    def get(self, name):
+        return self.images.get(name)
+
+# One loader for the whole game, like surface_cache
+loader = AssetLoader()
@@ -0,0 +1,32 @@
+from utils.loader import loader
+from utils.surface_cache import outline_image, tint_image
+import config
+
+DAMAGED_TINT = (150, 150, 150) # Damaged sprites are the normal one darkened by this
+
+class SpriteTable:
+    # The images one kind of entity can show, built once and shared by all of them.
+    # Entities only ever point at one of these, so switching state (stunned, hurt) is an
+    # assignment instead of a new surface. Everything is read-only, never draw onto it.
+    def __init__(self, name, normal, outline_color, outline_thickness):
+        self.name = name
+        self.normal = normal
+        self.stunned = loader.add(f"{name}_stunned", outline_image(normal, outline_color, outline_thickness))
+        self.damaged = loader.add(f"{name}_damaged", tint_image(normal, DAMAGED_TINT))
+
+    def pick(self, stunned, health, max_health):
+        if stunned:
+            return self.stunned
+        if health <= max_health * config.DAMAGED_SPRITE_HEALTH:
+            return self.damaged
+        return self.normal
+
+_tables = {}
+
+def get_sprite_table(name, size, color, outline_color, outline_thickness):
+    # Table for a plain coloured sprite, one per name for the whole game
+    table = _tables.get(name)
+    if table is None:
+        table = SpriteTable(name, loader.solid(name, size, color), outline_color, outline_thickness)
+        _tables[name] = table
+    return table
@@ -0,0 +1,77 @@
+import pygame
+from collections import OrderedDict
+import config
+
+def outline_image(image, outline_color, thickness):
+    # New surface: image centred with a thickness-wide rectangle outline around it
+    width, height = image.get_size()
+    surface = pygame.Surface((width + thickness * 2, height + thickness * 2), pygame.SRCALPHA)
+    surface.blit(image, (thickness, thickness))
+    pygame.draw.rect(surface, outline_color, surface.get_rect(), thickness)
+    return surface
+
+def tint_image(image, tint):
+    # New surface: image with its colour multiplied by tint, alpha left alone
+    surface = image.copy()
+    surface.fill(tint, special_flags=pygame.BLEND_RGB_MULT)
+    return surface
+
+class SurfaceCache:
+    # Shared, read-only surfaces for effect visuals that used to be rebuilt every time:
+    # plain shapes keyed on (shape, size, colour) and transformed images keyed on the
+    # source surface plus the transform. Least recently used entries go first once
+    # max_entries is reached. Never draw onto a surface you got from here, copy it first.
+    def __init__(self, max_entries=None, rotation_step=None):
+        self.max_entries = config.SURFACE_CACHE_SIZE if max_entries is None else max_entries
+        self.rotation_step = config.ROTATION_STEP_DEGREES if rotation_step is None else rotation_step
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, build):
+        surface = self.entries.get(key)
+        if surface is not None:
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return surface
+        self.misses += 1
+        surface = build()
+        self.entries[key] = surface
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return surface
+
+    def circle(self, radius, color):
+        # Circle of radius on a transparent square just big enough for it
+        def build():
+            surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(surface, color, (radius, radius), radius)
+            return surface
+        return self.get(("circle", radius, tuple(color)), build)
+
+    def rotated(self, image, angle):
+        # Angle is snapped to rotation_step degrees so nearby angles share one surface
+        step = self.rotation_step
+        snapped = (round(angle / step) * step) % 360
+        return self.get(("rotated", image, snapped), lambda: pygame.transform.rotate(image, snapped))
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {"entries": len(self.entries), "hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "hit_rate": self.hit_rate()}
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        self.entries.clear()
+
+# One cache for the whole game, like the pathfinding engines
+surface_cache = SurfaceCache()